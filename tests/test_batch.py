@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import tempfile
+
+import pytest
+
+from usb_cable_tester.batch import load_manifest, run_batch
+
+
+def test_load_manifest_csv_and_jsonl():
+    with tempfile.TemporaryDirectory() as d:
+        csv_path = os.path.join(d, "m.csv")
+        with open(csv_path, "w") as fh:
+            fh.write("label,path,size_mb\nA,/mnt/a,64\n,/mnt/b,\n")
+        entries = load_manifest(csv_path, default_size_mb=32)
+        assert entries == [
+            {"label": "A", "path": "/mnt/a", "size_mb": 64},
+            {"label": None, "path": "/mnt/b", "size_mb": 32},
+        ]
+        jl_path = os.path.join(d, "m.jsonl")
+        with open(jl_path, "w") as fh:
+            fh.write(json.dumps({"label": "C", "path": "/mnt/c"}) + "\n")
+        assert load_manifest(jl_path)[0]["size_mb"] == 1024
+        with open(jl_path, "w") as fh:
+            fh.write(json.dumps({"label": "C"}) + "\n")
+        with pytest.raises(ValueError):
+            load_manifest(jl_path)
+
+
+def test_run_batch_probes_once_and_streams_records():
+    probes = []
+
+    def probe():
+        # Stands in for the probe cache: only the first call really probes
+        probes.append(1)
+        return {"os": "linux", "probe": {"cached": len(probes) > 1, "age_s": 0.0}}
+
+    with tempfile.TemporaryDirectory() as root:
+        d = os.path.join(root, "target")
+        os.mkdir(d)
+        entries = [
+            {"label": "A", "path": d, "size_mb": 8},
+            {"label": "B", "path": d, "size_mb": 8},
+            {"label": "C", "path": os.path.join(root, "missing"), "size_mb": 8},
+            {"label": "D", "path": d, "size_mb": 8},
+        ]
+        answers = iter(["run", "skip", "run", "quit"])
+        out = io.StringIO()
+        summary = run_batch(entries, out, confirm=lambda e: next(answers), probe=probe)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["label"] for r in records] == ["A", "C"]
+        assert records[0]["speed_test"]["write_mb_s"] > 0
+        assert "error" in records[1]
+        assert summary == {"total": 4, "tested": 1, "skipped": 1, "failed": 1, "probes": 1}
+        assert len(probes) == 2
+        assert os.listdir(d) == []
@@ -1,3 +1,5 @@
+import os
+
 from usb_cable_tester.classify import classify_result
 
 
@@ -14,3 +16,56 @@ def test_classify_by_speed_only_mid():
     out = classify_result(info, speed)
     assert "USB 3.2" in out["summary"]
 
+
+
+def test_classify_uses_trial_median_not_single_max():
+    info = {"os": "linux"}
+    # One lucky read would push max(write, read) into the Gen 2 band
+    speed = {
+        "write_mb_s": 400.0,
+        "read_mb_s": 950.0,
+        "stats": {"best_mb_s": {"n": 5, "median": 420.0}},
+    }
+    out = classify_result(info, speed)
+    assert out["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
+    assert "median of 5 trials" in out["reasons"][-1]
+
+
+def test_classify_snapshot_corpus():
+    # Each corpus snapshot records the summary it must classify to
+    from usb_cable_tester.snapshot import expand_corpus, replay
+
+    corpus = os.path.join(os.path.dirname(__file__), "fixtures", "snapshots")
+    results = [replay(p) for p in expand_corpus([corpus])]
+    assert len(results) >= 8
+    mismatches = [(r["snapshot"], r["classification"]["summary"]) for r in results if not r["matches"]]
+    assert mismatches == []
+
+
+def test_thunderbolt_rate_is_read_from_speed_fields_only():
+    # The old substring scan saw "40" (in the uuid) plus "gb/s" and claimed 40 Gb/s
+    info = {
+        "os": "linux",
+        "thunderbolt": {
+            "boltctl": [" ● Dock", "   ├─ uuid:          00b4a740-0000-8c18-1234", "   ├─ rx speed:      20 Gb/s = 2 lanes * 10 Gb/s"],
+        },
+    }
+    out = classify_result(info, None)
+    assert out["summary"] == "Thunderbolt / USB4 (20 Gb/s)"
+    assert out["reasons"] == ["Thunderbolt link reports 20 Gb/s"]
+    assert out["rule"] == "tb_link_mbps>=20000"
+
+
+def test_rule_priority_and_custom_tables():
+    from usb_cable_tester.classify import Rule, compile_rules, evaluate
+
+    # Cable identity outranks measured throughput; hints add evidence only
+    info = {"os": "linux", "typec": {"ports": [{"port": "port0", "cable": {"speed": "10000", "active": "no"}}]}}
+    out = classify_result(info, {"write_mb_s": 30.0})
+    assert out["summary"] == "USB 3.2 Gen 2 (10 Gb/s)"
+    assert out["reasons"] == ["Type-C cable reports speed=10000", "Cable active=no"]
+
+    table = compile_rules((Rule("x", "x is {value}", 1, 10, "ten"), Rule("y", "y beats x", 2, 0, "any y"), Rule("z", "z hint")))
+    assert evaluate({"x": 12, "z": True}, table) == {"summary": "ten", "reasons": ["x is 12", "z hint"], "rule": "x>=10"}
+    assert evaluate({"x": 12, "y": 0}, table)["summary"] == "any y"
+    assert evaluate({"x": 5}, table)["summary"] == "Insufficient data to classify precisely"
@@ -0,0 +1,23 @@
+import json
+
+from usb_cable_tester import system_info as sysinfo
+from usb_cable_tester.cli import main
+
+
+def test_dry_run_is_classified_on_the_probe_alone(monkeypatch, tmp_path, capsys):
+    def probe(sections, budget_s):
+        data = {n: {} for n in sections}
+        data["usb"] = {"devices": [{"name": "2-1", "root_hub": False, "speed_mbps": 5000}]}
+        return data, {n: {"status": "ok", "elapsed_s": 0.0} for n in sections}
+
+    monkeypatch.setattr(sysinfo.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(sysinfo, "_probe_sections", probe)
+    sysinfo.clear_probe_cache()
+    try:
+        assert main(["--run-speed-test", "--test-path", str(tmp_path), "--dry-run", "--json"]) == 0
+    finally:
+        sysinfo.clear_probe_cache()
+    out = json.loads(capsys.readouterr().out)
+    assert out["speed_test"]["dry_run"] is True
+    assert out["classification"]["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,21 @@
+from usb_cable_tester.latency import LatencyHistogram
+
+
+def test_histogram_percentiles_within_bucket_error():
+    h = LatencyHistogram()
+    for v in range(1, 100001):
+        h.record(v * 1000)  # 1 us .. 100 ms
+    assert h.total == 100000
+    for pct, expected in ((50, 50000000), (90, 90000000), (99, 99000000), (99.9, 99900000)):
+        assert abs(h.percentile(pct) - expected) / expected < 0.04
+    s = h.summary_us()
+    assert s["min"] == 1.0 and s["max"] == 100000.0
+
+
+def test_histogram_merge_and_empty():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    assert a.percentile(50) is None
+    a.record(10)
+    b.record(5000)
+    a.merge(b)
+    assert a.total == 2 and a.min_ns == 10 and a.max_ns == 5000
@@ -0,0 +1,74 @@
+import os
+
+from usb_cable_tester.mounts import Mount, MountIndex, block_devices, linux_mounts, parse_mountinfo
+from usb_cable_tester.safety import is_path_external, is_path_network
+
+
+MOUNTINFO = """\
+22 1 254:0 / / rw,relatime shared:1 - ext4 /dev/vda rw
+30 22 0:27 / /media rw shared:2 - tmpfs tmpfs rw
+31 30 8:1 / /media/usb\\040disk rw,nosuid master:3 - exfat /dev/sda1 rw
+32 22 0:50 / /mnt/share rw - nfs4 server:/export rw
+33 30 8:1 / /media/usb\\040disk rw - vfat /dev/sda1 rw
+34 22 0:61 / /media/pool rw - btrfs /dev/sda1 rw
+"""
+
+
+def _sysfs(tmp_path):
+    # sda1: a partition of a disk behind a USB port; vda: an internal virtio disk
+    devices = tmp_path / "sys/devices/pci0000:00"
+    disks = {
+        "sda": (devices / "0000:00:14.0/usb2/2-1/2-1:1.0/host0/target0:0:0/0:0:0:0/block/sda", "8:0"),
+        "vda": (devices / "0000:00:04.0/virtio2/block/vda", "254:0"),
+    }
+    (tmp_path / "sys/block").mkdir(parents=True)
+    for name, (path, dev) in disks.items():
+        path.mkdir(parents=True)
+        (path / "dev").write_text(dev + "\n")
+        (path / "size").write_text("125045424\n")
+        (path / "removable").write_text("0\n")
+        os.symlink(path, tmp_path / "sys/block" / name)
+    part = disks["sda"][0] / "sda1"
+    part.mkdir()
+    (part / "partition").write_text("1\n")
+    (part / "dev").write_text("8:1\n")
+    (part / "size").write_text("125043376\n")
+    return str(tmp_path / "sys")
+
+
+def test_parse_mountinfo_unescapes_and_keeps_order():
+    mounts = parse_mountinfo(MOUNTINFO + "garbage line\n")
+    assert [m.mount_point for m in mounts] == ["/", "/media", "/media/usb disk", "/mnt/share", "/media/usb disk", "/media/pool"]
+    assert mounts[2].fs_type == "exfat" and mounts[2].source == "/dev/sda1" and mounts[2].device == "8:1"
+    assert mounts[3].is_network is True and mounts[0].is_network is False
+
+
+def test_index_finds_innermost_mount_and_top_of_stack(tmp_path):
+    info = tmp_path / "mountinfo"
+    info.write_text(MOUNTINFO)
+    index = MountIndex(linux_mounts(str(info), _sysfs(tmp_path)))
+    assert len(index) == 5
+    assert index.lookup("/media/pool/x").is_external is True  # btrfs: matched by source
+    usb = index.lookup("/media/usb disk/some/dir")
+    assert usb.fs_type == "vfat" and usb.is_external is True
+    assert index.lookup("/media/usbx").mount_point == "/media"
+    assert index.lookup("/media").is_external is None  # tmpfs: not a block device
+    assert index.lookup("/home/me").mount_point == "/" and index.lookup("/home/me").is_external is False
+    assert index.lookup("/mnt/share/x").is_network is True
+
+
+def test_block_devices_inherit_disk_transport(tmp_path):
+    devices = block_devices(_sysfs(tmp_path))
+    assert set(devices) == {"8:0", "8:1", "254:0"}
+    assert devices["8:1"]["name"] == "sda1" and devices["8:1"]["disk"] == "sda"
+    assert devices["8:1"]["transport"] == "usb" and devices["8:1"]["external"] is True
+    assert devices["8:1"]["size_bytes"] == 125043376 * 512
+    assert devices["254:0"]["external"] is False
+
+
+def test_safety_uses_the_given_index():
+    index = MountIndex([Mount("/", is_external=False, is_network=False), Mount("/srv/ext", is_external=True, is_network=False)])
+    assert is_path_external("/srv/ext/data", index) is True
+    assert is_path_external("/srv/other", index) is False
+    assert is_path_network("/srv/ext", index) is False
+    assert is_path_external("/srv", MountIndex()) is None
@@ -0,0 +1,49 @@
+import mmap
+import struct
+import zlib
+
+import pytest
+
+from usb_cable_tester.patterns import STAMP_STRIDE, PatternGenerator
+
+
+def _blocks(mode, count, size=64 * 1024):
+    gen = PatternGenerator(mode, size)
+    buf = mmap.mmap(-1, size)
+    view = memoryview(buf)
+    gen.prime(view)
+    out = [bytes(gen.block(view, i)) for i in range(count)]
+    view.release()
+    gen.close()
+    return out
+
+
+def test_random_blocks_are_unique_per_chunk_and_incompressible():
+    blocks = _blocks("random", 4)
+    chunks = {b[o:o + STAMP_STRIDE] for b in blocks for o in range(0, len(b), STAMP_STRIDE)}
+    assert len(chunks) == 4 * len(blocks[0]) // STAMP_STRIDE
+    assert len(zlib.compress(blocks[0])) > 0.95 * len(blocks[0])
+
+
+def test_every_chunk_header_carries_its_block_number():
+    gen = PatternGenerator("random", 64 * 1024)
+    buf = mmap.mmap(-1, 64 * 1024)
+    view = memoryview(buf)[: 7 * STAMP_STRIDE]  # a short final block: 7 chunks
+    gen.prime(view)
+    data = bytes(gen.block(view, 1234))
+    headers = [struct.unpack_from("=QQ", data, o) for o in range(0, len(data), STAMP_STRIDE)]
+    assert headers == [(i, 1234) for i in range(7)]
+    view.release()
+    gen.close()
+
+
+def test_zeros_and_mixed_modes():
+    assert all(b == bytes(len(b)) for b in _blocks("zeros", 2))
+    mixed = _blocks("mixed", 4)
+    assert mixed[0] == bytes(len(mixed[0]))
+    assert mixed[1] != bytes(len(mixed[1]))
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        PatternGenerator("ones")
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from usb_cable_tester.reclassify import main, reclassify_history
+from usb_cable_tester.store import LEGACY_DB_FILE, iter_results, save_result
+
+
+LINUX_5G = {"os": "linux", "usb": {"devices": [{"name": "2-1", "root_hub": False, "speed_mbps": 5000}]}}
+
+
+def _history(path):
+    records = [
+        # Stored before the rules knew about sysfs links: throughput-only summary
+        {"label": "A", "system": LINUX_5G, "speed_test": {"write_mb_s": 30.0}, "classification": {"summary": "USB 2.0 (Hi-Speed, 480 Mb/s theoretical)", "reasons": []}},
+        {"label": "B", "system": {"os": "linux"}, "speed_test": {"write_mb_s": 500.0}, "classification": {"summary": "USB 3.2 Gen 2 (10 Gb/s)", "reasons": []}},
+        {"label": "C", "system": LINUX_5G, "speed_test": None, "error": "No space left on device"},
+        {"label": None, "system": {"os": "linux"}, "speed_test": {"dry_run": True}, "classification": None},
+        {
+            "label": "D",
+            "system": {"os": "linux"},
+            "speed_test": {"workload": "multi", "devices": [{"path": "/a", "result": {"write_mb_s": 100.0}, "classification": None}]},
+            "classification": {"summary": "stale", "reasons": []},
+        },
+    ]
+    for rec in records:
+        save_result(rec, str(path))
+    return records
+
+
+@pytest.mark.parametrize("jobs,batch_size", [(1, 2000), (2, 2)])
+def test_reclassify_history_rewrites_and_diffs(tmp_path, jobs, batch_size):
+    path = tmp_path / "results.json"
+    original = _history(path)
+    summary = reclassify_history(str(path), jobs=jobs, batch_size=batch_size)
+    assert summary["records"] == 5 and summary["reclassified"] == 3 and summary["changed"] == 2
+    assert {(t["from"], t["to"]): t["labels"] for t in summary["transitions"]} == {
+        ("USB 2.0 (Hi-Speed, 480 Mb/s theoretical)", "USB 3.2 Gen 1 (5 Gb/s)"): ["A"],
+        ("stale", "Insufficient data to classify precisely"): ["D"],
+    }
+    records = list(iter_results(str(path)))
+    assert [r["label"] for r in records] == ["A", "B", "C", None, "D"]
+    assert records[0]["classification"]["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
+    assert records[2] == original[2] and records[3] == original[3]
+    assert records[4]["speed_test"]["devices"][0]["classification"]["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
+
+
+def test_reclassify_dry_run_leaves_history(tmp_path, capsys):
+    path = tmp_path / "results.json"
+    _history(path)
+    before = path.read_text()
+    assert main([str(path), "--dry-run", "--json"]) == 0
+    out = json.loads(capsys.readouterr().out)
+    assert out["changed"] == 2 and out["written"] is False
+    assert path.read_text() == before
+
+
+def test_reclassify_legacy_path_then_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = [{"label": "old", "system": {"os": "linux"}, "speed_test": None, "classification": None}]
+    (tmp_path / LEGACY_DB_FILE).write_text(json.dumps(records))
+    assert reclassify_history(LEGACY_DB_FILE)["records"] == 1
+    save_result({"label": "new"})
+    assert [r["label"] for r in iter_results()] == ["old", "new"]
+    assert (tmp_path / (LEGACY_DB_FILE + ".bak")).exists() and not (tmp_path / LEGACY_DB_FILE).exists()
+
+
+def test_saved_dry_run_is_reclassified_on_the_probe(tmp_path):
+    path = tmp_path / "results.jsonl"
+    stale = {"summary": "stale", "reasons": []}
+    save_result({"label": "E", "system": LINUX_5G, "speed_test": {"dry_run": True, "file_size_mb": 1024}, "classification": stale}, str(path))
+    assert reclassify_history(str(path))["changed"] == 1
+    assert next(iter_results(str(path)))["classification"]["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
@@ -0,0 +1,50 @@
+import sys
+import threading
+import time
+
+from usb_cable_tester.runner import CommandRunner, format_command_log
+
+
+def _sleep_cmd(seconds, text="done"):
+    return [sys.executable, "-c", f"import time; time.sleep({seconds}); print({text!r})"]
+
+
+def test_identical_in_flight_commands_share_one_execution():
+    runner = CommandRunner()
+    results = []
+    cmd = _sleep_cmd(0.3)
+    threads = [threading.Thread(target=lambda: results.append(runner.run(cmd))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [(0, "done\n", "")] * 4
+    log = runner.log()
+    assert len(log) == 1
+    assert log[0]["status"] == "ok" and log[0]["exit"] == 0 and log[0]["shared_with"] == 3
+    assert log[0]["wall_s"] >= 0.3
+
+
+def test_concurrency_cap_queues_distinct_commands():
+    runner = CommandRunner(max_concurrent=1)
+    threads = [threading.Thread(target=runner.run, args=(_sleep_cmd(0.2, str(n)),)) for n in range(2)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start >= 0.4
+    assert max(e["queued_s"] for e in runner.log()) >= 0.15
+
+
+def test_missing_tool_timeout_and_failure_are_logged():
+    runner = CommandRunner()
+    assert runner.run(["no-such-tool-plugiq", "-x"])[0] == 127
+    assert runner.run(_sleep_cmd(5), timeout=0.2)[0] == 124
+    assert runner.run([sys.executable, "-c", "raise SystemExit(3)"])[0] == 3
+    statuses = [(e["status"], e["exit"]) for e in runner.log()]
+    assert statuses == [("missing", 127), ("timed-out", 124), ("failed", 3)]
+    lines = format_command_log(runner.log())
+    assert lines[0].endswith("timed-out in %.2f s" % runner.log()[1]["wall_s"])
+    assert any(line.startswith("no-such-tool-plugiq -x: missing") for line in lines)
+    assert any(": exit 3 in " in line for line in lines)
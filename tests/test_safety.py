@@ -18,3 +18,11 @@ def test_temp_dir_ok_small():
         assert ok is True
         assert isinstance(warnings, list)
 
+
+
+@pytest.mark.skipif(not hasattr(os, "statvfs"), reason="no os.statvfs")
+def test_refuse_when_free_space_is_short():
+    with tempfile.TemporaryDirectory() as d:
+        free_mb = os.statvfs(d).f_bavail * os.statvfs(d).f_frsize // (1024 * 1024)
+        with pytest.raises(SafetyError):
+            preflight_checks(d, free_mb)
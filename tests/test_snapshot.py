@@ -0,0 +1,39 @@
+import os
+import tarfile
+
+import pytest
+
+from usb_cable_tester.snapshot import bench, expand_corpus, record_snapshot, replay
+
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "snapshots")
+
+
+def test_record_and_replay_round_trip(tmp_path):
+    src = os.path.join(CORPUS, "linux-usb3-gen2-ssd", "sys")
+    snap = str(tmp_path / "snap.tar.gz")
+    meta = record_snapshot(snap, sysfs_root=src)
+    if meta["os"] != "linux":
+        pytest.skip("sysfs capture is Linux-only")
+    assert meta["sysfs_files"] > 0
+    with tarfile.open(snap) as tar:
+        names = tar.getnames()
+    assert "meta.json" in names and "sys/bus/usb/devices/2-2/speed" in names
+    out = replay(snap)
+    assert out["system"]["usb"]["devices"][-1]["speed_mbps"] == 10000
+    assert out["classification"]["summary"] == "USB 3.2 Gen 2 (10 Gb/s)"
+
+
+def test_replay_rejects_paths_outside_the_snapshot(tmp_path):
+    snap = str(tmp_path / "evil.tar")
+    evil = tmp_path / "x"
+    evil.write_text("{}")
+    with tarfile.open(snap, "w") as tar:
+        tar.add(str(evil), arcname="../escape")
+    with pytest.raises(ValueError):
+        replay(snap)
+
+
+def test_bench_times_probe_and_classify():
+    rows = bench(expand_corpus([CORPUS])[:2], iterations=3)
+    assert len(rows) == 2
+    assert all(r["probe_us"]["median"] > 0 and r["classify_us"]["min"] >= 0 for r in rows)
@@ -1,7 +1,28 @@
+import errno
 import os
 import tempfile
+import threading
+import time
+import types
 
-from usb_cable_tester.speed_test import run_disk_speed_test
+import pytest
+
+from usb_cable_tester.io_backends import BackendUnavailable, backend_names
+from usb_cable_tester.speed_test import (
+    AUTO_SIZE_MIN_MB,
+    SpeedTestCancelled,
+    _analyze_samples,
+    _auto_size_write,
+    _converged,
+    auto_size_cap,
+    format_progress,
+    iter_disk_speed_test,
+    run_disk_speed_test,
+    run_multi_device_test,
+    run_random_io_test,
+    run_speed_trials,
+    run_sustained_write_test,
+)
 
 
 def test_speed_small_file():
@@ -11,3 +32,173 @@ def test_speed_small_file():
         assert res["write_mb_s"] > 0
         assert res["read_mb_s"] > 0
 
+
+
+def test_speed_reports_cache_mode():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_disk_speed_test(d, file_size_mb=8)
+        assert res["cache_mode"] in ("direct", "nocache", "fadvise", "cached")
+        assert not os.listdir(d)
+        res = run_disk_speed_test(d, file_size_mb=8, bypass_cache=False)
+        assert res["cache_mode"] == "cached"
+
+
+def test_speed_queue_depth_engine():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_disk_speed_test(d, file_size_mb=40, jobs=2, iodepth=3)
+        assert res["jobs"] == 2 and res["iodepth"] == 3
+        assert len(res["workers"]) == 2
+        assert sum(w["bytes"] for w in res["workers"]) == 40 * 1024 * 1024
+        assert all(w["read_mb_s"] > 0 for w in res["workers"])
+
+
+def test_random_io_reports_latency_percentiles():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_random_io_test(d, file_size_mb=8, duration_s=0.2, read_pct=50, seed=1)
+        assert res["ops"] > 0 and res["iops"] > 0
+        for key in ("p50", "p90", "p99", "p99.9"):
+            assert res["latency_us"][key] is not None
+        assert res["latency_us"]["p50"] <= res["latency_us"]["p99.9"]
+        assert not os.listdir(d)
+
+
+def test_sustained_write_samples_and_knee_detection():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_sustained_write_test(d, duration_s=0.3, file_size_mb=16, interval_s=0.1)
+        assert res["samples"] and res["burst_mb_s"] > 0 and res["sustained_mb_s"] > 0
+        assert not os.listdir(d)
+
+    samples = [{"t_s": i + 1.0, "bytes": 1024 * 1024, "mb_s": v} for i, v in enumerate([900.0] * 10 + [300.0] * 20)]
+    out = _analyze_samples(samples)
+    assert out["burst_mb_s"] == 900.0
+    assert out["sustained_mb_s"] == 300.0
+    assert out["knee_s"] == 10.0
+    assert out["throttling"] is False
+
+
+def test_speed_buffers_respect_memory_ceiling():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_disk_speed_test(d, file_size_mb=8, jobs=4, iodepth=4, memory_limit_mb=4)
+        assert res["buffer_bytes"] <= 4 * 1024 * 1024
+        assert res["block_size_bytes"] < 8 * 1024 * 1024
+        assert sum(w["bytes"] for w in res["workers"]) == 8 * 1024 * 1024
+
+
+def test_auto_size_stops_at_cap_or_convergence():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_disk_speed_test(d, file_size_mb=48, auto_size=True)
+        auto = res["auto_size"]
+        assert auto["cap_mb"] == 48
+        assert 0 < auto["needed_mb"] <= 48
+        assert res["file_size_mb"] == auto["needed_mb"]
+        assert auto["rounds"] == len(auto["round_mb_s"]) >= 1
+
+
+@pytest.mark.skipif(not hasattr(os, "pwrite"), reason="positional I/O")
+@pytest.mark.parametrize("kwargs", [{"jobs": 2}, {"auto_size": True}])
+def test_mid_run_write_error_propagates_and_cleans_up(monkeypatch, kwargs):
+    real_pwrite = os.pwrite
+
+    def pwrite(fd, data, offset):
+        if offset >= 4 * 1024 * 1024:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, "pwrite", pwrite)
+    with tempfile.TemporaryDirectory() as d:
+        # Not masked by a BufferError from closing buffers still referenced
+        # by the error's traceback
+        with pytest.raises(OSError) as err:
+            run_disk_speed_test(d, file_size_mb=16, **kwargs)
+        assert err.value.errno == errno.ENOSPC
+        assert os.listdir(d) == []
+
+
+def test_auto_size_rounds_are_timed_through_sync():
+    syncs = []
+
+    def sync():
+        time.sleep(0.02)  # the device draining what the cache accepted instantly
+        syncs.append(1)
+
+    mb = 1024 * 1024
+    size, _, _, rates, _ = _auto_size_write(8 * mb, mb, 1, 1, lambda lane, off, length: length, sync)
+    assert size == 8 * mb and len(syncs) == len(rates)
+    assert rates[0] <= 1 / 0.02  # one 1 MB block per round until the rate is known
+
+
+def test_auto_size_cap_fits_the_free_space(monkeypatch):
+    mb = 1024 * 1024
+    free = {"bytes": 600 * mb}
+    monkeypatch.setattr(os, "statvfs", lambda path: types.SimpleNamespace(f_bavail=free["bytes"] // 4096, f_frsize=4096), raising=False)
+    assert auto_size_cap("/media/stick", 2048) == 500  # 600 MB free, 20% margin
+    free["bytes"] = 10 * mb
+    assert auto_size_cap("/media/stick", 2048) == AUTO_SIZE_MIN_MB  # preflight decides
+    free["bytes"] = 64 * 1024 * mb
+    assert auto_size_cap("/media/stick", 2048) == 2048
+
+
+def test_converged_requires_stable_rounds():
+    assert not _converged([100.0, 100.0, 100.0])
+    assert _converged([50.0, 100.0, 101.0, 99.0, 100.0, 100.0, 101.0])
+    assert not _converged([50.0, 100.0, 30.0, 160.0, 90.0, 20.0, 140.0])
+
+
+def test_speed_trials_aggregate_statistics():
+    with tempfile.TemporaryDirectory() as d:
+        res = run_speed_trials(d, trials=3, warmup=1, file_size_mb=8)
+        assert res["trials"] == 3 and len(res["runs"]) == 3
+        assert res["write_mb_s"] == res["stats"]["write_mb_s"]["median"]
+        assert res["stats"]["best_mb_s"]["n"] >= 2
+
+
+@pytest.mark.parametrize("backend", backend_names())
+def test_speed_io_backends(backend):
+    with tempfile.TemporaryDirectory() as d:
+        try:
+            res = run_disk_speed_test(d, file_size_mb=8, backend=backend, jobs=2)
+        except BackendUnavailable:
+            pytest.skip(f"{backend} not usable on this filesystem/platform")
+        assert res["io_backend"] == backend
+        assert res["write_mb_s"] > 0 and res["read_mb_s"] > 0
+
+
+def test_iter_speed_test_streams_phases_progress_and_result():
+    with tempfile.TemporaryDirectory() as d:
+        events = list(iter_disk_speed_test(d, file_size_mb=32, progress_interval_s=0.001))
+        kinds = [e["event"] for e in events]
+        assert kinds[0] == "phase" and events[0]["phase"] == "write"
+        assert kinds[-1] == "result" and kinds.count("result") == 1
+        assert [e["phase"] for e in events if e["event"] == "phase"] == ["write", "read"]
+        for e in events:
+            if e["event"] == "progress":
+                assert 0 <= e["bytes_done"] <= e["bytes_total"]
+                assert format_progress(e)
+        assert events[-1]["result"]["read_mb_s"] > 0
+
+
+def test_cancel_stops_promptly_and_removes_temp_file():
+    with tempfile.TemporaryDirectory() as d:
+        cancel = threading.Event()
+        with pytest.raises(SpeedTestCancelled):
+            for ev in iter_disk_speed_test(d, file_size_mb=4096, cancel=cancel, progress_interval_s=0.05):
+                if ev["event"] == "progress":
+                    cancel.set()
+        assert os.listdir(d) == []
+
+
+def test_multi_device_reports_per_device_and_aggregate():
+    with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+        res = run_multi_device_test([a, b], file_size_mb=8)
+        assert res["workload"] == "multi"
+        assert [dev["path"] for dev in res["devices"]] == [a, b]
+        for dev in res["devices"]:
+            assert dev["result"]["write_mb_s"] > 0
+            assert dev["solo"]["read_mb_s"] > 0
+            assert dev["contended"] in (True, False)
+        agg = res["aggregate"]
+        assert agg["write_mb_s"] == pytest.approx(sum(dev["result"]["write_mb_s"] for dev in res["devices"]))
+        assert res["contention"] == bool(res["contended_paths"])
+        assert os.listdir(a) == [] and os.listdir(b) == []
+        with pytest.raises(ValueError):
+            run_multi_device_test([a, a], file_size_mb=8)
@@ -0,0 +1,21 @@
+from usb_cable_tester.stats import reject_outliers, summarize
+
+
+def test_summarize_rejects_outliers_and_reports_ci():
+    s = summarize([100.0, 102.0, 98.0, 101.0, 99.0, 20.0])
+    assert s["rejected"] == [20.0]
+    assert s["n"] == 5
+    assert s["median"] == 100.0
+    assert s["min"] == 98.0 and s["max"] == 102.0
+    assert s["ci95_low"] < s["mean"] < s["ci95_high"]
+
+
+def test_summarize_single_and_empty():
+    assert summarize([])["n"] == 0
+    s = summarize([42.0])
+    assert s["median"] == 42.0 and s["ci95_low"] is None
+
+
+def test_reject_outliers_keeps_at_least_half():
+    assert reject_outliers([1.0, 1.0, 1.0, 1.0]) == [1.0, 1.0, 1.0, 1.0]
+    assert len(reject_outliers([1.0, 1.1, 50.0, 60.0, 70.0])) >= 3
@@ -0,0 +1,111 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from usb_cable_tester import store
+from usb_cable_tester.store import DB_FILE, LEGACY_DB_FILE, compact, iter_results, rewrite_lines, save_result
+
+
+def test_concurrent_saves_append_every_record(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+
+    def saver(n):
+        for i in range(25):
+            save_result({"label": f"{n}-{i}"}, path)
+
+    threads = [threading.Thread(target=saver, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    labels = [r["label"] for r in iter_results(path)]
+    assert sorted(labels) == sorted(f"{n}-{i}" for n in range(4) for i in range(25))
+    assert [lab for lab in labels if lab.startswith("2-")] == [f"2-{i}" for i in range(25)]
+
+
+def test_torn_tail_starts_a_new_line_and_is_compacted(tmp_path):
+    path = tmp_path / "results.jsonl"
+    save_result({"label": "A"}, str(path))
+    with open(path, "a") as fh:
+        fh.write('{"label": "cut sho')  # a crash mid-write
+    save_result({"label": "B"}, str(path))
+    assert [r["label"] for r in iter_results(str(path))] == ["A", "B"]
+    assert path.read_text().splitlines() == ['{"label": "A"}', '{"label": "B"}']
+    assert (tmp_path / "results.jsonl.corrupt").read_text() == '{"label": "cut sho\n'
+
+
+def test_compaction_due_after_growth(tmp_path, monkeypatch):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"label": "A"}\nnot json\n')
+    monkeypatch.setattr(store, "COMPACT_GROWTH_BYTES", 10)
+    save_result({"label": "B"}, str(path))
+    assert path.read_text().splitlines() == ['{"label": "A"}', '{"label": "B"}']
+    # Growth is measured from the compacted size, not the start of the log
+    monkeypatch.setattr(store, "COMPACT_GROWTH_BYTES", 25)
+    path.write_text(path.read_text() + "[1]\n")
+    save_result({"label": "C"}, str(path))
+    assert "[1]" in path.read_text()
+
+
+def test_legacy_array_is_migrated_beside_default_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = [{"label": "old-1"}, {"label": "old-2"}]
+    (tmp_path / LEGACY_DB_FILE).write_text(json.dumps(legacy, indent=2))
+    save_result({"label": "new"})
+    assert [r["label"] for r in iter_results()] == ["old-1", "old-2", "new"]
+    assert not (tmp_path / LEGACY_DB_FILE).exists()
+    assert json.loads((tmp_path / (LEGACY_DB_FILE + ".bak")).read_text()) == legacy
+    assert (tmp_path / DB_FILE).read_text().count("\n") == 3
+
+
+def test_legacy_name_holding_json_lines_is_adopted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / LEGACY_DB_FILE).write_text('{"label": "A"}\n{"label": "B"}\n')
+    save_result({"label": "C"})
+    assert [r["label"] for r in iter_results()] == ["A", "B", "C"]
+    assert not list(tmp_path.glob("*.corrupt"))
+
+
+def test_corrupt_legacy_array_keeps_decoded_records(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text('[{"label": "A"}, {"label": "B"}, {"lab')
+    assert [r["label"] for r in iter_results(str(path))] == ["A", "B"]
+    assert (tmp_path / "results.json.corrupt").read_text().endswith('{"lab')
+
+
+def test_rewrite_carries_over_records_saved_meanwhile(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    for label in ("A", "B"):
+        save_result({"label": label}, path)
+
+    def transform(lines):
+        for line in lines:
+            save_result({"label": "during"}, path)  # not blocked by the rewrite
+            rec = json.loads(line)
+            rec["seen"] = True
+            yield json.dumps(rec)
+
+    rewrite_lines(transform, path)
+    assert [(r["label"], r.get("seen", False)) for r in iter_results(path)] == [
+        ("A", True),
+        ("B", True),
+        ("during", False),
+        ("during", False),
+    ]
+    assert compact(path) == {"kept": 4, "moved": 0}
+    assert not os.path.exists(path + ".corrupt")
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_rewrites_keep_the_log_mode(tmp_path):
+    legacy = tmp_path / "results.json"
+    legacy.write_text('[{"label": "A"}]')
+    os.chmod(legacy, 0o640)
+    save_result({"label": "B"}, str(legacy))
+    assert stat.S_IMODE(os.stat(legacy).st_mode) == 0o640
+    os.chmod(legacy, 0o664)
+    compact(str(legacy))
+    assert stat.S_IMODE(os.stat(legacy).st_mode) == 0o664
@@ -0,0 +1,102 @@
+import time
+
+from usb_cable_tester import system_info as sysinfo
+
+
+def test_probe_sections_run_concurrently_under_one_deadline():
+    sections = {
+        "hung": lambda: {"out": sysinfo._run(["sleep", "5"])[0]},
+        "slow": lambda: {"out": sysinfo._run(["sleep", "0.3"])[0]},
+        "missing": lambda: {} if sysinfo._run(["no-such-tool-plugiq", "--x"])[0] == 127 else {"x": 1},
+        "ok": lambda: {"value": 1},
+    }
+    start = time.monotonic()
+    data, status = sysinfo._probe_sections(sections, budget_s=0.8)
+    elapsed = time.monotonic() - start
+    assert elapsed < 2.0
+    assert status["hung"]["status"] == "timed-out"
+    assert data["hung"] == {"out": 124}
+    assert status["slow"]["status"] == "ok" and data["slow"] == {"out": 0}
+    assert status["missing"] == {"status": "missing-tool", "elapsed_s": status["missing"]["elapsed_s"], "missing": ["no-such-tool-plugiq"]}
+    assert status["ok"]["status"] == "ok" and data["ok"] == {"value": 1}
+
+
+def test_get_system_info_reports_probe_status():
+    info = sysinfo.get_system_info()
+    if "probe" in info:
+        assert set(info["probe"]["sections"]) <= {"usb", "thunderbolt", "typec", "display"}
+        assert all(s["status"] in ("ok", "timed-out", "missing-tool", "error") for s in info["probe"]["sections"].values())
+
+
+def _fake_sections(calls):
+    def probe(sections, budget_s):
+        calls.append(sorted(sections))
+        return {n: {"n": len(calls)} for n in sections}, {n: {"status": "ok", "elapsed_s": 0.0} for n in sections}
+
+    return probe
+
+
+def test_probe_cache_ttl_and_topology_invalidation(monkeypatch):
+    calls = []
+    topology = ["a"]
+    monkeypatch.setattr(sysinfo, "_probe_sections", _fake_sections(calls))
+    monkeypatch.setattr(sysinfo, "_topology_fingerprint", lambda sysfs_root: tuple(topology))
+    sysinfo.clear_probe_cache()
+    try:
+        first = sysinfo.get_system_info(cache_ttl_s=60, os_name="linux")
+        again = sysinfo.get_system_info(cache_ttl_s=60, os_name="linux")
+        assert len(calls) == 1
+        assert again["probe"]["cached"] is True and "cached" not in first["probe"]
+        topology.append("b")  # a device was attached
+        sysinfo.get_system_info(cache_ttl_s=60, os_name="linux")
+        assert len(calls) == 2
+        sysinfo.get_system_info(cache_ttl_s=60, refresh=True, os_name="linux")
+        sysinfo.get_system_info(cache_ttl_s=0, os_name="linux")
+        assert len(calls) == 4
+    finally:
+        sysinfo.clear_probe_cache()
+
+
+def test_no_topology_fingerprint_means_no_cache(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(sysinfo, "_probe_sections", _fake_sections(calls))
+    assert sysinfo._topology_fingerprint(str(tmp_path)) is None  # no sysfs, as on macOS
+    sysinfo.clear_probe_cache()
+    try:
+        for _ in range(2):
+            info = sysinfo.get_system_info(cache_ttl_s=300, sysfs_root=str(tmp_path), os_name="darwin")
+            assert "cached" not in info["probe"]
+        assert len(calls) == 2
+    finally:
+        sysinfo.clear_probe_cache()
+
+
+def test_sections_and_lazy_info_probe_only_what_is_used(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sysinfo, "_probe_sections", _fake_sections(calls))
+    monkeypatch.setattr(sysinfo, "_topology_fingerprint", lambda sysfs_root: ())
+    sysinfo.clear_probe_cache()
+    try:
+        info = sysinfo.get_system_info(sections=["usb"], os_name="linux")
+        assert set(info) == {"os", "usb", "probe"} and calls == [["usb"]]
+        # Cached sections are reused; only the missing ones are probed
+        sysinfo.get_system_info(sections=["usb", "typec"], os_name="linux")
+        assert calls[-1] == ["typec"]
+
+        lazy = sysinfo.lazy_system_info(os_name="linux")
+        assert lazy["os"] == "linux" and len(calls) == 2
+        assert lazy.get("display") == {"n": 3} and calls[-1] == ["display"]
+        assert set(lazy.loaded()) == {"os", "display", "probe"}
+        full = sysinfo.materialize(lazy)
+        assert calls[-1] == ["thunderbolt"]
+        assert set(full) == {"os", "usb", "thunderbolt", "typec", "display", "probe"}
+    finally:
+        sysinfo.clear_probe_cache()
+
+
+def test_probe_ttl_env_is_parsed_defensively(monkeypatch):
+    for raw, expected in (("12.5", 12.5), ("-3", 0.0), ("soon", 30.0), ("", 30.0)):
+        monkeypatch.setenv("USBCT_PROBE_TTL", raw)
+        assert sysinfo._env_ttl("USBCT_PROBE_TTL", 30.0) == expected
+    monkeypatch.delenv("USBCT_PROBE_TTL")
+    assert sysinfo._env_ttl("USBCT_PROBE_TTL", 30.0) == 30.0
@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+from usb_cable_tester.tui import _SpeedWorker, _gauge, _sparkline
+
+
+def test_sparkline_and_gauge():
+    assert _sparkline([0.0, 50.0, 100.0], 10) == "▁▅█"
+    assert len(_sparkline(list(range(100)), 20)) == 20
+    assert _gauge(0.5, 10) == "[#####-----]"
+
+
+def test_speed_worker_cancel_cleans_up():
+    with tempfile.TemporaryDirectory() as d:
+        worker = _SpeedWorker(d, 4096)
+        worker.start()
+        ev = worker.events.get(timeout=10)
+        assert ev["event"] == "phase"
+        worker.stop()
+        events = []
+        while not worker.events.empty():
+            events.append(worker.events.get())
+        assert events[-1]["event"] == "cancelled"
+        assert os.listdir(d) == []
@@ -0,0 +1,45 @@
+import os
+
+from usb_cable_tester import system_info as sysinfo
+from usb_cable_tester.classify import classify_result
+from usb_cable_tester.usb_sysfs import enumerate_usb_devices
+
+
+def _device(root, name, **attrs):
+    path = os.path.join(root, "bus", "usb", "devices", name)
+    os.makedirs(path)
+    for key, value in attrs.items():
+        with open(os.path.join(path, key), "w") as fh:
+            fh.write(f"{value}\n")
+
+
+def _fixture(tmp_path):
+    root = str(tmp_path)
+    _device(root, "usb2", busnum=2, devnum=1, speed=10000, version=" 3.10", bDeviceClass="09", maxchild=4)
+    _device(root, "2-1", busnum=2, devnum=3, devpath=1, speed=5000, version=" 3.20", idVendor="0781",
+            idProduct="5583", manufacturer="SanDisk", product="Extreme", maxchild=0, rx_lanes=1, tx_lanes=1)
+    _device(root, "2-1:1.0", bInterfaceClass="08")
+    _device(root, "usb1", busnum=1, devnum=1, speed=480, version=" 2.00", bDeviceClass="09", maxchild=12)
+    _device(root, "1-3.2", busnum=1, devnum=5, speed=1.5, idVendor="046d", idProduct="c077", product="Mouse")
+    return root
+
+
+def test_enumerate_usb_devices_reads_structured_records(tmp_path):
+    devices = enumerate_usb_devices(_fixture(tmp_path))
+    assert [d["name"] for d in devices] == ["usb1", "1-3.2", "usb2", "2-1"]
+    ssd = devices[-1]
+    assert ssd["speed_mbps"] == 5000 and ssd["version"] == "3.20"
+    assert ssd["vendor_id"] == "0781" and ssd["product"] == "Extreme"
+    assert ssd["parent"] == "usb2" and ssd["root_hub"] is False
+    assert devices[1]["speed_mbps"] == 1.5 and devices[1]["parent"] == "1-3"
+    assert devices[0]["root_hub"] is True and devices[0]["maxchild"] == 12
+    assert enumerate_usb_devices(str(tmp_path / "missing")) == []
+
+
+def test_classify_uses_negotiated_device_speed(tmp_path):
+    usb = sysinfo._linux_usb_info(_fixture(tmp_path))
+    assert usb["source"] == "sysfs"
+    out = classify_result({"os": "linux", "usb": usb}, None)
+    # The 10 Gb/s root hub is port capability, not the cable's link
+    assert out["summary"] == "USB 3.2 Gen 1 (5 Gb/s)"
+    assert "2-1 SanDisk Extreme (0781:5583) negotiated 5000M" in out["reasons"][0]
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+from usb_cable_tester import volumes
+
+
+def _tree(tmp_path):
+    disk = tmp_path / "sys/devices/pci0000:00/0000:00:14.0/usb2/2-1/2-1:1.0/host0/block/sda"
+    (disk / "sda1").mkdir(parents=True)
+    (disk / "dev").write_text("8:0\n")
+    (disk / "removable").write_text("0\n")
+    (disk / "sda1/partition").write_text("1\n")
+    (disk / "sda1/dev").write_text("8:1\n")
+    (disk / "sda1/size").write_text("2000000\n")
+    (tmp_path / "sys/block").mkdir()
+    os.symlink(disk, tmp_path / "sys/block/sda")
+    (tmp_path / "dev/disk/by-label").mkdir(parents=True)
+    (tmp_path / "dev/sda1").touch()
+    os.symlink("../../sda1", tmp_path / "dev/disk/by-label/My\\x20Disk")
+    for d in ("usb", "share", "btrfs"):
+        (tmp_path / d).mkdir()
+    (tmp_path / "mountinfo").write_text(
+        f"22 1 8:1 / {tmp_path}/usb rw - exfat /dev/sda1 rw\n"
+        f"23 1 0:50 / {tmp_path}/share rw - nfs server:/export rw\n"
+        f"24 1 0:27 / {tmp_path}/tmp rw - tmpfs tmpfs rw\n"
+        "25 1 8:1 / /proc/fake rw - exfat /dev/sda1 rw\n"
+        # btrfs reports an anonymous device; the source names the partition
+        f"26 1 0:61 / {tmp_path}/btrfs rw - btrfs /dev/sda1 rw\n"
+    )
+
+
+def test_linux_volumes_from_sysfs_with_hung_statvfs(tmp_path, monkeypatch):
+    _tree(tmp_path)
+    release = threading.Event()
+    real_statvfs = os.statvfs
+
+    def statvfs(path):
+        if path.endswith("share"):
+            release.wait(5)  # a dead NFS server
+        return real_statvfs(path)
+
+    monkeypatch.setattr(volumes.os, "statvfs", statvfs)
+    start = time.monotonic()
+    try:
+        vols = volumes._linux_list_volumes(
+            str(tmp_path / "mountinfo"), str(tmp_path / "sys"), str(tmp_path / "dev"), statvfs_timeout_s=0.3
+        )
+        elapsed = time.monotonic() - start
+        # A second listing skips the still-stuck mount instead of piling up threads
+        again = volumes._linux_list_volumes(
+            str(tmp_path / "mountinfo"), str(tmp_path / "sys"), str(tmp_path / "dev"), statvfs_timeout_s=0.3
+        )
+    finally:
+        release.set()
+    assert elapsed < 2.0
+    usb, share, btrfs = vols
+    assert usb.mount_point == f"{tmp_path}/usb" and usb.label == "My Disk" and usb.is_external is True
+    assert usb.fs_type == "exfat" and usb.free_gb is not None and usb.size_gb > 0
+    assert share.is_network is True and share.is_external is None
+    assert share.size_gb is None and share.free_gb is None
+    assert again[1].free_gb is None
+    assert btrfs.fs_type == "btrfs" and btrfs.is_external is True and btrfs.label == "My Disk"
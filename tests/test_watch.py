@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import tempfile
+
+from usb_cable_tester.watch import FileSource, Watcher, find_mount, parse_uevent
+
+
+USB_DEV = "/devices/pci0000:00/0000:00:14.0/usb2/2-1"
+EVENTS = [
+    {"ACTION": "add", "DEVPATH": USB_DEV, "SUBSYSTEM": "usb", "DEVTYPE": "usb_device", "PRODUCT": "781/5583/100"},
+    {"ACTION": "add", "DEVPATH": USB_DEV + "/2-1:1.0/host0/target0:0:0/0:0:0:0/block/sdb", "SUBSYSTEM": "block", "DEVNAME": "sdb", "DEVTYPE": "disk"},
+    {"ACTION": "add", "DEVPATH": USB_DEV + "/2-1:1.0/host0/target0:0:0/0:0:0:0/block/sdb/sdb1", "SUBSYSTEM": "block", "DEVNAME": "sdb1", "DEVTYPE": "partition"},
+    {"ACTION": "add", "DEVPATH": "/devices/pci0000:00/0000:00:1f.2/ata1/host1/block/sda", "SUBSYSTEM": "block", "DEVNAME": "sda", "DEVTYPE": "disk"},
+]
+
+
+def test_parse_uevent():
+    env = parse_uevent(b"add@/devices/x\0ACTION=add\0DEVPATH=/devices/x\0SUBSYSTEM=usb\0")
+    assert env == {"ACTION": "add", "DEVPATH": "/devices/x", "SUBSYSTEM": "usb"}
+    assert parse_uevent(b"libudev\0\xfe\xed") is None
+
+
+def _watch(d, mount_dir):
+    events = os.path.join(d, "events.jsonl")
+    with open(events, "w") as fh:
+        fh.write("".join(json.dumps(e) + "\n" for e in EVENTS))
+    mounts = os.path.join(d, "mountinfo")
+    with open(mounts, "w") as fh:
+        fh.write(
+            "22 1 8:2 / / rw - ext4 /dev/sda2 rw\n"
+            "40 22 8:17 / %s rw,nosuid - exfat /dev/sdb1 rw\n" % mount_dir.replace(" ", "\\040")
+        )
+    assert find_mount("sdb1", mounts) == mount_dir
+
+    ran, results = [], []
+    watcher = Watcher(
+        [{"PRODUCT": "781/5583/*"}],
+        on_result=results.append,
+        mounts_path=mounts,
+        mount_timeout_s=0.1,
+        runner=lambda path, profile: ran.append((path, profile)) or {"write_mb_s": 400.0, "read_mb_s": 420.0},
+        probe=lambda: {"os": "linux"},
+        log=io.StringIO(),
+    )
+    assert watcher.run(FileSource(events)) == 1
+    return ran, results
+
+
+def test_watcher_replays_events_and_tests_mounted_usb_partition():
+    with tempfile.TemporaryDirectory() as d:
+        ssd = os.path.join(d, "My SSD")
+        os.mkdir(ssd)
+        ran, results = _watch(d, ssd)
+        assert ran == [(ssd, "quick")]
+        assert results[0]["device"]["devname"] == "sdb1"
+        assert results[0]["device"]["product"] == "781/5583/100"
+        assert results[0]["classification"]["summary"]
+        assert isinstance(results[0]["warnings"], list)
+
+
+def test_watcher_records_failed_preflight_without_testing():
+    with tempfile.TemporaryDirectory() as d:
+        ran, results = _watch(d, os.path.join(d, "not mounted"))
+        assert ran == []
+        assert results[0]["speed_test"] is None and results[0]["error"] == "Test path is not a directory"
+
+
+def test_find_mount_skips_hidden_mounts(tmp_path):
+    info = tmp_path / "mountinfo"
+    info.write_text(
+        "22 1 8:2 / / rw - ext4 /dev/sda2 rw\n"
+        "40 22 8:17 / /media/usb rw - exfat /dev/sdb1 rw\n"
+        "41 40 0:30 / /media/usb rw - tmpfs tmpfs rw\n"
+    )
+    assert find_mount("sda2", str(info)) == "/"
+    assert find_mount("sdb1", str(info)) is None  # mounted over
+    assert find_mount("sdc1", str(info)) is None
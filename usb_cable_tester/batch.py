@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import json
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, IO, List, Optional
+
+from . import system_info as sysinfo
+from .classify import classify_result
+from .patterns import PATTERN_MODES
+from .safety import SafetyError, preflight_checks
+from .speed_test import consume_speed_events, iter_disk_speed_test
+from .store import save_result
+
+
+# A probe is reused for later cables until it is this old, or until the USB
+# topology changes (see system_info.get_system_info). The negotiated link speeds
+# change with every cable, but unplugging the drive to swap its cable removes
+# and re-creates its device entries, which changes the topology fingerprint and
+# forces a new probe. Without sysfs (macOS, Windows) every cable is probed.
+PROBE_TTL_S = 300.0
+
+
+def load_manifest(path: str, default_size_mb: int = 1024) -> List[Dict[str, Any]]:
+    """
+    Read a batch manifest: one cable per row with "path" (required), "label"
+    and "size_mb". CSV files need a header row; .json holds a list of objects
+    and .jsonl one object per line.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in fh if line.strip()]
+        elif path.endswith(".json"):
+            rows = json.load(fh)
+            if not isinstance(rows, list):
+                raise ValueError("JSON manifest must be a list of objects")
+        else:
+            rows = list(csv.DictReader(fh))
+
+    entries = []
+    for n, row in enumerate(rows, 1):
+        if not isinstance(row, dict) or not str(row.get("path") or "").strip():
+            raise ValueError(f"manifest entry {n}: missing path")
+        size = row.get("size_mb")
+        try:
+            size_mb = int(size) if size not in (None, "") else default_size_mb
+        except (TypeError, ValueError):
+            raise ValueError(f"manifest entry {n}: invalid size_mb {size!r}")
+        if size_mb <= 0:
+            raise ValueError(f"manifest entry {n}: size_mb must be positive")
+        label = row.get("label")
+        entries.append(
+            {
+                "label": str(label).strip() or None if label is not None else None,
+                "path": str(row["path"]).strip(),
+                "size_mb": size_mb,
+            }
+        )
+    return entries
+
+
+def _prompt_next(entry: Dict[str, Any]) -> str:
+    # Prompts go to stderr so JSONL on stdout stays machine-readable
+    name = entry["label"] or entry["path"]
+    sys.stderr.write(f"Connect cable {name} ({entry['path']}), then Enter to test, s to skip, q to stop: ")
+    sys.stderr.flush()
+    ans = sys.stdin.readline()
+    if not ans:
+        return "quit"
+    ans = ans.strip().lower()
+    return {"s": "skip", "q": "quit"}.get(ans[:1], "run")
+
+
+def run_batch(
+    entries: List[Dict[str, Any]],
+    out: IO[str],
+    confirm: Optional[Callable[[Dict[str, Any]], str]] = None,
+    probe_ttl_s: float = PROBE_TTL_S,
+    save: bool = False,
+    show_progress: bool = False,
+    probe: Optional[Callable[[], Dict[str, Any]]] = None,
+    **speed_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Test each manifest entry in turn and write one JSON line per cable to
+    `out` as soon as it finishes. `confirm(entry)` is asked before every cable
+    and returns "run", "skip" or "quit"; None runs the queue unattended.
+    The system probe is reused from the probe cache while younger than
+    probe_ttl_s and the USB topology is unchanged.
+    A failing cable is recorded with an "error" and the queue continues.
+    Returns counts of tested, skipped and failed cables.
+    """
+    if probe is None:
+        probe = functools.partial(sysinfo.get_system_info, cache_ttl_s=probe_ttl_s)
+    summary = {"total": len(entries), "tested": 0, "skipped": 0, "failed": 0, "probes": 0}
+    for idx, entry in enumerate(entries, 1):
+        action = confirm(entry) if confirm else "run"
+        if action == "quit":
+            break
+        if action == "skip":
+            summary["skipped"] += 1
+            continue
+
+        info = probe()
+        meta = info.get("probe") or {}
+        if not meta.get("cached"):
+            summary["probes"] += 1
+        record: Dict[str, Any] = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "index": idx,
+            "label": entry["label"],
+            "system": info,
+            "probe_age_s": meta.get("age_s", 0.0),
+        }
+        try:
+            _, warnings = preflight_checks(entry["path"], entry["size_mb"])
+            speed = consume_speed_events(
+                iter_disk_speed_test(entry["path"], file_size_mb=entry["size_mb"], **speed_kwargs),
+                show_progress,
+            )
+            record["warnings"] = warnings
+            record["speed_test"] = speed
+            record["classification"] = classify_result(info=info, speed_result=speed)
+            summary["tested"] += 1
+        except (SafetyError, OSError, RuntimeError, ValueError) as e:
+            record["speed_test"] = None
+            record["error"] = str(e)
+            summary["failed"] += 1
+        if save and "error" not in record:
+            record["saved_to"] = save_result(record)
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="plugiq batch",
+        description="Test a queue of cables from a manifest (CSV with label,path,size_mb columns, .json or .jsonl), "
+        "streaming one JSON line per cable.",
+    )
+    parser.add_argument("manifest", help="Manifest file")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file, appended to (default stdout)")
+    parser.add_argument("-y", "--yes", action="store_true", help="Do not pause for confirmation between cables")
+    parser.add_argument("-s", "--file-size-mb", type=int, default=1024, help="Size for entries without size_mb (default 1024)")
+    parser.add_argument("--auto-size", action="store_true", help="Stop writing once throughput converges; size_mb becomes the cap")
+    parser.add_argument("--pattern", choices=list(PATTERN_MODES), default="random", help="Write data pattern (default random)")
+    parser.add_argument("--no-cache-bypass", action="store_true", help="Read back through the OS page cache")
+    parser.add_argument("--probe-ttl", type=float, default=PROBE_TTL_S, help=f"Reuse the system probe for this many seconds (default {PROBE_TTL_S:.0f})")
+    parser.add_argument("-S", "--save", action="store_true", help="Also save each result to the results history")
+    args = parser.parse_args(argv)
+
+    try:
+        entries = load_manifest(args.manifest, default_size_mb=args.file_size_mb)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not entries:
+        parser.error("manifest has no entries")
+
+    out = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    try:
+        summary = run_batch(
+            entries,
+            out,
+            confirm=None if args.yes else _prompt_next,
+            probe_ttl_s=args.probe_ttl,
+            save=args.save,
+            show_progress=sys.stderr.isatty(),
+            bypass_cache=not args.no_cache_bypass,
+            pattern=args.pattern,
+            auto_size=args.auto_size,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    sys.stderr.write(
+        f"Batch: {summary['tested']} tested, {summary['skipped']} skipped, {summary['failed']} failed "
+        f"of {summary['total']} ({summary['probes']} system probe(s))\n"
+    )
+    return 1 if summary["failed"] else 0
@@ -1,167 +1,243 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-import json
-
-
-def _pick_speed_class(write_mb_s: Optional[float], read_mb_s: Optional[float]) -> Optional[str]:
-    if write_mb_s is None and read_mb_s is None:
-        return None
-    best = max(v for v in [write_mb_s or 0.0, read_mb_s or 0.0])
-    # Very rough mapping; device may be the bottleneck.
-    # Thresholds chosen conservatively to avoid over-claiming.
-    if best < 80:
-        return "USB 2.0 (Hi-Speed, 480 Mb/s theoretical)"
-    if best < 450:
-        return "USB 3.2 Gen 1 (5 Gb/s)"
-    if best < 900:
-        return "USB 3.2 Gen 2 (10 Gb/s)"
-    if best < 1700:
-        return "USB 3.2 Gen 2x2 (20 Gb/s) or USB4/TB (20 Gb/s)"
-    return "USB4 / Thunderbolt (40 Gb/s class)"
-
-
-def _mac_infer(usb: Optional[Dict[str, Any]], tb: Optional[Dict[str, Any]], reasons: List[str], display: Optional[Dict[str, Any]] = None) -> Optional[str]:
-    # Check Thunderbolt link status first
-    if tb:
-        links = []
-        if tb.get("data"):
-            # Search recursively for link speeds
-            import json
-
-            content = json.dumps(tb["data"]).lower()
-            if "40 gb/s" in content:
-                reasons.append("Thunderbolt link reports 40 Gb/s")
-                return "Thunderbolt 3/4 (40 Gb/s) or USB4"
-            if "20 gb/s" in content:
-                reasons.append("Thunderbolt link reports 20 Gb/s")
-                return "Thunderbolt / USB4 (20 Gb/s)"
-        if tb.get("links"):
-            lstr = " ".join(tb["links"]).lower()
-            if "40 gb/s" in lstr:
-                reasons.append("Thunderbolt link reports 40 Gb/s")
-                return "Thunderbolt 3/4 (40 Gb/s) or USB4"
-            if "20 gb/s" in lstr:
-                reasons.append("Thunderbolt link reports 20 Gb/s")
-                return "Thunderbolt / USB4 (20 Gb/s)"
-
-    # USB bus advertised speeds (system_profiler text)
-    if usb and usb.get("speeds"):
-        text = " ".join(usb["speeds"]).lower()
-        if "10 gb/sec" in text:
-            reasons.append("USB bus advertises up to 10 Gb/s")
-            return "USB 3.2 Gen 2 (10 Gb/s)"
-        if "5 gb/sec" in text:
-            reasons.append("USB bus advertises up to 5 Gb/s")
-            return "USB 3.2 Gen 1 (5 Gb/s)"
-        if "20 gb/sec" in text:
-            reasons.append("USB bus advertises up to 20 Gb/s")
-            return "USB 3.2 Gen 2x2 (20 Gb/s)"
-        if "480 mb/sec" in text:
-            reasons.append("USB bus advertises up to 480 Mb/s")
-            return "USB 2.0 (Hi-Speed)"
-    # Display hints for DP Alt Mode
-    if display:
-        data = display.get("data") or []
-        text = json.dumps(data).lower()
-        if "connection type" in text and "usb-c" in text:
-            reasons.append("Display reports USB-C connection; DP Alt Mode likely")
-        lines = display.get("lines") or []
-        if lines:
-            lstr = " ".join(lines).lower()
-            if "usb-c" in lstr or "displayport" in lstr:
-                reasons.append("Display profile mentions USB-C/DisplayPort; DP Alt Mode likely")
-    # Thunderbolt text often includes cable hints
-    if tb and tb.get("source") == "system_profiler_text" and tb.get("raw"):
-        raw = str(tb.get("raw")).lower()
-        if "cable" in raw:
-            if "passive" in raw:
-                reasons.append("Thunderbolt profiler mentions a passive cable")
-            if "active" in raw:
-                reasons.append("Thunderbolt profiler mentions an active cable")
-    return None
-
-
-def _linux_infer(usb: Optional[Dict[str, Any]], typec: Optional[Dict[str, Any]], tb: Optional[Dict[str, Any]], reasons: List[str], display: Optional[Dict[str, Any]] = None) -> Optional[str]:
-    # Type-C identity if present
-    if typec and typec.get("ports"):
-        for p in typec["ports"]:
-            c = p.get("cable") or {}
-            # max speed or speed field may exist in some kernels
-            for key in ("max_speed", "speed"):
-                v = c.get(key)
-                if v:
-                    reasons.append(f"Type-C cable reports {key}={v}")
-                    try:
-                        n = int(v)
-                        if n >= 40000:
-                            return "USB4/TB (40 Gb/s)"
-                        if n >= 20000:
-                            return "USB 3.2 Gen 2x2 (20 Gb/s) or USB4"
-                        if n >= 10000:
-                            return "USB 3.2 Gen 2 (10 Gb/s)"
-                        if n >= 5000:
-                            return "USB 3.2 Gen 1 (5 Gb/s)"
-                        if n >= 480:
-                            return "USB 2.0 (480 Mb/s)"
-                    except ValueError:
-                        pass
-            if c.get("active"):
-                reasons.append(f"Cable active={c['active']}")
-    # Thunderbolt sysfs/boltctl
-    if tb:
-        text = " ".join((" ".join(tb.get("boltctl", [])) + " " + json.dumps(tb.get("sysfs", []))) if tb else "").lower()
-        if "40" in text and "gb/s" in text:
-            reasons.append("Thunderbolt stack indicates 40 Gb/s")
-            return "Thunderbolt 3/4 (40 Gb/s) or USB4"
-        if "20" in text and "gb/s" in text:
-            reasons.append("Thunderbolt stack indicates 20 Gb/s")
-            return "Thunderbolt / USB4 (20 Gb/s)"
-    # USB tree speeds suggest bus capability
-    if usb and usb.get("lsusb_tree"):
-        t = " ".join(usb["lsusb_tree"]).lower()
-        if "5000m" in t or "5g" in t:
-            reasons.append("USB tree shows 5000M link(s)")
-            return "USB 3.2 Gen 1 (5 Gb/s)"
-        if "10000m" in t or "10g" in t:
-            reasons.append("USB tree shows 10000M link(s)")
-            return "USB 3.2 Gen 2 (10 Gb/s)"
-        if "20000m" in t or "20g" in t:
-            reasons.append("USB tree shows 20000M link(s)")
-            return "USB 3.2 Gen 2x2 (20 Gb/s)"
-        if "480m" in t:
-            reasons.append("USB tree shows 480M link(s)")
-            return "USB 2.0 (480 Mb/s)"
-    # DP Alt Mode hints
-    if display:
-        drm = display.get("drm_connectors") or []
-        for c in drm:
-            if (c.get("status") == "connected") and (str(c.get("connector_type")) in ("DP", "DisplayPort")):
-                reasons.append("A DisplayPort connector is active; DP Alt Mode may be in use on a Type-C port")
-                break
-    return None
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from .usb_sysfs import describe
 
-def classify_result(info: Dict[str, Any], speed_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-    reasons: List[str] = []
-    osname = (info.get("os") or "").lower()
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One classification rule, evaluated against the structured fields that
+    extract_fields() pulls out of a probe. A rule with a summary matches when
+    its field is at least `at_least`; the highest-priority match decides the
+    summary. A rule without one is a hint: it adds its evidence whenever the
+    field is present. Evidence is formatted with the fields plus value (the
+    rule's field), rate (value as a link rate) and summary.
+    """
+
+    field: str
+    evidence: str
+    priority: int = 0
+    at_least: float = 0.0
     summary: Optional[str] = None
 
-    if osname == "darwin":
-        summary = _mac_infer(info.get("usb"), info.get("thunderbolt"), reasons, display=info.get("display"))
-    elif osname == "linux":
-        summary = _linux_infer(info.get("usb"), info.get("typec"), info.get("thunderbolt"), reasons, display=info.get("display"))
 
-    if not summary and speed_result:
-        cls = _pick_speed_class(speed_result.get("write_mb_s"), speed_result.get("read_mb_s"))
-        if cls:
-            reasons.append("Observed throughput suggests: " + cls)
-            summary = cls
+# Fields carrying link rates are in Mb/s; throughput_mb_s is in MB/s.
+RULES: Tuple[Rule, ...] = (
+    # Type-C cable identity (Linux sysfs)
+    Rule("typec_cable_mbps", "Type-C cable reports {typec_cable}", 100, 40000, "USB4/TB (40 Gb/s)"),
+    Rule("typec_cable_mbps", "Type-C cable reports {typec_cable}", 100, 20000, "USB 3.2 Gen 2x2 (20 Gb/s) or USB4"),
+    Rule("typec_cable_mbps", "Type-C cable reports {typec_cable}", 100, 10000, "USB 3.2 Gen 2 (10 Gb/s)"),
+    Rule("typec_cable_mbps", "Type-C cable reports {typec_cable}", 100, 5000, "USB 3.2 Gen 1 (5 Gb/s)"),
+    Rule("typec_cable_mbps", "Type-C cable reports {typec_cable}", 100, 480, "USB 2.0 (480 Mb/s)"),
+    # Thunderbolt link (system_profiler, boltctl, sysfs)
+    Rule("tb_link_mbps", "Thunderbolt link reports {rate}", 90, 40000, "Thunderbolt 3/4 (40 Gb/s) or USB4"),
+    Rule("tb_link_mbps", "Thunderbolt link reports {rate}", 90, 20000, "Thunderbolt / USB4 (20 Gb/s)"),
+    # Fastest negotiated link of an attached USB device (Linux sysfs)
+    Rule("usb_link_mbps", "USB device {usb_link_device} negotiated {value:g}M", 80, 20000, "USB 3.2 Gen 2x2 (20 Gb/s)"),
+    Rule("usb_link_mbps", "USB device {usb_link_device} negotiated {value:g}M", 80, 10000, "USB 3.2 Gen 2 (10 Gb/s)"),
+    Rule("usb_link_mbps", "USB device {usb_link_device} negotiated {value:g}M", 80, 5000, "USB 3.2 Gen 1 (5 Gb/s)"),
+    Rule("usb_link_mbps", "USB device {usb_link_device} negotiated {value:g}M", 80, 480, "USB 2.0 (480 Mb/s)"),
+    # Bus speed advertised by system_profiler text output (macOS)
+    Rule("usb_advertised_mbps", "USB bus advertises up to {rate}", 75, 20000, "USB 3.2 Gen 2x2 (20 Gb/s)"),
+    Rule("usb_advertised_mbps", "USB bus advertises up to {rate}", 75, 10000, "USB 3.2 Gen 2 (10 Gb/s)"),
+    Rule("usb_advertised_mbps", "USB bus advertises up to {rate}", 75, 5000, "USB 3.2 Gen 1 (5 Gb/s)"),
+    Rule("usb_advertised_mbps", "USB bus advertises up to {rate}", 75, 480, "USB 2.0 (Hi-Speed)"),
+    # Device links in lsusb -t output (older probes, no sysfs)
+    Rule("usb_tree_mbps", "USB tree shows {value:g}M link(s)", 70, 20000, "USB 3.2 Gen 2x2 (20 Gb/s)"),
+    Rule("usb_tree_mbps", "USB tree shows {value:g}M link(s)", 70, 10000, "USB 3.2 Gen 2 (10 Gb/s)"),
+    Rule("usb_tree_mbps", "USB tree shows {value:g}M link(s)", 70, 5000, "USB 3.2 Gen 1 (5 Gb/s)"),
+    Rule("usb_tree_mbps", "USB tree shows {value:g}M link(s)", 70, 480, "USB 2.0 (480 Mb/s)"),
+    # Measured throughput, only when nothing above matched. Thresholds are
+    # conservative to avoid over-claiming; the device may be the bottleneck.
+    Rule("throughput_mb_s", "Observed throughput suggests: {summary}{throughput_basis}", 10, 1700, "USB4 / Thunderbolt (40 Gb/s class)"),
+    Rule("throughput_mb_s", "Observed throughput suggests: {summary}{throughput_basis}", 10, 900, "USB 3.2 Gen 2x2 (20 Gb/s) or USB4/TB (20 Gb/s)"),
+    Rule("throughput_mb_s", "Observed throughput suggests: {summary}{throughput_basis}", 10, 450, "USB 3.2 Gen 2 (10 Gb/s)"),
+    Rule("throughput_mb_s", "Observed throughput suggests: {summary}{throughput_basis}", 10, 80, "USB 3.2 Gen 1 (5 Gb/s)"),
+    Rule("throughput_mb_s", "Observed throughput suggests: {summary}{throughput_basis}", 10, 0, "USB 2.0 (Hi-Speed, 480 Mb/s theoretical)"),
+    # Hints
+    Rule("typec_cable_active", "Cable active={value}"),
+    Rule("display_usb_c", "Display reports USB-C connection; DP Alt Mode likely"),
+    Rule("display_mentions_usb_c", "Display profile mentions USB-C/DisplayPort; DP Alt Mode likely"),
+    Rule("tb_cable_passive", "Thunderbolt profiler mentions a passive cable"),
+    Rule("tb_cable_active", "Thunderbolt profiler mentions an active cable"),
+    Rule("dp_connected", "A DisplayPort connector is active; DP Alt Mode may be in use on a Type-C port"),
+)
+
+INSUFFICIENT = "Insufficient data to classify precisely"
+
+
+Compiled = Tuple[Dict[str, List[Rule]], Dict[str, List[Rule]]]
 
-    if not summary:
-        summary = "Insufficient data to classify precisely"
 
+def compile_rules(rules: Tuple[Rule, ...] = RULES) -> Compiled:
+    """
+    Index rules by field: (summary rules per field, best first; hints per
+    field in table order). Evaluation then touches only the fields a probe
+    actually produced instead of every rule.
+    """
+    by_field: Dict[str, List[Rule]] = {}
+    hints: Dict[str, List[Rule]] = {}
+    for rule in rules:
+        (by_field if rule.summary is not None else hints).setdefault(rule.field, []).append(rule)
+    for field_rules in by_field.values():
+        field_rules.sort(key=lambda r: (-r.priority, -r.at_least))
+    return by_field, hints
+
+
+_COMPILED = compile_rules()
+
+
+def _rate(mbps: float) -> str:
+    return f"{mbps / 1000:g} Gb/s" if mbps >= 1000 else f"{mbps:g} Mb/s"
+
+
+def _evidence(rule: Rule, fields: Dict[str, Any], summary: Optional[str] = None) -> str:
+    value = fields[rule.field]
+    rate = _rate(value) if "{rate}" in rule.evidence else None
+    return rule.evidence.format_map(dict(fields, value=value, rate=rate, summary=summary))
+
+
+def evaluate(fields: Dict[str, Any], compiled: Compiled = _COMPILED) -> Dict[str, Any]:
+    """Apply compiled rules to extracted fields; returns summary, reasons and the deciding rule."""
+    by_field, hints = compiled
+    best: Optional[Rule] = None
+    fired: List[Rule] = []
+    for field, value in fields.items():
+        for rule in by_field.get(field, ()):
+            if value >= rule.at_least:
+                if best is None or rule.priority > best.priority:
+                    best = rule
+                break
+        if value:
+            fired.extend(hints.get(field, ()))
+    reasons = [_evidence(best, fields, best.summary)] if best is not None else []
+    reasons += [_evidence(h, fields) for h in fired]
     return {
-        "summary": summary,
+        "summary": best.summary if best is not None else INSUFFICIENT,
         "reasons": reasons,
+        "rule": f"{best.field}>={best.at_least:g}" if best is not None else None,
     }
+
+
+# ------------------------- field extraction -------------------------
+
+_RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([gm])b(?:/s|/sec|ps)\b", re.IGNORECASE)
+_TREE_RATE_RE = re.compile(r"(\d+(?:\.\d+)?)([MG])\b")
+
+
+def _rates_mbps(text: str) -> List[float]:
+    # "Up to 10 Gb/sec" -> [10000.0]; "480 Mb/s" -> [480.0]
+    return [float(n) * (1000 if unit.lower() == "g" else 1) for n, unit in _RATE_RE.findall(text)]
+
+
+def _walk_strings(node: Any, key: str = "") -> Iterator[Tuple[str, str]]:
+    # (key, value) for every string in nested system_profiler JSON
+    if isinstance(node, dict):
+        for k, v in node.items():
+            yield from _walk_strings(v, str(k))
+    elif isinstance(node, list):
+        for v in node:
+            yield from _walk_strings(v, key)
+    elif isinstance(node, str):
+        yield key, node
+
+
+def _put_max(fields: Dict[str, Any], key: str, values: List[float]) -> None:
+    if values:
+        fields[key] = max(values + ([fields[key]] if key in fields else []))
+
+
+def _mac_fields(info: Dict[str, Any], fields: Dict[str, Any]) -> None:
+    tb = info.get("thunderbolt") or {}
+    _put_max(fields, "tb_link_mbps", [r for k, v in _walk_strings(tb.get("data") or []) if "speed" in k.lower() for r in _rates_mbps(v)])
+    _put_max(fields, "tb_link_mbps", [r for line in tb.get("links") or [] for r in _rates_mbps(line)])
+    if tb.get("source") == "system_profiler_text" and tb.get("raw"):
+        raw = str(tb["raw"]).lower()
+        if "cable" in raw:
+            fields["tb_cable_passive"] = "passive" in raw
+            fields["tb_cable_active"] = "active" in raw
+    usb = info.get("usb") or {}
+    _put_max(fields, "usb_advertised_mbps", [r for s in usb.get("speeds") or [] for r in _rates_mbps(s)])
+    display = info.get("display") or {}
+    for k, v in _walk_strings(display.get("data") or []):
+        if "connection" in k.lower() and "usb-c" in v.lower():
+            fields["display_usb_c"] = True
+    lines = " ".join(display.get("lines") or []).lower()
+    if "usb-c" in lines or "displayport" in lines:
+        fields["display_mentions_usb_c"] = True
+
+
+def _linux_fields(info: Dict[str, Any], fields: Dict[str, Any]) -> None:
+    typec = info.get("typec") or {}
+    for port in typec.get("ports") or []:
+        cable = port.get("cable") or {}
+        for key in ("max_speed", "speed"):
+            v = cable.get(key)
+            if not v:
+                continue
+            fields.setdefault("typec_cable", f"{key}={v}")
+            try:
+                _put_max(fields, "typec_cable_mbps", [float(int(v))])
+            except ValueError:
+                pass
+            break
+        if cable.get("active"):
+            fields.setdefault("typec_cable_active", cable["active"])
+    tb = info.get("thunderbolt") or {}
+    _put_max(fields, "tb_link_mbps", [r for line in tb.get("boltctl") or [] if "speed" in line.lower() for r in _rates_mbps(line)])
+    _put_max(fields, "tb_link_mbps", [r for dev in tb.get("sysfs") or [] for r in _rates_mbps(str(dev.get("speed") or ""))])
+    usb = info.get("usb") or {}
+    # Root hubs only show what the port could do, so they are left out
+    linked = [d for d in usb.get("devices") or [] if not d.get("root_hub") and (d.get("speed_mbps") or 0) >= 480]
+    if linked:
+        top = max(linked, key=lambda d: d["speed_mbps"])
+        fields["usb_link_mbps"] = top["speed_mbps"]
+        fields["usb_link_device"] = describe(top)
+    tree = []
+    for line in usb.get("lsusb_tree") or []:
+        if "root_hub" not in line:
+            tree += [float(n) * (1000 if unit == "G" else 1) for n, unit in _TREE_RATE_RE.findall(line.rsplit(",", 1)[-1])]
+    _put_max(fields, "usb_tree_mbps", tree)
+    for c in (info.get("display") or {}).get("drm_connectors") or []:
+        if c.get("status") == "connected" and str(c.get("connector_type")) in ("DP", "DisplayPort"):
+            fields["dp_connected"] = True
+
+
+def _throughput_fields(speed_result: Dict[str, Any], fields: Dict[str, Any]) -> None:
+    # Multi-trial results use the median of per-trial max(write, read) after
+    # outlier rejection; single runs fall back to max(write, read)
+    best = (speed_result.get("stats") or {}).get("best_mb_s") or {}
+    if best.get("median") is not None:
+        fields["throughput_mb_s"] = best["median"]
+        fields["throughput_basis"] = f" (median of {best['n']} trials)"
+        return
+    w, r = speed_result.get("write_mb_s"), speed_result.get("read_mb_s")
+    if w is not None or r is not None:
+        fields["throughput_mb_s"] = max(w or 0.0, r or 0.0)
+        fields["throughput_basis"] = ""
+
+
+def extract_fields(info: Dict[str, Any], speed_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The structured fields the rules read, pulled once from a probe and an optional speed result."""
+    fields: Dict[str, Any] = {}
+    osname = (info.get("os") or "").lower()
+    if osname == "darwin":
+        _mac_fields(info, fields)
+    elif osname == "linux":
+        _linux_fields(info, fields)
+    if speed_result:
+        _throughput_fields(speed_result, fields)
+    return fields
+
+
+def classify_result(info: Dict[str, Any], speed_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Lazily probed info (system_info.LazySystemInfo): fetch every section
+    # read below in one concurrent probe instead of one at a time
+    prefetch = getattr(info, "prefetch", None)
+    if prefetch is not None:
+        prefetch(("usb", "thunderbolt", "typec", "display"))
+    return evaluate(extract_fields(info, speed_result))
@@ -1,13 +1,25 @@
 import argparse
 import json
 import os
+import sys
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from . import __version__
 from . import system_info as sysinfo
-from .speed_test import run_disk_speed_test
+from .io_backends import BackendUnavailable, backend_names
+from .patterns import PATTERN_MODES
+from .speed_test import (
+    MEMORY_CEILING_MB,
+    consume_speed_events,
+    iter_disk_speed_test,
+    run_multi_device_test,
+    run_random_io_test,
+    run_speed_trials,
+    run_sustained_write_test,
+)
 from .classify import classify_result
+from .runner import command_log, format_command_log
 from .store import save_result
 
 
@@ -17,18 +29,78 @@ def _human_mb_s(v: Optional[float]) -> str:
     return f"{v:.1f} MB/s"
 
 
-def main() -> int:
+def _parse_size_bytes(text: str) -> int:
+    # "4096", "4k", "1m" -> bytes
+    t = text.strip().lower().rstrip("b")
+    mult = {"k": 1024, "m": 1024 * 1024}.get(t[-1:], 1)
+    if mult != 1:
+        t = t[:-1]
+    try:
+        return int(float(t) * mult)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text}")
+
+
+def _parse_duration_s(text: str) -> float:
+    # "90", "90s", "2m" -> seconds
+    t = text.strip().lower()
+    mult = {"s": 1.0, "m": 60.0, "h": 3600.0}.get(t[-1:], 1.0)
+    if t[-1:] in ("s", "m", "h"):
+        t = t[:-1]
+    try:
+        v = float(t) * mult
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text}")
+    if v <= 0:
+        raise argparse.ArgumentTypeError("duration must be positive")
+    return v
+
+
+# Subcommands take over argument parsing entirely: plugiq <name> ...
+SUBCOMMANDS = {
+    "batch": "usb_cable_tester.batch",
+    "watch": "usb_cable_tester.watch",
+    "reclassify": "usb_cable_tester.reclassify",
+    "probe": "usb_cable_tester.snapshot",
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        import importlib
+
+        return importlib.import_module(SUBCOMMANDS[argv[0]]).main(argv[1:])
+
     parser = argparse.ArgumentParser(
         description="USB-C Cable Tester: probe system and measure throughput to infer cable capabilities.",
+        epilog="Subcommands: batch MANIFEST (test a queue of cables), watch (test devices as they are plugged in), "
+        "probe (record/replay probe snapshots), reclassify (re-run classification over saved results). "
+        "See plugiq <subcommand> --help.",
     )
     parser.add_argument("--version", action="version", version=f"usb-cable-tester {__version__}")
 
     parser.add_argument("-i", "--show-system", action="store_true", help="Print detected USB/Type-C/Thunderbolt info and exit")
     parser.add_argument("-r", "--run-speed-test", action="store_true", help="Run a disk throughput test on the provided path")
-    parser.add_argument("-p", "--test-path", type=str, default=None, help="Directory path on the target device (e.g., external SSD mount)")
+    parser.add_argument("-p", "--test-path", type=str, action="append", default=None, help="Directory path on the target device (e.g., external SSD mount). Repeat to test several devices at once")
     parser.add_argument("-s", "--file-size-mb", type=int, default=1024, help="Test file size in MB (default 1024)")
+    parser.add_argument("--workload", choices=["sequential", "random"], default="sequential", help="Sequential MB/s test or random-access IOPS/latency test (default sequential)")
+    parser.add_argument("--block-size", type=_parse_size_bytes, default=4096, help="Random workload I/O size, e.g. 4k (default 4k)")
+    parser.add_argument("--read-pct", type=int, default=70, help="Random workload read percentage; the rest are writes (default 70)")
+    parser.add_argument("--duration", type=_parse_duration_s, default=None, help="Run time, e.g. 60s. Turns the sequential test into a time-based steady-state write test (random default 10s)")
+    parser.add_argument("--sample-interval", type=_parse_duration_s, default=1.0, help="Throughput sample interval for --duration runs (default 1s)")
+    parser.add_argument("--jobs", type=int, default=1, help="Concurrent workers, each on its own region of the test file (default 1)")
+    parser.add_argument("--iodepth", type=int, default=1, help="I/Os in flight per worker; 1 with --jobs 1 is the single-stream test (default 1)")
+    parser.add_argument("--pattern", choices=list(PATTERN_MODES), default="random", help="Write data: unique incompressible blocks, zeros, or a 3:1 mix. Compare random vs zeros to spot compressing devices (default random)")
+    parser.add_argument("--io-backend", choices=backend_names(), default="syscall", help="How the sequential test moves bytes: syscall, direct (O_DIRECT), mmap or vectored (preadv/pwritev) (default syscall)")
+    parser.add_argument("--memory-limit-mb", type=int, default=MEMORY_CEILING_MB, help=f"Cap on speed-test buffer memory; block size shrinks to fit (default {MEMORY_CEILING_MB})")
+    parser.add_argument("--no-cache-bypass", action="store_true", help="Read back through the OS page cache (faster-looking but measures RAM, not the cable)")
+    parser.add_argument("--auto-size", action="store_true", help="Stop writing once throughput converges; --file-size-mb becomes the cap")
+    parser.add_argument("--trials", type=int, default=1, help="Measured repetitions of the sequential test; >1 reports mean/median/stddev/CI (default 1)")
+    parser.add_argument("--warmup", type=int, default=0, help="Discarded warm-up runs before --trials (default 0)")
+    parser.add_argument("--no-solo-baseline", action="store_true", help="With several --test-path values, skip the solo runs used to detect devices contending for a host controller")
     parser.add_argument("-l", "--label", type=str, default=None, help="Optional human-friendly cable label to store with results")
-    parser.add_argument("-S", "--save", action="store_true", help="Save results to .usb_cable_results.json in this folder")
+    parser.add_argument("-S", "--save", action="store_true", help="Append results to .usb_cable_results.jsonl in this folder")
     parser.add_argument("-j", "--json", action="store_true", help="Output JSON for programmatic use")
     parser.add_argument("-w", "--wizard", action="store_true", help="Run the guided test wizard with safety checks")
     parser.add_argument("-d", "--dry-run", action="store_true", help="Do not write any data; show what would happen")
@@ -37,15 +109,24 @@ def main() -> int:
     banner_default = os.environ.get("USBCT_BANNER_STYLE", "block")
     parser.add_argument("--banner-style", choices=["full", "compact", "block"], default=banner_default, help="Select banner style for wizard/TUI")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    test_paths = args.test_path or []
+    args.test_path = test_paths[0] if test_paths else None
+    multi = len(test_paths) > 1
 
-    info = sysinfo.get_system_info()
+    # Sections are probed on first use, so each path pays only for what it reads
+    info = sysinfo.lazy_system_info()
 
     if (args.show_system or args.diagnostics) and not args.run_speed_test and not (args.wizard or args.tui):
+        info = sysinfo.materialize(info)
         if args.json:
             payload = {"system": info}
             if args.diagnostics:
-                payload["diagnostics"] = {"note": "includes raw probe data", "classification_preview": classify_result(info=info, speed_result=None)}
+                payload["diagnostics"] = {
+                    "note": "includes raw probe data",
+                    "classification_preview": classify_result(info=info, speed_result=None),
+                    "commands": command_log(),
+                }
             print(json.dumps(payload, indent=2))
         else:
             print("OS:", info.get("os"))
@@ -61,7 +142,18 @@ def main() -> int:
             if info.get("display"):
                 print("\nDisplay Info:")
                 print(json.dumps(info["display"], indent=2))
+            if args.diagnostics and info.get("probe"):
+                probe = info["probe"]
+                print(f"\nProbe sections ({probe['elapsed_s']:.2f} s of {probe['budget_s']:.0f} s budget):")
+                for name, st in probe["sections"].items():
+                    missing = f" (missing: {', '.join(st['missing'])})" if st.get("missing") else ""
+                    print(f"  {name}: {st['status']} in {st['elapsed_s']:.2f} s{missing}")
             if args.diagnostics:
+                commands = command_log()
+                if commands:
+                    print(f"\nCommands ({len(commands)}):")
+                    for line in format_command_log(commands):
+                        print("  " + line)
                 print("\nClassification (preview):")
                 print(json.dumps(classify_result(info=info, speed_result=None), indent=2))
         return 0
@@ -85,35 +177,91 @@ def main() -> int:
     if args.run_speed_test:
         if not args.test_path:
             parser.error("--test-path is required with --run-speed-test")
+        if args.jobs < 1 or args.iodepth < 1:
+            parser.error("--jobs and --iodepth must be at least 1")
+        if args.trials < 1 or args.warmup < 0:
+            parser.error("--trials must be at least 1 and --warmup non-negative")
+        if not 0 <= args.read_pct <= 100:
+            parser.error("--read-pct must be between 0 and 100")
+        if multi and (args.workload != "sequential" or args.duration or args.trials > 1 or args.warmup):
+            parser.error("several --test-path values support only the single-run sequential test")
         # Safety checks
         if not args.dry_run:
+            from .mounts import mount_index
             from .safety import preflight_checks, SafetyError
-            try:
-                ok, warnings = preflight_checks(args.test_path, args.file_size_mb)
-            except SafetyError as e:
-                parser.error(str(e))
-            for w in warnings:
-                print("Warning:", w)
+            mounts = mount_index()
+            for path in test_paths:
+                try:
+                    ok, warnings = preflight_checks(path, args.file_size_mb, mounts)
+                except SafetyError as e:
+                    parser.error(str(e))
+                for w in warnings:
+                    print("Warning:", w if not multi else f"{path}: {w}")
             print("Note: A temporary test file will be created and deleted after the test.")
         if args.dry_run:
             speed_result = {
+                "workload": "multi" if multi else args.workload,
                 "file_size_mb": args.file_size_mb,
-                "path": args.test_path,
+                "path": test_paths if multi else args.test_path,
                 "dry_run": True,
             }
-        else:
-            speed_result = run_disk_speed_test(
+        elif args.workload == "random":
+            try:
+                speed_result = run_random_io_test(
+                    test_dir=args.test_path,
+                    file_size_mb=args.file_size_mb,
+                    block_size=args.block_size,
+                    read_pct=args.read_pct,
+                    duration_s=args.duration or 10.0,
+                    iodepth=args.iodepth,
+                    bypass_cache=not args.no_cache_bypass,
+                    pattern=args.pattern,
+                )
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.duration:
+            speed_result = run_sustained_write_test(
                 test_dir=args.test_path,
+                duration_s=args.duration,
+                file_size_mb=args.file_size_mb,
+                interval_s=args.sample_interval,
+                bypass_cache=not args.no_cache_bypass,
+                pattern=args.pattern,
+            )
+        else:
+            seq_kwargs = dict(
                 file_size_mb=args.file_size_mb,
+                bypass_cache=not args.no_cache_bypass,
+                jobs=args.jobs,
+                iodepth=args.iodepth,
+                memory_limit_mb=args.memory_limit_mb,
+                pattern=args.pattern,
+                auto_size=args.auto_size,
+                backend=args.io_backend,
             )
+            try:
+                if multi:
+                    speed_result = run_multi_device_test(test_paths, solo_baseline=not args.no_solo_baseline, **seq_kwargs)
+                    for dev in speed_result["devices"]:
+                        dev["classification"] = classify_result(info=info, speed_result=dev["result"])
+                elif args.trials > 1 or args.warmup:
+                    speed_result = run_speed_trials(args.test_path, trials=args.trials, warmup=args.warmup, **seq_kwargs)
+                else:
+                    show = not args.json and sys.stderr.isatty()
+                    speed_result = consume_speed_events(iter_disk_speed_test(args.test_path, **seq_kwargs), show)
+            except (ValueError, BackendUnavailable) as e:
+                parser.error(str(e))
 
-    result = classify_result(info=info, speed_result=speed_result)
+    # Multi-device runs classify each device, and dry runs measured nothing;
+    # for both the top level is the probe alone.
+    probe_only = multi or args.dry_run
+    result = classify_result(info=info, speed_result=None if probe_only else speed_result)
     now_iso = datetime.utcnow().isoformat() + "Z"
 
     out = {
         "timestamp": now_iso,
         "label": args.label,
-        "system": info,
+        "system": info.loaded(),
         "speed_test": speed_result,
         "classification": result,
     }
@@ -128,12 +276,64 @@ def main() -> int:
         print("When:", now_iso)
         if args.label:
             print("Label:", args.label)
-        if speed_result:
+        if speed_result and speed_result.get("workload") == "random" and not speed_result.get("dry_run"):
+            lat = speed_result.get("latency_us") or {}
+            print(
+                f"Random {speed_result.get('block_size_bytes')} B, {speed_result.get('read_pct')}% reads: "
+                f"{speed_result.get('iops', 0):.0f} IOPS ({_human_mb_s(speed_result.get('mb_s'))})"
+            )
+            print(
+                "Latency (us): "
+                + ", ".join(f"{k} {lat[k]:.0f}" for k in ("p50", "p90", "p99", "p99.9") if lat.get(k) is not None)
+            )
+        elif speed_result and speed_result.get("workload") == "multi" and not speed_result.get("dry_run"):
+            for dev in speed_result["devices"]:
+                res = dev["result"]
+                line = f"{dev['path']}: write {_human_mb_s(res.get('write_mb_s'))}, read {_human_mb_s(res.get('read_mb_s'))}"
+                if dev.get("drop_pct") is not None:
+                    line += f" ({dev['drop_pct']:.0f}% below solo" + (", contended" if dev.get("contended") else "") + ")"
+                print(line)
+                print("  Likely:", dev["classification"].get("summary") or "-")
+            agg = speed_result["aggregate"]
+            print(f"Aggregate: write {_human_mb_s(agg['write_mb_s'])}, read {_human_mb_s(agg['read_mb_s'])}")
+            if speed_result.get("contention"):
+                print("Devices slowed down when run together; they likely share a host controller or hub uplink.")
+        elif speed_result and speed_result.get("workload") == "sustained":
+            print(
+                f"Burst: {_human_mb_s(speed_result.get('burst_mb_s'))}, "
+                f"Sustained: {_human_mb_s(speed_result.get('sustained_mb_s'))} "
+                f"({speed_result.get('written_mb', 0):.0f} MB in {speed_result.get('duration_s', 0):.0f} s)"
+            )
+            if speed_result.get("knee_s") is not None:
+                print(f"Cache exhausted after ~{speed_result['knee_mb']:.0f} MB ({speed_result['knee_s']:.1f} s)")
+            if speed_result.get("throttling"):
+                print("Throughput kept declining after the knee; the device may be thermally throttling.")
+        elif speed_result:
             print(
                 f"Write: {_human_mb_s(speed_result.get('write_mb_s'))}, "
                 f"Read: {_human_mb_s(speed_result.get('read_mb_s'))} "
-                f"(file ~{speed_result.get('file_size_mb')} MB)"
+                f"(file ~{speed_result.get('file_size_mb')} MB"
+                + (f", {speed_result['io_backend']} I/O" if speed_result.get("io_backend") not in (None, "syscall") else "")
+                + ")"
             )
+            stats = speed_result.get("stats")
+            if stats:
+                for key, name in (("write_mb_s", "Write"), ("read_mb_s", "Read")):
+                    st = stats[key]
+                    ci = ""
+                    if st.get("ci95_low") is not None:
+                        ci = f", 95% CI {st['ci95_low']:.1f}-{st['ci95_high']:.1f}"
+                    print(
+                        f"  {name} over {st['n']} trials: median {st['median']:.1f}, mean {st['mean']:.1f}, "
+                        f"stddev {st['stddev']:.1f}, min {st['min']:.1f}, max {st['max']:.1f}{ci}"
+                        + (f" ({len(st['rejected'])} outlier(s) dropped)" if st.get("rejected") else "")
+                    )
+            auto = speed_result.get("auto_size")
+            if auto:
+                state = "converged" if auto.get("converged") else "hit the cap before converging"
+                print(f"Auto-size: {auto['needed_mb']:.0f} of {auto['cap_mb']:.0f} MB needed ({state})")
+            for w in speed_result.get("workers") or []:
+                print(f"  job {w['job']}: write {_human_mb_s(w.get('write_mb_s'))}, read {_human_mb_s(w.get('read_mb_s'))}")
         if result:
             print("Likely:", result.get("summary") or "-")
             if result.get("reasons"):
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+def drop_cached_range(fd: int) -> bool:
+    # Only clean pages can be evicted, so callers must fsync first.
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+
+
+def open_uncached(path: str, bypass_cache: bool, allow_direct: bool = True, writable: bool = False) -> Tuple[int, str]:
+    """
+    Open an already written test file so I/O goes to the device, not RAM.
+    Returns (fd, cache_mode) where cache_mode is one of
+    "direct" (O_DIRECT), "nocache" (macOS F_NOCACHE), "fadvise" (pages dropped
+    via posix_fadvise) or "cached" (no bypass available or requested).
+    Writable handles without O_DIRECT use O_DSYNC so writes still reach the device.
+    """
+    flags = (os.O_RDWR if writable else os.O_RDONLY) | getattr(os, "O_BINARY", 0)
+    if bypass_cache and allow_direct:
+        o_direct = getattr(os, "O_DIRECT", 0)
+        if o_direct:
+            try:
+                return os.open(path, flags | o_direct), "direct"
+            except OSError:
+                pass  # e.g. tmpfs and some FUSE filesystems reject O_DIRECT
+    if bypass_cache and writable:
+        flags |= getattr(os, "O_DSYNC", 0)
+    fd = os.open(path, flags)
+    if bypass_cache:
+        if fcntl is not None and hasattr(fcntl, "F_NOCACHE"):
+            try:
+                fcntl.fcntl(fd, fcntl.F_NOCACHE, 1)
+                return fd, "nocache"
+            except OSError:
+                pass
+        if drop_cached_range(fd):
+            return fd, "fadvise"
+    return fd, "cached"
+
+
+def supports_positional_io() -> bool:
+    # Without pread/pwrite (Windows) the seek-based fallbacks below are only
+    # safe from a single thread.
+    return hasattr(os, "pwrite") and hasattr(os, "pread")
+
+
+def pwrite_all(fd: int, view: memoryview, offset: int) -> int:
+    done = 0
+    if not hasattr(os, "pwrite"):
+        os.lseek(fd, offset, os.SEEK_SET)
+        while done < len(view):
+            done += os.write(fd, view[done:])
+        return done
+    while done < len(view):
+        done += os.pwrite(fd, view[done:], offset + done)
+    return done
+
+
+def pread_into(fd: int, view: memoryview, offset: int) -> int:
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [view], offset)
+    if hasattr(os, "pread"):
+        data = os.pread(fd, len(view), offset)
+    else:
+        os.lseek(fd, offset, os.SEEK_SET)
+        data = os.read(fd, len(view))
+    view[: len(data)] = data
+    return len(data)
+
+
+class IOHandle:
+    def __init__(self, fd: int, mapping: Optional[mmap.mmap] = None) -> None:
+        self.fd = fd
+        self.mapping = mapping
+        self.view = memoryview(mapping) if mapping is not None else None
+
+
+class IOBackend:
+    """
+    How the sequential engine moves bytes. Handles are used from several
+    threads at once, at disjoint offsets; write/read_into must be thread-safe
+    for that pattern and return the number of bytes transferred.
+    """
+
+    name = ""
+    description = ""
+
+    def available(self) -> bool:
+        return supports_positional_io()
+
+    def open_write(self, path: str, size: int) -> IOHandle:
+        return IOHandle(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600))
+
+    def open_read(self, path: str, bypass_cache: bool, allow_direct: bool = True) -> Tuple[IOHandle, str]:
+        fd, mode = open_uncached(path, bypass_cache, allow_direct)
+        return IOHandle(fd), mode
+
+    def write(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        return pwrite_all(h.fd, view, offset)
+
+    def read_into(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        return pread_into(h.fd, view, offset)
+
+    def sync(self, h: IOHandle) -> None:
+        os.fsync(h.fd)
+
+    def close(self, h: IOHandle) -> None:
+        os.close(h.fd)
+
+
+class SyscallBackend(IOBackend):
+    name = "syscall"
+    description = "plain write/read or pwrite/pread syscalls (default)"
+
+    def available(self) -> bool:
+        return True  # single-stream runs use file objects where pread is missing
+
+
+class DirectBackend(IOBackend):
+    name = "direct"
+    description = "O_DIRECT for both phases; fails rather than falling back"
+
+    def available(self) -> bool:
+        return hasattr(os, "O_DIRECT") and supports_positional_io()
+
+    def open_write(self, path: str, size: int) -> IOHandle:
+        try:
+            return IOHandle(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT, 0o600))
+        except OSError as e:
+            raise BackendUnavailable(f"O_DIRECT is not supported here: {e}")
+
+    def open_read(self, path: str, bypass_cache: bool, allow_direct: bool = True) -> Tuple[IOHandle, str]:
+        try:
+            return IOHandle(os.open(path, os.O_RDONLY | os.O_DIRECT)), "direct"
+        except OSError as e:
+            raise BackendUnavailable(f"O_DIRECT is not supported here: {e}")
+
+
+class MmapBackend(IOBackend):
+    name = "mmap"
+    description = "memcpy into/out of a shared file mapping, msync to flush"
+
+    def available(self) -> bool:
+        return True
+
+    def open_write(self, path: str, size: int) -> IOHandle:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            os.ftruncate(fd, size)
+            return IOHandle(fd, mmap.mmap(fd, size))
+        except Exception:
+            os.close(fd)
+            raise
+
+    def open_read(self, path: str, bypass_cache: bool, allow_direct: bool = True) -> Tuple[IOHandle, str]:
+        # Mappings always go through the page cache; the best we can do is
+        # make sure it starts cold.
+        fd, mode = open_uncached(path, bypass_cache, allow_direct=False)
+        try:
+            return IOHandle(fd, mmap.mmap(fd, 0, access=mmap.ACCESS_READ)), mode
+        except Exception:
+            os.close(fd)
+            raise
+
+    def write(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        h.view[offset:offset + len(view)] = view
+        return len(view)
+
+    def read_into(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        n = max(0, min(len(view), len(h.view) - offset))
+        view[:n] = h.view[offset:offset + n]
+        return n
+
+    def sync(self, h: IOHandle) -> None:
+        h.mapping.flush()
+        os.fsync(h.fd)
+
+    def close(self, h: IOHandle) -> None:
+        h.view.release()
+        h.mapping.close()
+        os.close(h.fd)
+
+
+class VectoredBackend(IOBackend):
+    name = "vectored"
+    description = "os.pwritev/os.preadv with each block split into an iovec batch"
+
+    segment = 1024 * 1024
+
+    def available(self) -> bool:
+        return hasattr(os, "pwritev") and hasattr(os, "preadv")
+
+    def _iov(self, view: memoryview) -> List[memoryview]:
+        return [view[i:i + self.segment] for i in range(0, len(view), self.segment)]
+
+    def write(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        done = os.pwritev(h.fd, self._iov(view), offset)
+        if done < len(view):  # short vectored write: finish the remainder
+            done += pwrite_all(h.fd, view[done:], offset + done)
+        return done
+
+    def read_into(self, h: IOHandle, view: memoryview, offset: int) -> int:
+        return os.preadv(h.fd, self._iov(view), offset)
+
+
+_BACKENDS: Dict[str, IOBackend] = {}
+
+
+def register_backend(backend: IOBackend) -> IOBackend:
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str) -> IOBackend:
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown I/O backend: {name} (choose from {', '.join(_BACKENDS)})")
+    if not backend.available():
+        raise BackendUnavailable(f"I/O backend '{name}' is not available on this platform")
+    return backend
+
+
+def backend_names() -> List[str]:
+    return list(_BACKENDS)
+
+
+for _b in (SyscallBackend(), DirectBackend(), MmapBackend(), VectoredBackend()):
+    register_backend(_b)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import os
+import platform
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+NETWORK_FS_TYPES = ("nfs", "nfs4", "cifs", "smb", "smb3", "smbfs", "afpfs", "fuse.sshfs")
+
+# Trie node key holding the mount at that node; "\0" never occurs in a path
+_MOUNT = "\0"
+
+
+@dataclass
+class Mount:
+    mount_point: str
+    fs_type: Optional[str] = None
+    source: Optional[str] = None
+    device: Optional[str] = None  # "major:minor"
+    is_external: Optional[bool] = None
+    is_network: Optional[bool] = None
+
+
+def _unescape(field: str) -> str:
+    # mountinfo escapes space, tab, newline and backslash as \ooo
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def parse_mountinfo(text: str) -> List[Mount]:
+    """
+    Parse /proc/<pid>/mountinfo lines:
+    "36 35 98:0 /mnt1 /mnt/parent rw,noatime master:1 - ext3 /dev/root rw".
+    Entries keep the file's order, so a later mount on the same point is the visible one.
+    """
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            sep = fields.index("-", 6)
+        except ValueError:
+            continue
+        if len(fields) < sep + 3:
+            continue
+        fs_type = fields[sep + 1]
+        mounts.append(
+            Mount(
+                mount_point=_unescape(fields[4]),
+                fs_type=fs_type,
+                source=_unescape(fields[sep + 2]),
+                device=fields[2],
+                is_network=fs_type in NETWORK_FS_TYPES,
+            )
+        )
+    return mounts
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _transport(devpath: str) -> Optional[str]:
+    # The bus a disk hangs off, from its sysfs device path
+    parts = devpath.split(os.sep)
+    for prefix, transport in (("usb", "usb"), ("thunderbolt", "thunderbolt"), ("domain", "thunderbolt"), ("nvme", "nvme"), ("ata", "sata"), ("mmc", "mmc")):
+        if any(p.startswith(prefix) for p in parts):
+            return transport
+    return None
+
+
+def block_devices(sysfs_root: str = "/sys") -> Dict[str, Dict[str, Any]]:
+    """
+    Disks and partitions under <sysfs_root>/block, keyed by "major:minor":
+    name, disk, removable, transport, external and size_bytes. A partition
+    inherits its disk's removable flag and transport.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    base = os.path.join(sysfs_root, "block")
+    try:
+        names = os.listdir(base)
+    except OSError:
+        return out
+    real_root = os.path.realpath(sysfs_root)
+    for disk in names:
+        path = os.path.realpath(os.path.join(base, disk))
+        removable = _read(os.path.join(path, "removable")) == "1"
+        transport = _transport(os.path.relpath(path, real_root))
+        common = {"disk": disk, "removable": removable, "transport": transport, "external": removable or transport in ("usb", "thunderbolt")}
+        try:
+            # Partitions are children named after the disk: sda1, nvme0n1p1
+            parts = [n for n in os.listdir(path) if n.startswith(disk) and os.path.exists(os.path.join(path, n, "partition"))]
+        except OSError:
+            parts = []
+        for name, dev_dir in [(disk, path)] + [(n, os.path.join(path, n)) for n in parts]:
+            dev = _read(os.path.join(dev_dir, "dev"))
+            if not dev:
+                continue
+            sectors = _read(os.path.join(dev_dir, "size"))
+            out[dev] = dict(common, name=name, size_bytes=int(sectors) * 512 if sectors and sectors.isdigit() else None)
+    return out
+
+
+def block_device_for(mount: Mount, devices: Dict[str, Dict[str, Any]], by_name: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The block_devices() entry behind a mount, by "major:minor" or else by the
+    name of its /dev source: btrfs reports an anonymous 0:NN device in
+    mountinfo. by_name maps each entry's name to the entry.
+    """
+    dev = devices.get(mount.device or "")
+    if dev is None and mount.source and mount.source.startswith("/dev/"):
+        dev = by_name.get(os.path.basename(os.path.realpath(mount.source)))
+    return dev
+
+
+def _components(path: str, resolve: bool = False) -> List[str]:
+    # Only looked-up paths are resolved; stat()ing every mount point could
+    # hang on a dead network mount.
+    path = os.path.realpath(path) if resolve else os.path.abspath(path)
+    drive, rest = os.path.splitdrive(os.path.normcase(path))
+    return ([drive] if drive else []) + [p for p in rest.split(os.sep) if p]
+
+
+class MountIndex:
+    """
+    Longest-prefix lookup from a path to the mount containing it: a trie keyed
+    by path components, so a lookup costs one step per component and nested
+    mounts (/media/usb inside /media) resolve to the innermost one. Entries
+    only need mount_point, is_external and is_network, so Volume works too.
+    """
+
+    def __init__(self, mounts: Iterable[Any] = ()) -> None:
+        self._root: Dict[str, Any] = {}
+        self._count = 0
+        for m in mounts:
+            self.add(m)
+
+    def add(self, mount: Any) -> None:
+        node = self._root
+        for part in _components(mount.mount_point):
+            node = node.setdefault(part, {})
+        if _MOUNT not in node:
+            self._count += 1
+        node[_MOUNT] = mount
+
+    def lookup(self, path: str) -> Optional[Any]:
+        node = self._root
+        found = node.get(_MOUNT)
+        for part in _components(path, resolve=True):
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(_MOUNT, found)
+        return found
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def read_mountinfo(path: str = MOUNTINFO_PATH) -> List[Mount]:
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        return parse_mountinfo(fh.read())
+
+
+def linux_mounts(mountinfo_path: str = MOUNTINFO_PATH, sysfs_root: str = "/sys") -> List[Mount]:
+    """Mounts from mountinfo, with is_external resolved through sysfs for block devices."""
+    mounts = read_mountinfo(mountinfo_path)
+    # Anonymous devices (major 0: tmpfs, overlay, network filesystems) are not
+    # listed, except where the source names a block device (btrfs)
+    devices = block_devices(sysfs_root)
+    by_name = {d["name"]: d for d in devices.values()}
+    for m in mounts:
+        dev = block_device_for(m, devices, by_name)
+        if dev is not None:
+            m.is_external = dev["external"]
+    return mounts
+
+
+def mount_index(mountinfo_path: str = MOUNTINFO_PATH, sysfs_root: str = "/sys") -> MountIndex:
+    """
+    Index of the current mounts. On Linux this is one read of mountinfo plus a
+    few sysfs attributes; elsewhere it indexes list_candidate_volumes().
+    """
+    if platform.system().lower() == "linux":
+        try:
+            return MountIndex(linux_mounts(mountinfo_path, sysfs_root))
+        except OSError:
+            pass
+    from .volumes import list_candidate_volumes
+
+    return MountIndex(list_candidate_volumes())
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .classify import classify_result
+from .store import DB_FILE, iter_lines, rewrite_lines
+
+
+# Records per unit of work; a batch is classified in one worker call so the
+# per-call pickling and scheduling cost is spread over many records.
+BATCH_SIZE = 2000
+
+# (label, old summary, new summary) per record; None for lines that are not records
+_Change = Optional[Tuple[Optional[str], Optional[str], Optional[str]]]
+
+
+def _reclassify_line(line: str) -> Tuple[str, _Change]:
+    # Returns the line to write back. Failed tests were never classified, and
+    # unchanged records keep their original line.
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return line, None
+    if not isinstance(rec, dict):
+        return line, None
+    before = rec.get("classification")
+    old = (before or {}).get("summary")
+    system, speed = rec.get("system"), rec.get("speed_test")
+    if "error" in rec or before is None or not isinstance(system, dict):
+        return line, (rec.get("label"), old, None)
+    # Like the CLI: multi-device runs classify each device, and the top level
+    # of those and of dry runs is classified on the probe alone
+    if (speed or {}).get("dry_run"):
+        speed = None
+    if speed and speed.get("workload") == "multi":
+        for dev in speed.get("devices") or []:
+            dev["classification"] = classify_result(info=system, speed_result=dev.get("result"))
+        rec["classification"] = classify_result(info=system, speed_result=None)
+    else:
+        rec["classification"] = classify_result(info=system, speed_result=speed)
+        if rec["classification"] == before:
+            return line, (rec.get("label"), old, old)
+    return json.dumps(rec), (rec.get("label"), old, rec["classification"]["summary"])
+
+
+def _reclassify_batch(lines: List[str]) -> List[Tuple[str, _Change]]:
+    return [_reclassify_line(line) for line in lines]
+
+
+def _batches(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    it = iter(lines)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def reclassify_lines(lines: Iterable[str], jobs: int = 0, batch_size: int = BATCH_SIZE) -> Iterator[Tuple[str, _Change]]:
+    """
+    Re-run classification on the stored system and speed_test blocks of each
+    results-log line. Yields (line to write back, (label, old summary, new
+    summary)) in input order; the change is None for lines that are not
+    records, and the new summary None for records that were never classified.
+    Batches are decoded, classified and re-encoded by `jobs` worker processes
+    (0: one per CPU; 1, or a log that fits in one batch: this process), with
+    at most two batches per worker in flight so memory stays bounded.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    jobs = jobs or os.cpu_count() or 1
+    batches = _batches(lines, batch_size)
+    first = next(batches, None)
+    if first is None:
+        return
+    if jobs == 1 or len(first) < batch_size:
+        yield from _reclassify_batch(first)
+        for batch in batches:
+            yield from _reclassify_batch(batch)
+        return
+    with ProcessPoolExecutor(jobs) as pool:
+        pending: Deque[Any] = deque([pool.submit(_reclassify_batch, first)])
+        for batch in batches:
+            pending.append(pool.submit(_reclassify_batch, batch))
+            while len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class TierDiff:
+    """Tally of classification changes: records per (old, new) summary and the labels involved."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.reclassified = 0
+        self.changed: Dict[Tuple[Optional[str], str], Dict[str, Any]] = {}
+
+    def add(self, label: Optional[str], old: Optional[str], new: Optional[str]) -> None:
+        self.total += 1
+        if new is None:
+            return
+        self.reclassified += 1
+        if new != old:
+            entry = self.changed.setdefault((old, new), {"count": 0, "labels": set()})
+            entry["count"] += 1
+            entry["labels"].add(label or "(no label)")
+
+    def summary(self) -> Dict[str, Any]:
+        transitions = [
+            {"from": old, "to": new, "count": e["count"], "labels": sorted(e["labels"])}
+            for (old, new), e in sorted(self.changed.items(), key=lambda kv: -kv[1]["count"])
+        ]
+        return {
+            "records": self.total,
+            "reclassified": self.reclassified,
+            "changed": sum(t["count"] for t in transitions),
+            "transitions": transitions,
+        }
+
+
+def reclassify_history(path: str, write: bool = True, jobs: int = 0, batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Stream the results log at `path` through reclassify_lines and, if
+    `write`, rewrite it with the updated records (results saved meanwhile are
+    kept). Returns the TierDiff summary.
+    """
+    diff = TierDiff()
+
+    def updated(lines: Iterator[str]) -> Iterator[str]:
+        for line, change in reclassify_lines(lines, jobs=jobs, batch_size=batch_size):
+            if change is not None:
+                diff.add(*change)
+            yield line
+
+    if write:
+        rewrite_lines(updated, path)
+    else:
+        for _ in updated(iter_lines(path)):
+            pass
+    return diff.summary()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="plugiq reclassify",
+        description="Re-run classification over saved results with the current rules and report which cables changed tier.",
+    )
+    parser.add_argument("history", nargs="?", default=DB_FILE, help=f"Results file (default {DB_FILE} in this folder)")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="Report changes without rewriting the history")
+    parser.add_argument("--jobs", type=int, default=0, help="Worker processes (default one per CPU; 1 = no workers)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=f"Records per worker batch (default {BATCH_SIZE})")
+    parser.add_argument("-j", "--json", action="store_true", help="Output the diff summary as JSON")
+    args = parser.parse_args(argv)
+    if args.jobs < 0 or args.batch_size < 1:
+        parser.error("--jobs must be non-negative and --batch-size at least 1")
+
+    start = time.monotonic()
+    try:
+        summary = reclassify_history(args.history, write=not args.dry_run, jobs=args.jobs, batch_size=args.batch_size)
+    except (OSError, ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    summary["elapsed_s"] = time.monotonic() - start
+    summary["written"] = not args.dry_run
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(
+        f"{summary['changed']} of {summary['reclassified']} classified record(s) changed tier "
+        f"({summary['records']} record(s), {summary['elapsed_s']:.2f} s)"
+        + ("" if summary["written"] else "; dry run, history not rewritten")
+    )
+    for t in summary["transitions"]:
+        labels = ", ".join(t["labels"][:5]) + (f", +{len(t['labels']) - 5} more" if len(t["labels"]) > 5 else "")
+        print(f"  {t['from'] or '(none)'} -> {t['to']}: {t['count']} ({labels})")
+    return 0
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+
+# External tools run at most this many at a time; probes fan out across
+# threads and a burst of forks slows every one of them down.
+MAX_CONCURRENT = 4
+# Executions kept for --diagnostics
+LOG_SIZE = 256
+
+# Exit statuses for commands that never produced one
+EXIT_TIMEOUT = 124
+EXIT_NOT_FOUND = 127
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Tuple[int, str, str] = (EXIT_NOT_FOUND, "", "")
+        self.waiters = 0
+
+
+class CommandRunner:
+    """
+    Runs argv lists directly (no shell), at most max_concurrent at a time.
+    Identical commands already in flight are not started again: callers
+    share the running one's result. Every execution is logged with its exit
+    status, wall time, time spent queued and how many callers shared it.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, log_size: int = LOG_SIZE) -> None:
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, ...], _Call] = {}
+        self._log: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+
+    def run(self, argv: Sequence[str], timeout: float = 10.0) -> Tuple[int, str, str]:
+        key = tuple(argv)
+        if not key:
+            raise ValueError("empty command")
+        with self._lock:
+            call = self._inflight.get(key)
+            owner = call is None
+            if call is None:
+                call = self._inflight[key] = _Call()
+            else:
+                call.waiters += 1
+        if not owner:
+            call.done.wait()
+            return call.result
+        try:
+            call.result = self._execute(key, timeout, call)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result
+
+    def _execute(self, argv: Tuple[str, ...], timeout: float, call: _Call) -> Tuple[int, str, str]:
+        queued_s = wall_s = 0.0
+        if shutil.which(argv[0]) is None:
+            result, status = (EXIT_NOT_FOUND, "", f"{argv[0]}: not found"), "missing"
+        else:
+            queued = time.monotonic()
+            with self._slots:
+                start = time.monotonic()
+                queued_s = start - queued
+                result, status = _spawn(argv, timeout)
+                wall_s = time.monotonic() - start
+        with self._lock:
+            self._log.append(
+                {
+                    "command": shlex.join(argv),
+                    "status": status,
+                    "exit": result[0],
+                    "wall_s": wall_s,
+                    "queued_s": queued_s,
+                    "shared_with": call.waiters,
+                }
+            )
+        return result
+
+    def log(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(e) for e in self._log]
+
+    def clear_log(self) -> None:
+        with self._lock:
+            self._log.clear()
+
+
+def _spawn(argv: Tuple[str, ...], timeout: float) -> Tuple[Tuple[int, str, str], str]:
+    try:
+        p = subprocess.run(
+            list(argv),
+            check=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+        return (p.returncode, p.stdout, p.stderr), ("ok" if p.returncode == 0 else "failed")
+    except subprocess.TimeoutExpired as e:
+        # Partial output arrives as bytes even in text mode
+        out, err = (x.decode(errors="replace") if isinstance(x, bytes) else (x or "") for x in (e.stdout, e.stderr))
+        return (EXIT_TIMEOUT, out, err), "timed-out"
+    except OSError as e:
+        return (EXIT_NOT_FOUND, "", str(e)), "missing"
+
+
+_default = CommandRunner()
+
+
+def run_command(argv: Sequence[str], timeout: float = 10.0) -> Tuple[int, str, str]:
+    """Run argv with the shared runner; returns (exit status, stdout, stderr)."""
+    return _default.run(argv, timeout)
+
+
+def command_log() -> List[Dict[str, Any]]:
+    return _default.log()
+
+
+def format_command_log(entries: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    # One line per execution, slowest first, for --diagnostics
+    entries = command_log() if entries is None else entries
+    lines = []
+    for e in sorted(entries, key=lambda e: e["wall_s"], reverse=True):
+        extra = f", waited {e['queued_s']:.2f} s" if e["queued_s"] >= 0.01 else ""
+        if e.get("shared_with"):
+            extra += f", shared by {e['shared_with'] + 1} callers"
+        status = f"exit {e['exit']}" if e["status"] == "failed" else e["status"]
+        lines.append(f"{e['command']}: {status} in {e['wall_s']:.2f} s{extra}")
+    return lines
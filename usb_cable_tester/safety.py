@@ -2,39 +2,28 @@ from __future__ import annotations
 
 import os
 from typing import Optional, Tuple
-from .volumes import list_candidate_volumes
+from .mounts import MountIndex, mount_index
 
 
 class SafetyError(Exception):
     pass
 
 
-def is_path_external(test_path: str) -> Optional[bool]:
-    # Best-effort: compare against known external volumes list
-    candidates = list_candidate_volumes()
-    for v in candidates:
-        try:
-            if os.path.commonpath([os.path.abspath(test_path), os.path.abspath(v.mount_point)]) == os.path.abspath(v.mount_point):
-                return v.is_external
-        except Exception:
-            continue
-    return None
+def is_path_external(test_path: str, mounts: Optional[MountIndex] = None) -> Optional[bool]:
+    # Best-effort: the flag of the innermost mount holding the path
+    m = (mount_index() if mounts is None else mounts).lookup(test_path)
+    return m.is_external if m is not None else None
 
 
-def is_path_network(test_path: str) -> Optional[bool]:
-    candidates = list_candidate_volumes()
-    for v in candidates:
-        try:
-            if os.path.commonpath([os.path.abspath(test_path), os.path.abspath(v.mount_point)]) == os.path.abspath(v.mount_point):
-                return v.is_network
-        except Exception:
-            continue
-    return None
+def is_path_network(test_path: str, mounts: Optional[MountIndex] = None) -> Optional[bool]:
+    m = (mount_index() if mounts is None else mounts).lookup(test_path)
+    return m.is_network if m is not None else None
 
 
-def preflight_checks(test_path: str, file_size_mb: int) -> Tuple[bool, list[str]]:
+def preflight_checks(test_path: str, file_size_mb: int, mounts: Optional[MountIndex] = None) -> Tuple[bool, list[str]]:
     """
     Returns (ok, warnings). Does not raise unless path is clearly unsafe.
+    Pass a mount_index() to reuse one across several checks.
     """
     warnings: list[str] = []
     ap = os.path.abspath(test_path)
@@ -46,13 +35,15 @@ def preflight_checks(test_path: str, file_size_mb: int) -> Tuple[bool, list[str]
         if os.path.abspath(bad) == ap:
             raise SafetyError("Refusing to write to a system or home root directory")
 
-    ext = is_path_external(ap)
+    if mounts is None:
+        mounts = mount_index()
+    ext = is_path_external(ap, mounts)
     if ext is False:
         warnings.append("Selected path appears to be on an internal drive. Consider using an external device to avoid wear.")
     if ext is None:
         warnings.append("Could not confirm if the selected path is external. Proceed with caution.")
 
-    net = is_path_network(ap)
+    net = is_path_network(ap, mounts)
     if net:
         warnings.append("Selected path appears to be a network mount; throughput will reflect network speed, not cable.")
 
@@ -69,7 +60,7 @@ def preflight_checks(test_path: str, file_size_mb: int) -> Tuple[bool, list[str]
             raise SafetyError("Insufficient free space for requested test size with safety margin")
         if free < 2 * 1024 * 1024 * 1024:
             warnings.append("Less than 2 GB free on the target volume.")
-    except Exception:
+    except (OSError, AttributeError):  # no os.statvfs on Windows
         warnings.append("Could not determine free space; proceeding best-effort.")
 
     return True, warnings
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import posixpath
+import tarfile
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import __version__
+from . import system_info as sysinfo
+from .classify import classify_result
+from .stats import median
+
+
+SNAPSHOT_FORMAT = 1
+META_NAME = "meta.json"
+SYS_DIR = "sys"
+
+# sysfs trees the Linux probes read. Entries are captured to _MAX_DEPTH
+# directory levels below each device, without following nested symlinks
+# (sysfs is full of cycles through "subsystem", "device" and "driver").
+CAPTURE_DIRS = ("bus/usb/devices", "class/typec", "bus/thunderbolt/devices", "class/drm")
+_MAX_DEPTH = 2
+_MAX_FILE_BYTES = 64 * 1024
+
+
+def _capture_sysfs(sysfs_root: str) -> Iterator[Tuple[str, bytes]]:
+    for rel in CAPTURE_DIRS:
+        base = os.path.join(sysfs_root, rel)
+        try:
+            names = sorted(os.listdir(base))
+        except OSError:
+            continue
+        for name in names:
+            entry = os.path.realpath(os.path.join(base, name))
+            if not os.path.isdir(entry):
+                continue
+            for dirpath, dirnames, filenames in os.walk(entry):
+                sub = os.path.relpath(dirpath, entry)
+                depth = 0 if sub == "." else sub.count(os.sep) + 1
+                if depth >= _MAX_DEPTH:
+                    dirnames[:] = []
+                for fname in sorted(filenames):
+                    path = os.path.join(dirpath, fname)
+                    if os.path.islink(path):
+                        continue
+                    try:
+                        with open(path, "rb") as fh:
+                            data = fh.read(_MAX_FILE_BYTES + 1)
+                    except OSError:
+                        continue  # write-only or failing attributes
+                    if len(data) > _MAX_FILE_BYTES:
+                        continue
+                    parts = [rel, name] + ([] if sub == "." else sub.split(os.sep)) + [fname]
+                    yield posixpath.join(*parts), data
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    ti = tarfile.TarInfo(name)
+    ti.size = len(data)
+    ti.mtime = int(time.time())
+    tar.addfile(ti, io.BytesIO(data))
+
+
+def record_snapshot(path: str, sysfs_root: str = "/sys") -> Dict[str, Any]:
+    """
+    Run a fresh probe while capturing every command's output, then write the
+    outputs (meta.json) and the relevant sysfs files (sys/...) to a tar
+    archive (.tar.gz/.tgz compressed). Returns the snapshot metadata.
+    """
+    with sysinfo.recording_commands() as commands:
+        info = sysinfo.get_system_info(cache_ttl_s=0, sysfs_root=sysfs_root)
+    meta: Dict[str, Any] = {
+        "format": SNAPSHOT_FORMAT,
+        "created": datetime.utcnow().isoformat() + "Z",
+        "tool_version": __version__,
+        "os": info.get("os"),
+        "commands": dict(commands),
+    }
+    mode = "w:gz" if path.endswith((".gz", ".tgz")) else "w"
+    files = 0
+    with tarfile.open(path, mode) as tar:
+        _add_bytes(tar, META_NAME, json.dumps(meta, indent=2).encode("utf-8"))
+        if meta["os"] == "linux":
+            for rel, data in _capture_sysfs(sysfs_root):
+                _add_bytes(tar, posixpath.join(SYS_DIR, rel), data)
+                files += 1
+    meta["sysfs_files"] = files
+    return meta
+
+
+def _extract(tar: tarfile.TarFile, dest: str) -> None:
+    # Regular files only, and nothing may land outside dest
+    for member in tar.getmembers():
+        if not member.isfile():
+            continue
+        name = posixpath.normpath(member.name)
+        if name.startswith(("/", "../")) or name == "..":
+            raise ValueError(f"unsafe path in snapshot: {member.name}")
+        target = os.path.join(dest, *name.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        src = tar.extractfile(member)
+        if src is None:
+            continue
+        with src, open(target, "wb") as fh:
+            fh.write(src.read())
+
+
+@contextmanager
+def open_snapshot(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (directory, metadata) for a snapshot tar or an unpacked snapshot directory."""
+    if os.path.isdir(path):
+        with open(os.path.join(path, META_NAME), "r", encoding="utf-8") as fh:
+            yield path, json.load(fh)
+        return
+    with tempfile.TemporaryDirectory(prefix="plugiq-snap-") as tmp:
+        with tarfile.open(path, "r:*") as tar:
+            _extract(tar, tmp)
+        with open(os.path.join(tmp, META_NAME), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        yield tmp, meta
+
+
+def replay_probe(directory: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the full system probe against a snapshot instead of the live machine."""
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"unsupported snapshot format: {meta.get('format')}")
+    with sysinfo.replaying_commands(meta.get("commands") or {}):
+        return sysinfo.get_system_info(cache_ttl_s=0, sysfs_root=os.path.join(directory, SYS_DIR), os_name=meta.get("os"))
+
+
+def replay(path: str) -> Dict[str, Any]:
+    """
+    Probe and classify a snapshot. When the snapshot's metadata carries an
+    "expected_summary" (corpus entries do), "matches" reports agreement.
+    """
+    with open_snapshot(path) as (directory, meta):
+        info = replay_probe(directory, meta)
+    out: Dict[str, Any] = {"snapshot": path, "system": info, "classification": classify_result(info=info, speed_result=None)}
+    if meta.get("expected_summary") is not None:
+        out["expected_summary"] = meta["expected_summary"]
+        out["matches"] = out["classification"]["summary"] == meta["expected_summary"]
+    return out
+
+
+def expand_corpus(paths: List[str]) -> List[str]:
+    # A directory without meta.json is a corpus: each child is a snapshot
+    out: List[str] = []
+    for p in paths:
+        if os.path.isdir(p) and not os.path.exists(os.path.join(p, META_NAME)):
+            out.extend(
+                os.path.join(p, n)
+                for n in sorted(os.listdir(p))
+                if os.path.exists(os.path.join(p, n, META_NAME)) or n.endswith((".tar", ".tar.gz", ".tgz"))
+            )
+        else:
+            out.append(p)
+    return out
+
+
+def bench(paths: List[str], iterations: int = 100) -> List[Dict[str, Any]]:
+    """
+    Time the probe parse (replayed) and classify_result per snapshot over
+    `iterations` rounds. Snapshots are unpacked once, outside the timing.
+    """
+    if iterations < 1:
+        raise ValueError("iterations must be at least 1")
+    results = []
+    for path in paths:
+        with open_snapshot(path) as (directory, meta):
+            probe_us: List[float] = []
+            classify_us: List[float] = []
+            for _ in range(iterations):
+                t0 = time.perf_counter()
+                info = replay_probe(directory, meta)
+                t1 = time.perf_counter()
+                classify_result(info=info, speed_result=None)
+                t2 = time.perf_counter()
+                probe_us.append((t1 - t0) * 1e6)
+                classify_us.append((t2 - t1) * 1e6)
+        results.append(
+            {
+                "snapshot": path,
+                "iterations": iterations,
+                "probe_us": {"median": median(probe_us), "min": min(probe_us)},
+                "classify_us": {"median": median(classify_us), "min": min(classify_us)},
+            }
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="plugiq probe",
+        description="Probe the system, record the probe inputs to a snapshot, or replay snapshots through probe and classification.",
+    )
+    parser.add_argument("--record", metavar="SNAPSHOT.tar", default=None, help="Capture command outputs and sysfs files to a tar (.tar.gz to compress)")
+    parser.add_argument("--replay", metavar="SNAPSHOT", nargs="+", default=None, help="Snapshot tars, unpacked snapshot directories, or corpus directories of them")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="With --replay, time probe parsing and classification over N rounds per snapshot")
+    parser.add_argument("--sysfs-root", default="/sys", help=argparse.SUPPRESS)
+    parser.add_argument("-j", "--json", action="store_true", help="Output JSON")
+    args = parser.parse_args(argv)
+
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    if args.bench and not args.replay:
+        parser.error("--bench needs --replay")
+
+    if args.record:
+        meta = record_snapshot(args.record, sysfs_root=args.sysfs_root)
+        if args.json:
+            print(json.dumps({"snapshot": args.record, "os": meta["os"], "commands": len(meta["commands"]), "sysfs_files": meta["sysfs_files"]}))
+        else:
+            print(f"Recorded {args.record}: {meta['os']}, {len(meta['commands'])} command(s), {meta['sysfs_files']} sysfs file(s)")
+        return 0
+
+    if args.replay:
+        paths = expand_corpus(args.replay)
+        try:
+            if args.bench:
+                rows = bench(paths, args.bench)
+                if args.json:
+                    print(json.dumps(rows, indent=2))
+                else:
+                    for row in rows:
+                        print(
+                            f"{row['snapshot']}: probe {row['probe_us']['median']:.0f} us, "
+                            f"classify {row['classify_us']['median']:.0f} us (median of {row['iterations']})"
+                        )
+                    print(
+                        f"Total per pass: probe {sum(r['probe_us']['median'] for r in rows):.0f} us, "
+                        f"classify {sum(r['classify_us']['median'] for r in rows):.0f} us over {len(rows)} snapshot(s)"
+                    )
+                return 0
+            results = [replay(p) for p in paths]
+        except (OSError, ValueError, tarfile.TarError) as e:
+            parser.error(str(e))
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            for res in results:
+                cls = res["classification"]
+                flag = ""
+                if "matches" in res:
+                    flag = "  [ok]" if res["matches"] else f"  [MISMATCH: expected {res['expected_summary']}]"
+                print(f"{res['snapshot']}: {cls['summary']}{flag}")
+                for r in cls.get("reasons") or []:
+                    print("  -", r)
+        return 0 if all(r.get("matches", True) for r in results) else 1
+
+    info = sysinfo.get_system_info(sysfs_root=args.sysfs_root)
+    print(json.dumps({"system": info}, indent=2))
+    return 0
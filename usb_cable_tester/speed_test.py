@@ -1,8 +1,51 @@
 from __future__ import annotations
 
+import mmap
 import os
+import random
+import sys
+import tempfile
+import threading
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from typing import Callable, Dict, Any, Generator, Iterable, Iterator, List, Optional, Tuple
+
+from .io_backends import (
+    IOBackend,
+    drop_cached_range,
+    get_backend,
+    open_uncached,
+    pread_into,
+    pwrite_all,
+    supports_positional_io,
+)
+from .latency import LatencyHistogram
+from .patterns import PatternGenerator
+from .stats import median, summarize
+
+# Temp files are created with mkstemp under this prefix, so several tests
+# (processes or threads) can share a directory without clobbering each other.
+TEMP_FILE_PREFIX = ".usb_cable_tester_speed."
+TEMP_FILE_SUFFIX = ".tmp"
+
+# Fixed memory ceiling for the sequential engine's buffers. The engine keeps
+# the pattern pool, one zero block and one I/O buffer per in-flight I/O and
+# allocates nothing per block, so resident memory stays below this however
+# large the test file is. The block size shrinks (down to MIN_BLOCK_SIZE) to
+# fit many in-flight I/Os under the ceiling, which keeps multi-GB tests
+# workable on small rigs such as a Raspberry Pi.
+MEMORY_CEILING_MB = 64
+MAX_BLOCK_SIZE = 8 * 1024 * 1024
+MIN_BLOCK_SIZE = 64 * 1024
+
+# Adaptive sizing (auto_size=True): write in rounds of ~AUTO_SIZE_ROUND_S and
+# stop once the ~95% confidence interval of the mean round throughput over the
+# last AUTO_SIZE_WINDOW rounds is within AUTO_SIZE_TOLERANCE of the mean.
+AUTO_SIZE_MIN_MB = 32
+AUTO_SIZE_ROUND_S = 0.25
+AUTO_SIZE_WINDOW = 8
+AUTO_SIZE_TOLERANCE = 0.05
 
 
 def _ensure_dir(path: str) -> None:
@@ -19,70 +62,879 @@ def _has_space_for(path: str, size_bytes: int) -> bool:
         return True  # Best effort
 
 
-def run_disk_speed_test(test_dir: str, file_size_mb: int = 1024) -> Dict[str, Any]:
+def auto_size_cap(test_dir: str, cap_mb: int) -> int:
     """
-    Sequential write and read test using a temporary file on the target directory.
-    Returns dict with write/read MB/s and timings.
+    The auto_size cap for test_dir: cap_mb, lowered to what fits in its free
+    space with the usual 20% margin, but not below AUTO_SIZE_MIN_MB. Auto-size
+    usually converges well before the cap, so callers check preflight against
+    AUTO_SIZE_MIN_MB rather than the full cap.
     """
-    _ensure_dir(test_dir)
-    file_size_bytes = file_size_mb * 1024 * 1024
-    test_file = os.path.join(test_dir, ".usb_cable_tester_speed.tmp")
+    try:
+        st = os.statvfs(test_dir)
+    except (OSError, AttributeError):  # no os.statvfs on Windows
+        return cap_mb
+    fits_mb = int(st.f_bavail * st.f_frsize / 1.2 / (1024 * 1024))
+    return max(AUTO_SIZE_MIN_MB, min(cap_mb, fits_mb))
 
-    if not _has_space_for(test_dir, file_size_bytes):
+
+@contextmanager
+def _temp_test_file(test_dir: str, size_bytes: int) -> Iterator[str]:
+    # Shared setup for every workload: validate the target, check free space and
+    # always remove the temp file afterwards, even on errors.
+    _ensure_dir(test_dir)
+    if not _has_space_for(test_dir, size_bytes):
         raise RuntimeError("Insufficient free space for the requested file size")
+    fd, path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, suffix=TEMP_FILE_SUFFIX, dir=test_dir)
+    os.close(fd)
+    try:
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
 
-    block_size = 8 * 1024 * 1024  # 8 MB blocks
-    blocks = max(1, file_size_bytes // block_size)
-    tail = file_size_bytes - blocks * block_size
 
-    # Use a mixed pattern to avoid extreme CPU use while still resisting compression
-    rand_block = os.urandom(min(block_size, 1024 * 1024))  # 1 MB entropy seed
-    pattern = rand_block * (block_size // len(rand_block))
-    zeros = b"\x00" * block_size
+def _close_buffers(bufs: List[mmap.mmap]) -> None:
+    # When an I/O error is in flight its traceback still holds slices of these
+    # buffers, and close() would raise BufferError in place of that error.
+    # Such a buffer is left for the GC instead.
+    for b in bufs:
+        with suppress(BufferError):
+            b.close()
 
-    write_start = time.perf_counter()
-    w_bytes = 0
+
+def _mb_s(nbytes: int, seconds: float) -> float:
+    return (nbytes / (1024 * 1024)) / max(1e-9, seconds)
+
+
+def _fit_block_size(lanes: int, memory_limit_mb: int) -> int:
+    # Largest power-of-two block <= MAX_BLOCK_SIZE such that the pattern pool,
+    # the zero block and one I/O buffer per lane fit in the memory limit.
+    budget = memory_limit_mb * 1024 * 1024 // (lanes + 2)
+    block = MAX_BLOCK_SIZE
+    while block > budget and block > MIN_BLOCK_SIZE:
+        block //= 2
+    if block > budget:
+        raise ValueError(f"{lanes} in-flight I/Os do not fit in {memory_limit_mb} MB of buffers")
+    return block
+
+
+def _block_plan(total_bytes: int, block_size: int, jobs: int, first_block: int = 0) -> List[range]:
+    # Split the file (from first_block on) into `jobs` contiguous, disjoint
+    # regions of whole blocks, as block-index ranges so the plan costs O(jobs)
+    # memory, not O(blocks).
+    n = -(-total_bytes // block_size) - first_block
+    return [range(first_block + j * n // jobs, first_block + (j + 1) * n // jobs) for j in range(jobs)]
+
+
+def _converged(rates: List[float], tolerance: float = AUTO_SIZE_TOLERANCE) -> bool:
+    window = rates[1:][-AUTO_SIZE_WINDOW:]  # the first round includes ramp-up
+    if len(window) < 5:
+        return False
+    mean = sum(window) / len(window)
+    var = sum((r - mean) ** 2 for r in window) / (len(window) - 1)
+    half_width = 2.0 * (var / len(window)) ** 0.5
+    return mean > 0 and half_width <= tolerance * mean
+
+
+def _auto_size_write(
+    cap_bytes: int,
+    block_size: int,
+    jobs: int,
+    iodepth: int,
+    write_block: Callable[[int, int, int], int],
+    sync: Callable[[], None],
+) -> Tuple[int, List[int], List[float], List[float], bool]:
+    """
+    Write rounds of blocks until the throughput estimate converges or cap_bytes
+    is reached. Each round ends with sync() and its rate includes that time,
+    so convergence is judged on what reached the device, not the page cache.
+    Round sizes follow the measured rate so each round lasts about
+    AUTO_SIZE_ROUND_S. Returns (bytes_written, bytes_per_job, seconds_per_job,
+    round_rates_mb_s, converged).
+    """
+    cap_blocks = -(-cap_bytes // block_size)
+    min_bytes = AUTO_SIZE_MIN_MB * 1024 * 1024
+    job_bytes = [0] * jobs
+    job_time = [0.0] * jobs
+    rates: List[float] = []
+    done_blocks = 0
+    written = 0
+    round_blocks = jobs * iodepth
+    converged = False
+    while done_blocks < cap_blocks:
+        n = min(round_blocks, cap_blocks - done_blocks)
+        end_bytes = min(cap_bytes, (done_blocks + n) * block_size)
+        plan = _block_plan(end_bytes, block_size, jobs, first_block=done_blocks)
+        start = time.perf_counter()
+        _, jb, jt = _parallel_io(plan, iodepth, block_size, end_bytes, write_block)
+        sync()
+        wall = time.perf_counter() - start
+        for j in range(jobs):
+            job_bytes[j] += jb[j]
+            job_time[j] += jt[j]
+        written += sum(jb)
+        done_blocks += n
+        rates.append(_mb_s(sum(jb), wall))
+        if written >= min_bytes and _converged(rates):
+            converged = True
+            break
+        per_block_s = max(1e-9, wall / n)
+        round_blocks = max(jobs * iodepth, int(AUTO_SIZE_ROUND_S / per_block_s))
+    return written, job_bytes, job_time, rates, converged
+
+
+def _parallel_io(
+    plan: List[range],
+    iodepth: int,
+    block_size: int,
+    total_bytes: int,
+    io: Callable[[int, int, int], int],
+) -> Tuple[float, List[int], List[float]]:
+    """
+    Run io(lane, offset, length) over every block in plan with `iodepth` lanes per job.
+    Lane k of a job handles that job's blocks k, k+iodepth, ... so each job keeps
+    up to iodepth I/Os in flight. Returns (wall_time, bytes_per_job, seconds_per_job).
+    """
+    jobs = len(plan)
+
+    def lane(job: int, k: int) -> Tuple[int, int, float]:
+        lane_id = job * iodepth + k
+        done = 0
+        for idx in plan[job][k::iodepth]:
+            off = idx * block_size
+            done += io(lane_id, off, min(block_size, total_bytes - off))
+        return job, done, time.perf_counter()
+
+    job_bytes = [0] * jobs
+    job_end = [0.0] * jobs
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs * iodepth) as pool:
+        futures = [pool.submit(lane, j, k) for j in range(jobs) for k in range(iodepth)]
+        for fut in futures:
+            job, done, end = fut.result()
+            job_bytes[job] += done
+            job_end[job] = max(job_end[job], end)
+    wall = time.perf_counter() - start
+    return wall, job_bytes, [max(1e-9, e - start) for e in job_end]
+
+
+class SpeedTestCancelled(Exception):
+    pass
+
+
+class _Progress:
+    # One counter per lane: each slot has a single writer, so plain int
+    # updates are safe without a lock and cost nothing measurable per block.
+    # Every I/O loop reports here after each block, which also makes it the
+    # cancellation point: a set `cancel` event (or an abandoned generator)
+    # stops all lanes within one block.
+    def __init__(self, lanes: int, cancel: Optional[threading.Event] = None) -> None:
+        self.counts = [0] * lanes
+        self.cancel = cancel
+        self.stopped = False
+
+    def add(self, lane: int, n: int) -> int:
+        if self.stopped or (self.cancel is not None and self.cancel.is_set()):
+            raise SpeedTestCancelled("speed test cancelled")
+        self.counts[lane] += n
+        return n
+
+    def done(self) -> int:
+        return sum(self.counts)
+
+
+def _run_phase(
+    phase: str,
+    work: Callable[[], Any],
+    progress: _Progress,
+    total_bytes: int,
+    interval_s: float,
+) -> Generator[Dict[str, Any], None, Any]:
+    """
+    Run work() on a helper thread and yield a progress event every interval_s
+    until it finishes; returns work()'s value (or re-raises its exception).
+    """
+    box: Dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            box["value"] = work()
+        except BaseException as e:  # re-raised on the consumer's thread
+            box["error"] = e
+
+    t = threading.Thread(target=target, name=f"plugiq-{phase}", daemon=True)
+    start = last_t = time.perf_counter()
+    last_b = 0
+    t.start()
     try:
-        with open(test_file, "wb", buffering=0) as f:
-            for i in range(blocks):
-                buf = pattern if i % 4 != 0 else zeros  # 3:1 mix to reduce CPU
-                f.write(buf)
-                w_bytes += len(buf)
-            if tail:
-                f.write(pattern[:tail])
-                w_bytes += tail
-            f.flush()
-            os.fsync(f.fileno())
+        while True:
+            t.join(interval_s)
+            if not t.is_alive():
+                break
+            now = time.perf_counter()
+            done = progress.done()
+            avg = _mb_s(done, now - start)
+            yield {
+                "event": "progress",
+                "phase": phase,
+                "bytes_done": done,
+                "bytes_total": total_bytes,
+                "elapsed_s": now - start,
+                "inst_mb_s": _mb_s(done - last_b, now - last_t),
+                "avg_mb_s": avg,
+                "eta_s": ((total_bytes - done) / (1024 * 1024)) / avg if done else None,
+            }
+            last_t, last_b = now, done
     finally:
-        write_end = time.perf_counter()
-    write_time = max(1e-9, write_end - write_start)
-    write_mb_s = (w_bytes / (1024 * 1024)) / write_time
+        # Never leave I/O running behind an abandoned generator
+        if t.is_alive():
+            progress.stopped = True
+        t.join()
+    if "error" in box:
+        raise box["error"]
+    return box.get("value")
+
 
-    # Read back
-    read_start = time.perf_counter()
+def _write_stream(path: str, total_bytes: int, gen: PatternGenerator, view: memoryview, progress: _Progress) -> int:
+    block_size = len(view)
+    w_bytes = 0
+    blocks = total_bytes // block_size
+    tail = total_bytes - blocks * block_size
+    with open(path, "wb", buffering=0) as f:
+        for i in range(blocks):
+            w_bytes += progress.add(0, f.write(gen.block(view, i)))
+        if tail:
+            w_bytes += progress.add(0, f.write(gen.block(view[:tail], blocks)))  # memoryview slice: no copy
+        f.flush()
+        os.fsync(f.fileno())
+    return w_bytes
+
+
+def _read_stream(fd: int, view: memoryview, progress: _Progress) -> int:
     r_bytes = 0
+    f = open(fd, "rb", buffering=0, closefd=False)
     try:
-        with open(test_file, "rb", buffering=0) as f:
-            while True:
-                chunk = f.read(block_size)
-                if not chunk:
-                    break
-                r_bytes += len(chunk)
+        while True:
+            n = f.readinto(view)
+            if not n:
+                break
+            r_bytes += progress.add(0, n)
     finally:
-        read_end = time.perf_counter()
+        f.close()
+    return r_bytes
+
+
+def iter_disk_speed_test(
+    test_dir: str,
+    file_size_mb: int = 1024,
+    bypass_cache: bool = True,
+    jobs: int = 1,
+    iodepth: int = 1,
+    memory_limit_mb: int = MEMORY_CEILING_MB,
+    pattern: str = "random",
+    auto_size: bool = False,
+    backend: str = "syscall",
+    progress_interval_s: float = 0.5,
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sequential write and read test using a temporary file on the target directory,
+    as a stream of events so callers can show live progress:
+
+      {"event": "phase", "phase": "write" | "read"}
+      {"event": "progress", "phase", "bytes_done", "bytes_total", "elapsed_s",
+       "inst_mb_s", "avg_mb_s", "eta_s"}          (every progress_interval_s)
+      {"event": "result", "result": {...}}       (last; see run_disk_speed_test)
+
+    The I/O runs on helper threads while this generator only samples per-lane
+    byte counters, so observing progress does not slow the measurement.
+    Setting `cancel` (from any thread) or closing the generator stops the I/O
+    within one block; SpeedTestCancelled is raised and the temp file is removed.
+
+    With bypass_cache the read-back avoids the page cache (see open_uncached)
+    so read_mb_s reflects the device and cable rather than RAM.
+
+    jobs/iodepth select the queue-depth engine: the file is split into `jobs`
+    disjoint regions, each driven by `iodepth` threads issuing os.pwrite/os.pread,
+    so jobs * iodepth I/Os are in flight. jobs=1, iodepth=1 is the classic
+    single-stream test. Per-job throughput is reported under "workers".
+
+    Buffers are preallocated once and bounded by memory_limit_mb (see
+    MEMORY_CEILING_MB); the hot loops only pass memoryviews and readinto targets.
+    pattern picks the write data (see PatternGenerator): unique incompressible
+    "random" blocks by default, or "zeros"/"mixed" to probe compressing devices.
+
+    With auto_size, file_size_mb is only a cap: writing stops as soon as the
+    running throughput estimate settles (see _converged), so slow links finish
+    in seconds while fast ones still get a valid sample. The amount actually
+    needed is reported as file_size_mb, with details under "auto_size".
+
+    backend selects how bytes move (see io_backends): plain syscalls, O_DIRECT,
+    an mmap copy or vectored preadv/pwritev. Comparing backends on one device
+    separates harness overhead from link limits.
+    """
+    if jobs < 1 or iodepth < 1:
+        raise ValueError("jobs and iodepth must be at least 1")
+    io: IOBackend = get_backend(backend)
+    file_size_bytes = file_size_mb * 1024 * 1024
+    parallel = (jobs > 1 or iodepth > 1) and supports_positional_io()
+    if not parallel:
+        jobs = iodepth = 1
+    # The classic single-stream loop over file objects; everything else goes
+    # through the backend at explicit offsets.
+    stream = io.name == "syscall" and not parallel and not auto_size
+    lanes = jobs * iodepth
+    block_size = _fit_block_size(lanes, memory_limit_mb)
+
+    # All buffers are anonymous mmaps: page-aligned, as O_DIRECT requires. Each
+    # lane owns one buffer, used for its pattern blocks while writing and as its
+    # readinto target while reading, so concurrent I/Os never share memory.
+    gen = PatternGenerator(pattern, block_size)
+    bufs = [mmap.mmap(-1, block_size) for _ in range(lanes)]
+    views = [memoryview(b) for b in bufs]
+    for v in views:
+        gen.prime(v)
+    w: Dict[str, Any] = {"job_bytes": None, "auto": None}
+    r: Dict[str, Any] = {"job_bytes": None}
+    with _temp_test_file(test_dir, file_size_bytes) as test_file:
         try:
-            os.remove(test_file)
-        except Exception:
-            pass
-    read_time = max(1e-9, read_end - read_start)
-    read_mb_s = (r_bytes / (1024 * 1024)) / read_time
+            def do_write() -> None:
+                progress = w["progress"]
+                if stream:
+                    write_start = time.perf_counter()
+                    w["bytes"] = _write_stream(test_file, file_size_bytes, gen, views[0], progress)
+                    w["time"] = max(1e-9, time.perf_counter() - write_start)
+                    w["size"] = file_size_bytes
+                    if bypass_cache:
+                        fd = os.open(test_file, os.O_RDONLY)
+                        try:
+                            drop_cached_range(fd)
+                        finally:
+                            os.close(fd)
+                    return
+                wh = io.open_write(test_file, file_size_bytes)
+                try:
+                    def write_block(lane: int, off: int, length: int) -> int:
+                        return progress.add(lane, io.write(wh, gen.block(views[lane][:length], off // block_size), off))
 
+                    write_start = time.perf_counter()
+                    if auto_size:
+                        size, job_bytes, job_time, rates, converged = _auto_size_write(
+                            file_size_bytes, block_size, jobs, iodepth, write_block, lambda: io.sync(wh)
+                        )
+                        w["auto"] = {
+                            "cap_mb": file_size_bytes / (1024 * 1024),
+                            "needed_mb": size / (1024 * 1024),
+                            "converged": converged,
+                            "rounds": len(rates),
+                            "round_mb_s": rates,
+                        }
+                    else:
+                        size = file_size_bytes
+                        plan = _block_plan(size, block_size, jobs)
+                        _, job_bytes, job_time = _parallel_io(plan, iodepth, block_size, size, write_block)
+                    io.sync(wh)
+                    w["time"] = max(1e-9, time.perf_counter() - write_start)
+                    w.update(bytes=sum(job_bytes), job_bytes=job_bytes, job_time=job_time, size=size)
+                    if bypass_cache:
+                        drop_cached_range(wh.fd)
+                finally:
+                    io.close(wh)
+                if auto_size:
+                    # Backends that preallocate (mmap) sized the file for the cap
+                    os.truncate(test_file, size)
+
+            def do_read(allow_direct: bool) -> None:
+                progress = r["progress"]
+                size = w["size"]
+                rh, r["cache_mode"] = io.open_read(test_file, bypass_cache, allow_direct)
+                try:
+                    read_start = time.perf_counter()
+                    if stream:
+                        r["bytes"] = _read_stream(rh.fd, views[0], progress)
+                    else:
+                        def read_block(lane: int, off: int, length: int) -> int:
+                            return progress.add(lane, io.read_into(rh, views[lane][:length], off))
+
+                        plan = _block_plan(size, block_size, jobs)
+                        _, job_bytes, job_time = _parallel_io(plan, iodepth, block_size, size, read_block)
+                        r.update(bytes=sum(job_bytes), job_bytes=job_bytes, job_time=job_time)
+                    r["time"] = max(1e-9, time.perf_counter() - read_start)
+                finally:
+                    io.close(rh)
+
+            yield {"event": "phase", "phase": "write"}
+            w["progress"] = _Progress(lanes, cancel)
+            yield from _run_phase("write", do_write, w["progress"], file_size_bytes, progress_interval_s)
+
+            yield {"event": "phase", "phase": "read"}
+            allow_direct = True
+            while True:
+                r["progress"] = _Progress(lanes, cancel)
+                try:
+                    yield from _run_phase("read", lambda: do_read(allow_direct), r["progress"], w["size"], progress_interval_s)
+                    break
+                except OSError:
+                    if r.get("cache_mode") != "direct" or io.name == "direct":
+                        raise
+                    # Filesystem accepted O_DIRECT at open but rejects the I/O;
+                    # redo the read-back without it.
+                    allow_direct = False
+        finally:
+            for v in views:
+                v.release()
+            _close_buffers(bufs)
+            gen.close()
+
+    result: Dict[str, Any] = {
+        "workload": "sequential",
+        "file_size_mb": w["size"] / (1024 * 1024) if auto_size else file_size_mb,
+        "block_size_bytes": block_size,
+        "write_mb_s": _mb_s(w["bytes"], w["time"]),
+        "write_time_s": w["time"],
+        "read_mb_s": _mb_s(r["bytes"], r["time"]),
+        "read_time_s": r["time"],
+        "cache_mode": r["cache_mode"],
+        "jobs": jobs,
+        "iodepth": iodepth,
+        "pattern": pattern,
+        "io_backend": io.name,
+        # Lane buffers, the random pool and the zero block
+        "buffer_bytes": block_size * (lanes + 2),
+        "path": test_dir,
+    }
+    if w["auto"] is not None:
+        result["auto_size"] = w["auto"]
+    if parallel and w["job_bytes"] is not None and r["job_bytes"] is not None:
+        result["workers"] = [
+            {
+                "job": j,
+                "bytes": w["job_bytes"][j],
+                "write_mb_s": _mb_s(w["job_bytes"][j], w["job_time"][j]),
+                "read_mb_s": _mb_s(r["job_bytes"][j], r["job_time"][j]),
+            }
+            for j in range(jobs)
+        ]
+    yield {"event": "result", "result": result}
+
+
+def format_progress(event: Dict[str, Any]) -> str:
+    # One-line rendering of a "progress" event for terminals
+    total = event.get("bytes_total") or 0
+    pct = 100.0 * event["bytes_done"] / total if total else 0.0
+    eta = event.get("eta_s")
+    return (
+        f"{event['phase'].capitalize():<5} {pct:5.1f}%  {event['inst_mb_s']:8.1f} MB/s "
+        f"(avg {event['avg_mb_s']:.1f})  ETA {'-' if eta is None else f'{eta:.0f}s'}"
+    )
+
+
+def consume_speed_events(events: Iterable[Dict[str, Any]], show: bool) -> Optional[Dict[str, Any]]:
+    # Drain iter_disk_speed_test, drawing a live progress line on stderr
+    result = None
+    width = 0
+    for ev in events:
+        if ev["event"] == "result":
+            result = ev["result"]
+        elif show and ev["event"] == "progress":
+            line = format_progress(ev)
+            width = max(width, len(line))
+            sys.stderr.write("\r" + line.ljust(width))
+            sys.stderr.flush()
+    if show and width:
+        sys.stderr.write("\r" + " " * width + "\r")
+        sys.stderr.flush()
+    return result
+
+
+def run_disk_speed_test(test_dir: str, file_size_mb: int = 1024, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Blocking form of iter_disk_speed_test (same arguments): runs the test and
+    returns the result dict with write/read MB/s, timings and the cache_mode
+    actually used.
+    """
+    result: Dict[str, Any] = {}
+    for event in iter_disk_speed_test(test_dir, file_size_mb, **kwargs):
+        if event["event"] == "result":
+            result = event["result"]
+    return result
+
+
+def run_random_io_test(
+    test_dir: str,
+    file_size_mb: int = 256,
+    block_size: int = 4096,
+    read_pct: int = 70,
+    duration_s: float = 10.0,
+    iodepth: int = 1,
+    bypass_cache: bool = True,
+    seed: Optional[int] = None,
+    pattern: str = "random",
+) -> Dict[str, Any]:
+    """
+    Random-access workload: block_size I/Os at random aligned offsets inside a
+    preallocated temp file, read_pct percent of them reads and the rest writes,
+    for duration_s seconds with `iodepth` threads issuing I/O concurrently.
+    Every I/O is timed into a LatencyHistogram, so latency spikes and retries
+    show up in the tail percentiles even when average bandwidth looks fine.
+    Returns dict with IOPS and p50/p90/p99/p99.9 latencies in microseconds.
+    """
+    if block_size <= 0 or block_size % 512:
+        raise ValueError("block_size must be a positive multiple of 512 bytes")
+    if not 0 <= read_pct <= 100:
+        raise ValueError("read_pct must be between 0 and 100")
+    if duration_s <= 0 or iodepth < 1:
+        raise ValueError("duration_s must be positive and iodepth at least 1")
+    file_size_bytes = file_size_mb * 1024 * 1024
+    nblocks = file_size_bytes // block_size
+    if nblocks < 1:
+        raise ValueError("file_size_mb is smaller than one block")
+    if not supports_positional_io():
+        iodepth = 1
+    rng_seed = seed if seed is not None else int.from_bytes(os.urandom(4), "little")
+
+    with _temp_test_file(test_dir, file_size_bytes) as test_file:
+        # Lay the file down first so reads hit real blocks rather than sparse holes
+        fill_gen = PatternGenerator("random", MAX_BLOCK_SIZE)
+        fill = mmap.mmap(-1, MAX_BLOCK_SIZE)
+        with memoryview(fill) as fill_view:
+            fill_gen.prime(fill_view)
+            _write_stream(test_file, file_size_bytes, fill_gen, fill_view, _Progress(1))
+        fill.close()
+        fill_gen.close()
+        gen = PatternGenerator(pattern, block_size)
+
+        def lane(fd: int, k: int, deadline_ns: int) -> Tuple[LatencyHistogram, LatencyHistogram]:
+            rng = random.Random(rng_seed + k)
+            reads, writes = LatencyHistogram(), LatencyHistogram()
+            rbuf = mmap.mmap(-1, block_size)
+            wbuf = mmap.mmap(-1, block_size)
+            rview, wview = memoryview(rbuf), memoryview(wbuf)
+            gen.prime(wview)
+            seq = k << 48  # per-lane block numbers never collide
+            clock = time.perf_counter_ns
+            try:
+                while clock() < deadline_ns:
+                    off = rng.randrange(nblocks) * block_size
+                    if rng.random() * 100 < read_pct:
+                        t0 = clock()
+                        pread_into(fd, rview, off)
+                        reads.record(clock() - t0)
+                    else:
+                        data = gen.block(wview, seq)
+                        seq += 1
+                        t0 = clock()
+                        pwrite_all(fd, data, off)
+                        writes.record(clock() - t0)
+            finally:
+                rview.release()
+                wview.release()
+                _close_buffers([rbuf, wbuf])
+            return reads, writes
+
+        allow_direct = True
+        while True:
+            fd, cache_mode = open_uncached(test_file, bypass_cache, allow_direct, writable=read_pct < 100)
+            try:
+                start = time.perf_counter()
+                deadline_ns = time.perf_counter_ns() + int(duration_s * 1e9)
+                with ThreadPoolExecutor(max_workers=iodepth) as pool:
+                    parts = list(pool.map(lambda k: lane(fd, k, deadline_ns), range(iodepth)))
+                elapsed = max(1e-9, time.perf_counter() - start)
+                break
+            except OSError:
+                if cache_mode != "direct":
+                    raise
+                # O_DIRECT rejected at I/O time (e.g. block smaller than the
+                # device's logical sector); rerun through the fallback path.
+                allow_direct = False
+            finally:
+                os.close(fd)
+        gen.close()
+
+    reads, writes, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for r, w in parts:
+        reads.merge(r)
+        writes.merge(w)
+        both.merge(r)
+        both.merge(w)
     return {
+        "workload": "random",
         "file_size_mb": file_size_mb,
         "block_size_bytes": block_size,
-        "write_mb_s": write_mb_s,
-        "write_time_s": write_time,
-        "read_mb_s": read_mb_s,
-        "read_time_s": read_time,
+        "read_pct": read_pct,
+        "iodepth": iodepth,
+        "pattern": pattern,
+        "duration_s": elapsed,
+        "ops": both.total,
+        "iops": both.total / elapsed,
+        "read_iops": reads.total / elapsed,
+        "write_iops": writes.total / elapsed,
+        "mb_s": _mb_s(both.total * block_size, elapsed),
+        "latency_us": both.summary_us(),
+        "read_latency_us": reads.summary_us(),
+        "write_latency_us": writes.summary_us(),
+        "cache_mode": cache_mode,
+        "path": test_dir,
+    }
+
+
+def _analyze_samples(samples: List[Dict[str, float]], knee_ratio: float = 0.7, throttle_ratio: float = 0.8) -> Dict[str, Any]:
+    """
+    Summarize per-interval throughput: burst rate (the first few intervals),
+    sustained rate (median of the second half), the cache-exhaustion knee
+    (first interval after which throughput stays below knee_ratio * burst) and
+    throttling (a further decline within the post-knee steady state).
+    """
+    rates = [s["mb_s"] for s in samples]
+    n = len(rates)
+    if not n:
+        return {"burst_mb_s": None, "sustained_mb_s": None, "knee_s": None, "knee_mb": None, "throttling": False}
+    head = rates[: max(1, min(5, n // 10))]
+    burst = sum(head) / len(head)
+    sustained = median(rates[n // 2:])
+
+    knee_idx: Optional[int] = None
+    for i in range(len(head), n):
+        if rates[i] < knee_ratio * burst and median(rates[i:]) < knee_ratio * burst:
+            knee_idx = i
+            break
+
+    # Throttling: the steady region after the knee keeps sliding downhill
+    steady = rates[knee_idx if knee_idx is not None else len(head):]
+    throttling = False
+    if len(steady) >= 8:
+        q = len(steady) // 4
+        throttling = median(steady[-q:]) < throttle_ratio * median(steady[:q])
+
+    out: Dict[str, Any] = {
+        "burst_mb_s": burst,
+        "sustained_mb_s": sustained,
+        "knee_s": None,
+        "knee_mb": None,
+        "throttling": throttling,
+    }
+    if knee_idx is not None:
+        prev = samples[knee_idx - 1]
+        out["knee_s"] = prev["t_s"]
+        out["knee_mb"] = sum(s["bytes"] for s in samples[:knee_idx]) / (1024 * 1024)
+    return out
+
+
+def run_sustained_write_test(
+    test_dir: str,
+    duration_s: float = 60.0,
+    file_size_mb: int = 1024,
+    interval_s: float = 1.0,
+    bypass_cache: bool = True,
+    pattern: str = "random",
+) -> Dict[str, Any]:
+    """
+    Time-based steady-state write test. Writes sequentially for duration_s,
+    wrapping around a file_size_mb temp file, and records one throughput sample
+    per interval_s. Unlike a fixed-size run, this exposes the point where an
+    SSD's SLC cache fills (the "knee") and thermal throttling, and reports the
+    burst and sustained rates separately instead of one average.
+    """
+    if duration_s <= 0 or interval_s <= 0:
+        raise ValueError("duration_s and interval_s must be positive")
+    block_size = MAX_BLOCK_SIZE
+    file_size_bytes = max(block_size, file_size_mb * 1024 * 1024 // block_size * block_size)
+
+    samples: List[Dict[str, float]] = []
+    with _temp_test_file(test_dir, file_size_bytes) as test_file:
+        open(test_file, "wb").close()
+        allow_direct = True
+        while True:
+            fd, cache_mode = open_uncached(test_file, bypass_cache, allow_direct, writable=True)
+            gen = PatternGenerator(pattern, block_size)
+            buf = mmap.mmap(-1, block_size)  # page-aligned for O_DIRECT
+            view = memoryview(buf)
+            gen.prime(view)
+            try:
+                samples = []
+                total = 0
+                off = 0
+                start = last = time.perf_counter()
+                deadline = start + duration_s
+                interval_bytes = 0
+                block_no = 0
+                while True:
+                    total += pwrite_all(fd, gen.block(view, block_no), off)
+                    block_no += 1
+                    interval_bytes += block_size
+                    off = (off + block_size) % file_size_bytes
+                    now = time.perf_counter()
+                    if now - last >= interval_s or now >= deadline:
+                        samples.append({"t_s": now - start, "bytes": interval_bytes, "mb_s": _mb_s(interval_bytes, now - last)})
+                        last, interval_bytes = now, 0
+                    if now >= deadline:
+                        break
+                os.fsync(fd)
+                elapsed = max(1e-9, time.perf_counter() - start)
+                break
+            except OSError:
+                if cache_mode != "direct":
+                    raise
+                allow_direct = False
+            finally:
+                view.release()
+                _close_buffers([buf])
+                gen.close()
+                os.close(fd)
+
+    analysis = _analyze_samples(samples)
+    result: Dict[str, Any] = {
+        "workload": "sustained",
+        "file_size_mb": file_size_bytes // (1024 * 1024),
+        "block_size_bytes": block_size,
+        "duration_s": elapsed,
+        "interval_s": interval_s,
+        "pattern": pattern,
+        "written_mb": total / (1024 * 1024),
+        # The link-bound rate is the burst before the drive's cache fills, so
+        # that is what speed classification should see.
+        "write_mb_s": analysis["burst_mb_s"],
+        "samples": samples,
+        "cache_mode": cache_mode,
         "path": test_dir,
     }
+    result.update(analysis)
+    return result
+
+
+def run_speed_trials(test_dir: str, trials: int = 3, warmup: int = 1, **kwargs: Any) -> Dict[str, Any]:
+    """
+    Repeat run_disk_speed_test: `warmup` discarded runs (to settle caches,
+    link power states and thermals) followed by `trials` measured runs.
+    Returns the last run's details with write_mb_s/read_mb_s replaced by the
+    median across trials, plus per-metric statistics (see stats.summarize)
+    under "stats" and the raw per-trial figures under "runs". "best_mb_s" is
+    max(write, read) per trial, the basis for speed classification.
+    """
+    if trials < 1 or warmup < 0:
+        raise ValueError("trials must be at least 1 and warmup non-negative")
+    for _ in range(warmup):
+        run_disk_speed_test(test_dir, **kwargs)
+    runs: List[Dict[str, Any]] = []
+    last: Dict[str, Any] = {}
+    for _ in range(trials):
+        last = run_disk_speed_test(test_dir, **kwargs)
+        runs.append({"write_mb_s": last["write_mb_s"], "read_mb_s": last["read_mb_s"]})
+
+    stats = {
+        "write_mb_s": summarize([r["write_mb_s"] for r in runs]),
+        "read_mb_s": summarize([r["read_mb_s"] for r in runs]),
+        "best_mb_s": summarize([max(r["write_mb_s"], r["read_mb_s"]) for r in runs]),
+    }
+    result = dict(last)
+    result.update(
+        {
+            "trials": trials,
+            "warmup": warmup,
+            "write_mb_s": stats["write_mb_s"]["median"],
+            "read_mb_s": stats["read_mb_s"]["median"],
+            "stats": stats,
+            "runs": runs,
+        }
+    )
+    return result
+
+
+def _drop(solo: Optional[float], shared: Optional[float]) -> Optional[float]:
+    if not solo or shared is None:
+        return None
+    return max(0.0, 1.0 - shared / solo)
+
+
+def run_multi_device_test(
+    test_dirs: List[str],
+    solo_baseline: bool = True,
+    contention_ratio: float = 0.8,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Run the sequential test on several directories at once (one thread each,
+    every device with its own unique temp file) and report per-device results
+    plus the aggregate. The write and read phases are aligned across devices
+    with a barrier, so every read measurement overlaps the others' reads.
+
+    With solo_baseline each device is first measured on its own. A device whose
+    concurrent write or read rate falls below contention_ratio of its solo rate
+    is flagged "contended": it shares bandwidth (typically a host controller or
+    hub uplink) with the others. kwargs are passed to iter_disk_speed_test.
+    """
+    dirs = list(test_dirs)
+    if not dirs:
+        raise ValueError("at least one test directory is required")
+    if len(set(os.path.realpath(d) for d in dirs)) != len(dirs):
+        raise ValueError("test directories must be distinct")
+    if not 0 < contention_ratio <= 1:
+        raise ValueError("contention_ratio must be in (0, 1]")
+
+    solo: List[Optional[Dict[str, Any]]] = [None] * len(dirs)
+    if solo_baseline:
+        for i, d in enumerate(dirs):
+            solo[i] = run_disk_speed_test(d, **kwargs)
+
+    barrier = threading.Barrier(len(dirs))
+    shared: List[Optional[Dict[str, Any]]] = [None] * len(dirs)
+    errors: List[Optional[BaseException]] = [None] * len(dirs)
+
+    def device(i: int) -> None:
+        try:
+            for ev in iter_disk_speed_test(dirs[i], **kwargs):
+                if ev["event"] == "phase":
+                    try:
+                        barrier.wait()
+                    except threading.BrokenBarrierError:
+                        pass  # another device failed; finish unsynchronized
+                elif ev["event"] == "result":
+                    shared[i] = ev["result"]
+        except BaseException as e:
+            errors[i] = e
+            barrier.abort()
+
+    threads = [threading.Thread(target=device, args=(i,), name=f"plugiq-dev{i}", daemon=True) for i in range(len(dirs))]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    for e in errors:
+        if e is not None:
+            raise e
+
+    devices: List[Dict[str, Any]] = []
+    for i, d in enumerate(dirs):
+        res = shared[i] or {}
+        entry: Dict[str, Any] = {"path": d, "result": res}
+        if solo[i] is not None:
+            base = solo[i] or {}
+            drops = [
+                _drop(base.get("write_mb_s"), res.get("write_mb_s")),
+                _drop(base.get("read_mb_s"), res.get("read_mb_s")),
+            ]
+            worst = max((x for x in drops if x is not None), default=None)
+            entry["solo"] = {"write_mb_s": base.get("write_mb_s"), "read_mb_s": base.get("read_mb_s")}
+            entry["drop_pct"] = None if worst is None else 100.0 * worst
+            entry["contended"] = worst is not None and worst > 1.0 - contention_ratio
+        devices.append(entry)
+
+    contended = [e["path"] for e in devices if e.get("contended")]
+    return {
+        "workload": "multi",
+        "devices": devices,
+        "aggregate": {
+            # Phases are barrier-aligned, so summed rates are concurrent totals
+            "write_mb_s": sum(e["result"].get("write_mb_s", 0.0) for e in devices),
+            "read_mb_s": sum(e["result"].get("read_mb_s", 0.0) for e in devices),
+            "wall_time_s": wall,
+        },
+        "solo_baseline": solo_baseline,
+        "contention": bool(contended) if solo_baseline else None,
+        "contended_paths": contended,
+    }
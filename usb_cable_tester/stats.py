@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Sequence
+
+
+# Two-sided 95% Student t critical values by degrees of freedom (1..30);
+# beyond that the normal approximation is within 2%.
+_T95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+# Modified z-score cutoff (Iglewicz & Hoaglin) for outlier rejection
+OUTLIER_Z = 3.5
+
+
+def t95(df: int) -> float:
+    if df < 1:
+        return float("nan")
+    return _T95[df - 1] if df <= len(_T95) else 1.96
+
+
+def median(values: Sequence[float]) -> float:
+    v = sorted(values)
+    n = len(v)
+    if not n:
+        raise ValueError("median of empty sequence")
+    return v[n // 2] if n % 2 else (v[n // 2 - 1] + v[n // 2]) / 2.0
+
+
+def reject_outliers(values: Sequence[float], z: float = OUTLIER_Z) -> List[float]:
+    """
+    Drop values whose modified z-score (based on the median absolute deviation)
+    exceeds z. Needs at least 3 samples; never drops below half of them.
+    """
+    vals = list(values)
+    if len(vals) < 3:
+        return vals
+    med = median(vals)
+    mad = median([abs(v - med) for v in vals])
+    if mad == 0:
+        return vals
+    kept = [v for v in vals if abs(0.6745 * (v - med) / mad) <= z]
+    return kept if len(kept) * 2 >= len(vals) else vals
+
+
+def summarize(values: Sequence[float], z: float = OUTLIER_Z) -> Dict[str, Any]:
+    """
+    Mean, median, sample stddev, min/max and a 95% confidence interval of the
+    mean, computed after outlier rejection. "rejected" lists dropped samples.
+    """
+    vals = [float(v) for v in values if v is not None]
+    if not vals:
+        return {"n": 0}
+    kept = reject_outliers(vals, z)
+    rejected = list(vals)
+    for v in kept:
+        rejected.remove(v)
+    n = len(kept)
+    mean = sum(kept) / n
+    stddev = math.sqrt(sum((v - mean) ** 2 for v in kept) / (n - 1)) if n > 1 else 0.0
+    half = t95(n - 1) * stddev / math.sqrt(n) if n > 1 else None
+    return {
+        "n": n,
+        "mean": mean,
+        "median": median(kept),
+        "stddev": stddev,
+        "min": min(kept),
+        "max": max(kept),
+        "ci95_low": None if half is None else mean - half,
+        "ci95_high": None if half is None else mean + half,
+        "rejected": rejected,
+    }
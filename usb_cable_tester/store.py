@@ -2,24 +2,324 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any, Dict, Optional
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None  # type: ignore
 
-DB_FILE = ".usb_cable_results.json"
 
+# Results are an append-only JSONL log, one record per line. A save is one
+# O_APPEND write under a lock, so it costs the same however long the history
+# is, and concurrent savers cannot lose each other's records.
+DB_FILE = ".usb_cable_results.jsonl"
+# Earlier versions rewrote a single JSON array here. It is migrated on first
+# use and kept as <name>.bak.
+LEGACY_DB_FILE = ".usb_cable_results.json"
 
-def save_result(entry: Dict[str, Any], path: Optional[str] = None) -> str:
+# The log is compacted (see compact) each time it grows by this much, and
+# right after a save finds a line torn by a crash.
+COMPACT_GROWTH_BYTES = 64 * 1024 * 1024
+
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+def _log_path(path: Optional[str]) -> str:
+    # The legacy name resolves to the log beside it, so a legacy array is
+    # migrated into DB_FILE rather than rewritten in place under its old name
     target = path or os.path.join(os.getcwd(), DB_FILE)
-    data = []
-    if os.path.exists(target):
+    if os.path.basename(target) == LEGACY_DB_FILE:
+        target = os.path.join(os.path.dirname(target), DB_FILE)
+    return target
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[int]:
+    # A sidecar lock file, since compaction replaces the log itself. It also
+    # holds the log's size after the last compaction.
+    fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT | _O_BINARY, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield fd
+    finally:
+        if fcntl is None and msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+def _compacted_size(lock_fd: int) -> int:
+    os.lseek(lock_fd, 0, os.SEEK_SET)
+    raw = os.read(lock_fd, 32).strip()
+    return int(raw) if raw.isdigit() else 0
+
+
+def _set_compacted_size(lock_fd: int, size: int) -> None:
+    os.ftruncate(lock_fd, 0)
+    os.lseek(lock_fd, 0, os.SEEK_SET)
+    os.write(lock_fd, str(size).encode())
+    os.lseek(lock_fd, 0, os.SEEK_SET)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _temp_beside(path: str, like: str) -> Tuple[int, str]:
+    # mkstemp creates the file 0600; give it the mode of the file it replaces
+    # (`like`), or the mode save_result creates the log with
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        mode = stat.S_IMODE(os.stat(like).st_mode)
+    except OSError:
+        mode = 0o644
+    os.chmod(tmp, mode)
+    return fd, tmp
+
+
+def _is_json_array(path: str) -> bool:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read(64).lstrip().startswith(b"[")
+    except OSError:
+        return False
+
+
+def _migrate(path: str) -> None:
+    # Convert a legacy JSON array (at path, or the legacy name beside the
+    # default log) to JSON lines. The caller holds the lock. A corrupt array
+    # keeps every record decoded before the damage and is set aside as
+    # <name>.corrupt instead of being discarded.
+    source = path
+    if not os.path.exists(path):
+        legacy = os.path.join(os.path.dirname(path), LEGACY_DB_FILE)
+        if os.path.basename(path) != DB_FILE or not os.path.exists(legacy):
+            return
+        if not _is_json_array(legacy):
+            os.replace(legacy, path)  # already JSON lines (converted in place by an earlier version)
+            return
+        source = legacy
+    elif not _is_json_array(path):
+        return
+    fd, tmp = _temp_beside(path, source)
+    intact = True
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as out:
+            try:
+                for rec in _iter_json_array(source):
+                    out.write(json.dumps(rec) + "\n")
+            except ValueError:
+                intact = False
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(source, source + (".bak" if intact else ".corrupt"))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def save_result(entry: Dict[str, Any], path: Optional[str] = None) -> str:
+    """
+    Append one record to the results log, creating it (or migrating a legacy
+    JSON array) on first use. The record goes out in a single O_APPEND write,
+    fsynced, under the log's lock. Returns the log path.
+    """
+    target = _log_path(path)
+    data = (json.dumps(entry) + "\n").encode("utf-8")
+    with _locked(target) as lock:
+        _migrate(target)
+        fd = os.open(target, os.O_RDWR | os.O_APPEND | os.O_CREAT | _O_BINARY, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            torn = False
+            if size:
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                torn = os.read(fd, 1) != b"\n"
+            if torn:
+                data = b"\n" + data  # a crash cut the last record short; start a new line
+            _write_all(fd, data)
+            os.fsync(fd)
+            size += len(data)
+        finally:
+            os.close(fd)
+        due = torn or size - _compacted_size(lock) > COMPACT_GROWTH_BYTES
+    if due:
         try:
-            with open(target, "r", encoding="utf-8") as fh:
-                data = json.load(fh)
-                if not isinstance(data, list):
-                    data = []
-        except Exception:
-            data = []
-    data.append(entry)
-    with open(target, "w", encoding="utf-8") as fh:
-        json.dump(data, fh, indent=2)
+            compact(target)
+        except (OSError, RuntimeError):
+            pass  # the record is saved; compaction is retried on a later save
     return target
+
+
+def _read_lines(path: str, limit: Optional[int] = None) -> Iterator[str]:
+    with open(path, "rb") as fh:
+        done = 0
+        for raw in fh:
+            if limit is not None:
+                if done >= limit:
+                    return
+                raw = raw[: limit - done]
+            done += len(raw)
+            line = raw.strip()
+            if line:
+                yield line.decode("utf-8", "replace")
+
+
+def iter_lines(path: Optional[str] = None) -> Iterator[str]:
+    """Raw non-empty lines of the results log (migrating a legacy file first)."""
+    target = _log_path(path)
+    with _locked(target):
+        _migrate(target)
+    yield from _read_lines(target)
+
+
+def iter_results(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Saved results in order, streamed from the log. Lines that are not a valid
+    record (cut short by a crash, or hand-edited) are skipped.
+    """
+    for line in iter_lines(path):
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(rec, dict):
+            yield rec
+
+
+def rewrite_lines(transform: Callable[[Iterator[str]], Iterable[str]], path: Optional[str] = None) -> str:
+    """
+    Replace the log with transform(its lines). Savers are not blocked while
+    transform runs: the log is read up to its size at the start, and records
+    appended meanwhile are carried over unchanged before the new file is
+    renamed into place. Raises RuntimeError if another rewrite replaced the
+    log in the meantime.
+    """
+    target = _log_path(path)
+    with _locked(target):
+        _migrate(target)
+        start = os.stat(target)
+    fd, tmp = _temp_beside(target, target)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for line in transform(_read_lines(target, start.st_size)):
+                out.write(line.encode("utf-8") + b"\n")
+            with _locked(target) as lock:
+                now = os.stat(target)
+                if (now.st_dev, now.st_ino) != (start.st_dev, start.st_ino):
+                    raise RuntimeError(f"{target} was rewritten concurrently; try again")
+                with open(target, "rb") as fh:
+                    fh.seek(start.st_size)
+                    shutil.copyfileobj(fh, out)
+                out.flush()
+                os.fsync(out.fileno())
+                out.close()
+                os.replace(tmp, target)
+                _set_compacted_size(lock, os.path.getsize(target))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return target
+
+
+def compact(path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rewrite the log without lines that are not valid records; those are
+    appended to <log>.corrupt rather than dropped. Returns how many lines
+    were kept and moved.
+    """
+    target = _log_path(path)
+    counts = {"kept": 0, "moved": 0}
+
+    def transform(lines: Iterator[str]) -> Iterator[str]:
+        bad = None
+        try:
+            for line in lines:
+                try:
+                    ok = isinstance(json.loads(line), dict)
+                except ValueError:
+                    ok = False
+                if ok:
+                    counts["kept"] += 1
+                    yield line
+                    continue
+                counts["moved"] += 1
+                if bad is None:
+                    bad = open(target + ".corrupt", "a", encoding="utf-8")
+                bad.write(line + "\n")
+        finally:
+            if bad is not None:
+                bad.close()
+
+    rewrite_lines(transform, target)
+    return counts
+
+
+_WS = " \t\r\n"
+_READ_SIZE = 1 << 20
+
+
+def _iter_json_array(target: str) -> Iterator[Any]:
+    # Elements of a (legacy) JSON array file, decoded one at a time from
+    # buffered reads. Raises ValueError if the file is not a JSON array.
+    decoder = json.JSONDecoder()
+    with open(target, "r", encoding="utf-8") as fh:
+        buf, pos, eof = "", 0, False
+
+        def more() -> bool:
+            nonlocal buf, pos, eof
+            chunk = fh.read(_READ_SIZE)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            return not eof
+
+        def skip(chars: str) -> Optional[str]:
+            # Advance past `chars`; the next character, or None at end of file
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not more():
+                    return None
+
+        if skip(_WS) != "[":
+            raise ValueError(f"{target}: not a JSON array")
+        pos += 1
+        while True:
+            ch = skip(_WS + ",")
+            if ch is None:
+                raise ValueError(f"{target}: truncated JSON array")
+            if ch == "]":
+                return
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError(f"{target}: invalid JSON in results")
+                more()
+            pos = end
+            yield item
+
+
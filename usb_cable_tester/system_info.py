@@ -1,66 +1,342 @@
 from __future__ import annotations
 
+import functools
 import json
 import os
 import platform
 import re
 import shlex
-import subprocess
-from typing import Any, Dict
-import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
+from .runner import EXIT_NOT_FOUND, EXIT_TIMEOUT, run_command
+from .usb_sysfs import enumerate_usb_devices
 
-def _run(cmd: str, timeout: float = 10.0) -> tuple[int, str, str]:
+
+# Overall wall-clock budget for get_system_info. Sections probe concurrently
+# and every command's timeout is clipped to the shared deadline, so one hung
+# tool (say xrandr on a headless box) costs at most the budget, not N x 10 s.
+PROBE_BUDGET_S = 8.0
+# Extra wait for sections to return partial data once their commands were cut off
+_GRACE_S = 0.5
+
+# Per-section bookkeeping, set by the worker thread running that section
+_ctx = threading.local()
+
+
+def _env_ttl(name: str, default: float) -> float:
+    # A malformed value must not break every entry point at import time
     try:
-        p = subprocess.run(
-            cmd,
-            shell=True,
-            check=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout,
-        )
-        return p.returncode, p.stdout, p.stderr
-    except subprocess.TimeoutExpired as e:
-        return 124, e.stdout or "", e.stderr or ""
-
-
-def _which(bin_name: str) -> bool:
-    return shutil.which(bin_name) is not None
-
-
-def get_system_info() -> Dict[str, Any]:
-    os_name = platform.system().lower()
-    info: Dict[str, Any] = {"os": os_name}
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+# Probe results are reused for this long (seconds; USBCT_PROBE_TTL overrides,
+# 0 disables) unless the device topology fingerprint changes first.
+PROBE_CACHE_TTL_S = _env_ttl("USBCT_PROBE_TTL", 30.0)
+
+# Attach/detach adds or removes entries here; each entry's lstat mtime is its
+# creation time, so a replug shows up even when the name is reused.
+_FINGERPRINT_DIRS = (
+    "bus/usb/devices",
+    "class/typec",
+    "bus/thunderbolt/devices",
+)
+
+# Command capture/replay for probe snapshots (see snapshot.py): while set,
+# every _run result is stored in _recording, or served from _replaying.
+_recording: Optional[Dict[str, List[Any]]] = None
+_replaying: Optional[Dict[str, List[Any]]] = None
+
+_cache_lock = threading.Lock()
+_cache: Dict[str, Any] = {"key": None, "fingerprint": None, "sections": {}}
+
+
+@contextmanager
+def recording_commands() -> Iterator[Dict[str, List[Any]]]:
+    global _recording
+    _recording = {}
+    try:
+        yield _recording
+    finally:
+        _recording = None
+
+
+@contextmanager
+def replaying_commands(commands: Dict[str, List[Any]]) -> Iterator[None]:
+    global _replaying
+    _replaying = commands
+    try:
+        yield
+    finally:
+        _replaying = None
 
+
+def _run(argv: List[str], timeout: float = 10.0) -> tuple[int, str, str]:
+    # Snapshots key commands by their shell-quoted form, e.g. "lsusb -t"
+    cmd = shlex.join(argv)
+    if _replaying is not None:
+        rec = _replaying.get(cmd) or [EXIT_NOT_FOUND, "", f"{argv[0]}: not recorded"]
+        code, out, err = rec[0], rec[1], rec[2]
+    else:
+        code, out, err = _execute(argv, timeout)
+        if _recording is not None:
+            _recording[cmd] = [code, out, err]
+    if code == EXIT_NOT_FOUND and hasattr(_ctx, "missing"):
+        _ctx.missing.append(argv[0])
+    elif code == EXIT_TIMEOUT:
+        _ctx.timed_out = True
+    return code, out, err
+
+
+def _execute(argv: List[str], timeout: float) -> tuple[int, str, str]:
+    deadline = getattr(_ctx, "deadline", None)
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return EXIT_TIMEOUT, "", ""
+    return run_command(argv, timeout)
+
+
+def _probe_sections(sections: Dict[str, Callable[[], Dict[str, Any]]], budget_s: float) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run the section probes concurrently on daemon threads under one deadline.
+    Returns (data by section, status by section); a status is "ok",
+    "timed-out", "missing-tool" or "error", with elapsed_s and any missing tools.
+    """
+    start = time.monotonic()
+    deadline = start + budget_s
+    done: Dict[str, Dict[str, Any]] = {}
+
+    def worker(name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        _ctx.deadline, _ctx.missing, _ctx.timed_out = deadline, [], False
+        t0 = time.monotonic()
+        try:
+            data, status = fn(), "ok"
+        except Exception as e:
+            data, status = {"error": str(e)}, "error"
+        if _ctx.timed_out:
+            status = "timed-out"
+        elif status == "ok" and _ctx.missing and not data:
+            status = "missing-tool"
+        slot: Dict[str, Any] = {"data": data, "status": status, "elapsed_s": time.monotonic() - t0}
+        if _ctx.missing:
+            slot["missing"] = sorted(set(_ctx.missing))
+        done[name] = slot  # single assignment: the reader sees all or nothing
+
+    threads = [
+        threading.Thread(target=worker, args=(name, fn), name=f"plugiq-probe-{name}", daemon=True)
+        for name, fn in sections.items()
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(max(0.0, deadline + _GRACE_S - time.monotonic()))
+
+    data: Dict[str, Any] = {}
+    status: Dict[str, Any] = {}
+    for name in sections:
+        slot = done.get(name)
+        if slot is None:
+            # Still stuck (e.g. a hung sysfs read); abandon the daemon thread
+            data[name] = {}
+            status[name] = {"status": "timed-out", "elapsed_s": time.monotonic() - start}
+        else:
+            data[name] = slot.pop("data")
+            status[name] = slot
+    return data, status
+
+
+def _topology_fingerprint(sysfs_root: str = "/sys") -> Optional[tuple]:
+    # Directory listings plus entry mtimes: a few syscalls, no file reads.
+    # None when none of the directories exist (no sysfs: macOS, Windows).
+    parts = []
+    for rel in _FINGERPRINT_DIRS:
+        try:
+            with os.scandir(os.path.join(sysfs_root, rel)) as it:
+                parts.append(tuple(sorted((e.name, e.stat(follow_symlinks=False).st_mtime_ns) for e in it)))
+        except OSError:
+            parts.append(None)
+    return tuple(parts) if any(p is not None for p in parts) else None
+
+
+def clear_probe_cache() -> None:
+    with _cache_lock:
+        _cache.update(key=None, fingerprint=None, sections={})
+
+
+def _section_probes(os_name: str, sysfs_root: str) -> Optional[Dict[str, Callable[[], Dict[str, Any]]]]:
+    # Probe function per section for this OS; None if the OS is unsupported
     if os_name == "darwin":  # macOS
-        info["usb"] = _mac_usb_info()
-        info["thunderbolt"] = _mac_thunderbolt_info()
-        info["display"] = _mac_display_info()
         # macOS does not generally expose Type-C cable identity; skip.
-    elif os_name == "linux":
-        info["usb"] = _linux_usb_info()
-        info["thunderbolt"] = _linux_thunderbolt_info()
-        info["typec"] = _linux_typec_info()
-        info["display"] = _linux_display_info()
-    elif os_name == "windows":
-        info["usb"] = _windows_usb_info()
-        info["thunderbolt"] = _windows_thunderbolt_info()
-        info["display"] = _windows_display_info()
+        return {"usb": _mac_usb_info, "thunderbolt": _mac_thunderbolt_info, "display": _mac_display_info}
+    if os_name == "linux":
+        return {
+            name: functools.partial(fn, sysfs_root)
+            for name, fn in (
+                ("usb", _linux_usb_info),
+                ("thunderbolt", _linux_thunderbolt_info),
+                ("typec", _linux_typec_info),
+                ("display", _linux_display_info),
+            )
+        }
+    if os_name == "windows":
         # Windows Type-C identity not generally available.
-    else:
+        return {"usb": _windows_usb_info, "thunderbolt": _windows_thunderbolt_info, "display": _windows_display_info}
+    return None
+
+
+def section_names(os_name: Optional[str] = None) -> Tuple[str, ...]:
+    return tuple(_section_probes(os_name or platform.system().lower(), "/sys") or ())
+
+
+def get_system_info(
+    budget_s: float = PROBE_BUDGET_S,
+    cache_ttl_s: Optional[float] = None,
+    refresh: bool = False,
+    sysfs_root: str = "/sys",
+    os_name: Optional[str] = None,
+    sections: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Probe USB, Thunderbolt, Type-C and display state, or only the named
+    `sections` (see section_names). Sections run concurrently within budget_s
+    seconds overall; per-section status and timing are reported under "probe".
+
+    Sections are cached for cache_ttl_s (default PROBE_CACHE_TTL_S) and
+    reused while the sysfs topology fingerprint is unchanged. Without a
+    fingerprint (no sysfs) a change cannot be detected, so every call probes
+    afresh. A result served
+    entirely from cache is marked with probe.cached and probe.age_s.
+    refresh=True forces a new probe. Section data is shared with the cache:
+    treat it as read-only. sysfs_root relocates the Linux sysfs reads (e.g. to
+    a fixture tree) and os_name overrides platform detection; both serve
+    snapshot replay.
+    """
+    os_name = os_name or platform.system().lower()
+    info: Dict[str, Any] = {"os": os_name}
+    probes = _section_probes(os_name, sysfs_root)
+    if probes is None:
         info["note"] = f"Unsupported OS: {os_name}"
-
+        return info
+    wanted = list(probes) if sections is None else list(dict.fromkeys(sections))
+    unknown = [n for n in wanted if n not in probes]
+    if unknown:
+        raise ValueError(f"Unknown probe section(s) for {os_name}: {', '.join(unknown)}")
+
+    ttl = PROBE_CACHE_TTL_S if cache_ttl_s is None else cache_ttl_s
+    start = time.monotonic()
+    age: Optional[float] = None
+    fingerprint = _topology_fingerprint(sysfs_root) if ttl > 0 else None
+    if fingerprint is None:
+        data, status = _probe_sections({n: probes[n] for n in wanted}, budget_s)
+    else:
+        key = (sysfs_root, os_name)
+        with _cache_lock:
+            now = time.monotonic()
+            if _cache["key"] != key or _cache["fingerprint"] != fingerprint:
+                _cache.update(key=key, fingerprint=fingerprint, sections={})
+            store = _cache["sections"]
+            todo = [n for n in wanted if refresh or n not in store or now - store[n]["at"] > ttl]
+            if todo:
+                new_data, new_status = _probe_sections({n: probes[n] for n in todo}, budget_s)
+                at = time.monotonic()
+                for n in todo:
+                    # Cut-off or failed sections are retried next time
+                    if new_status[n]["status"] in ("ok", "missing-tool"):
+                        store[n] = {"at": at, "data": new_data[n], "status": new_status[n]}
+            else:
+                age = max((now - store[n]["at"] for n in wanted), default=0.0)
+            data = {n: store[n]["data"] if n in store else new_data[n] for n in wanted}
+            status = {n: store[n]["status"] if n in store else new_status[n] for n in wanted}
+    info.update(data)
+    info["probe"] = {"budget_s": budget_s, "elapsed_s": time.monotonic() - start, "sections": status}
+    if age is not None:
+        info["probe"].update(cached=True, age_s=age)
     return info
 
 
+class LazySystemInfo(Mapping):
+    """
+    Read-only mapping with the same keys as get_system_info(), where each
+    section is probed (through the probe cache) on first access. "os" is known
+    up front, so paths that never look at hardware never pay for probing.
+    prefetch() loads several sections concurrently; loaded() returns a plain
+    dict of what has been probed so far, for output and storage.
+    """
+
+    def __init__(self, **probe_kwargs: Any) -> None:
+        self._kwargs = probe_kwargs
+        self._os = probe_kwargs.pop("os_name", None) or platform.system().lower()
+        self._names = section_names(self._os)
+        self._data: Dict[str, Any] = {"os": self._os}
+        if not self._names:
+            self._data["note"] = f"Unsupported OS: {self._os}"
+        self._status: Dict[str, Any] = {}
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def prefetch(self, names: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            todo = [n for n in (self._names if names is None else names) if n in self._names and n not in self._data]
+            if not todo:
+                return
+            info = get_system_info(sections=todo, os_name=self._os, **self._kwargs)
+            for n in todo:
+                self._data[n] = info[n]
+                self._status[n] = info["probe"]["sections"][n]
+            self._elapsed += info["probe"]["elapsed_s"]
+
+    def _probe_meta(self) -> Dict[str, Any]:
+        budget = self._kwargs.get("budget_s", PROBE_BUDGET_S)
+        return {"budget_s": budget, "elapsed_s": self._elapsed, "sections": dict(self._status)}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._names:
+            self.prefetch([key])
+        elif key == "probe":
+            if not self._status:
+                raise KeyError(key)
+            return self._probe_meta()
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ("os", "note") if "note" in self._data else ("os",)
+        yield from self._names
+        if self._names:
+            yield "probe"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def loaded(self) -> Dict[str, Any]:
+        out = dict(self._data)
+        if self._status:
+            out["probe"] = self._probe_meta()
+        return out
+
+
+def lazy_system_info(**probe_kwargs: Any) -> LazySystemInfo:
+    return LazySystemInfo(**probe_kwargs)
+
+
+def materialize(info: Mapping) -> Dict[str, Any]:
+    # Plain dict for JSON output/storage; a LazySystemInfo is fully probed first
+    if isinstance(info, LazySystemInfo):
+        info.prefetch()
+        return info.loaded()
+    return dict(info)
+
+
 # ------------------------- macOS -------------------------
 
 
 def _mac_usb_info() -> Dict[str, Any]:
     # Prefer JSON output (macOS 10.13+). Fallback to text parsing.
-    code, out, _ = _run("system_profiler SPUSBDataType -json")
+    code, out, _ = _run(["system_profiler", "SPUSBDataType", "-json"])
     if code == 0:
         try:
             data = json.loads(out)
@@ -68,7 +344,7 @@ def _mac_usb_info() -> Dict[str, Any]:
         except json.JSONDecodeError:
             pass
 
-    code, out, _ = _run("system_profiler SPUSBDataType")
+    code, out, _ = _run(["system_profiler", "SPUSBDataType"])
     if code == 0:
         # Extract lines mentioning speed, location, product
         speeds = []
@@ -82,7 +358,7 @@ def _mac_usb_info() -> Dict[str, Any]:
 
 def _mac_thunderbolt_info() -> Dict[str, Any]:
     # Try Thunderbolt JSON; fallback to text.
-    code, out, _ = _run("system_profiler SPThunderboltDataType -json")
+    code, out, _ = _run(["system_profiler", "SPThunderboltDataType", "-json"])
     if code == 0 and out.strip():
         try:
             data = json.loads(out)
@@ -92,7 +368,7 @@ def _mac_thunderbolt_info() -> Dict[str, Any]:
             }
         except json.JSONDecodeError:
             pass
-    code, out, _ = _run("system_profiler SPThunderboltDataType")
+    code, out, _ = _run(["system_profiler", "SPThunderboltDataType"])
     if code == 0:
         # Extract link speeds if present
         links = []
@@ -105,14 +381,14 @@ def _mac_thunderbolt_info() -> Dict[str, Any]:
 
 
 def _mac_display_info() -> Dict[str, Any]:
-    code, out, _ = _run("system_profiler SPDisplaysDataType -json")
+    code, out, _ = _run(["system_profiler", "SPDisplaysDataType", "-json"])
     if code == 0 and out.strip():
         try:
             data = json.loads(out)
             return {"source": "system_profiler_json", "data": data.get("SPDisplaysDataType", [])}
         except json.JSONDecodeError:
             pass
-    code, out, _ = _run("system_profiler SPDisplaysDataType")
+    code, out, _ = _run(["system_profiler", "SPDisplaysDataType"])
     if code == 0:
         lines = [l.strip() for l in out.splitlines() if l.strip()]
         return {"source": "system_profiler_text", "lines": lines[:256]}
@@ -122,26 +398,29 @@ def _mac_display_info() -> Dict[str, Any]:
 # ------------------------- Linux -------------------------
 
 
-def _linux_usb_info() -> Dict[str, Any]:
+def _linux_usb_info(sysfs_root: str = "/sys") -> Dict[str, Any]:
     info: Dict[str, Any] = {}
-    code, out, _ = _run("lsusb -t")
+    devices = enumerate_usb_devices(sysfs_root)
+    if devices:
+        info["source"] = "sysfs"
+        info["devices"] = devices
+        return info
+    # No usable sysfs (unusual containers): fall back to usbutils if present
+    code, out, _ = _run(["lsusb", "-t"])
     if code == 0:
         # Tree view with speeds
         lines = [l.strip() for l in out.splitlines() if l.strip()]
         info["lsusb_tree"] = lines[:256]
-    code, out, _ = _run("lsusb -v | head -n 200")
-    if code == 0:
-        info["lsusb_verbose_head"] = out
     return info
 
 
-def _linux_thunderbolt_info() -> Dict[str, Any]:
+def _linux_thunderbolt_info(sysfs_root: str = "/sys") -> Dict[str, Any]:
     info: Dict[str, Any] = {}
-    code, out, _ = _run("which boltctl && boltctl list")
+    code, out, _ = _run(["boltctl", "list"])
     if code == 0 and out.strip():
         info["boltctl"] = out.splitlines()[:256]
     # Also check sysfs
-    tb_root = "/sys/bus/thunderbolt/devices"
+    tb_root = os.path.join(sysfs_root, "bus/thunderbolt/devices")
     if os.path.isdir(tb_root):
         devs = []
         for name in sorted(os.listdir(tb_root)):
@@ -161,8 +440,8 @@ def _linux_thunderbolt_info() -> Dict[str, Any]:
     return info
 
 
-def _linux_typec_info() -> Dict[str, Any]:
-    root = "/sys/class/typec"
+def _linux_typec_info(sysfs_root: str = "/sys") -> Dict[str, Any]:
+    root = os.path.join(sysfs_root, "class/typec")
     result: Dict[str, Any] = {}
     if not os.path.isdir(root):
         return result
@@ -209,10 +488,10 @@ def _linux_typec_info() -> Dict[str, Any]:
     return result
 
 
-def _linux_display_info() -> Dict[str, Any]:
+def _linux_display_info(sysfs_root: str = "/sys") -> Dict[str, Any]:
     info: Dict[str, Any] = {}
     # Check DRM connectors
-    root = "/sys/class/drm"
+    root = os.path.join(sysfs_root, "class/drm")
     conns = []
     try:
         if os.path.isdir(root):
@@ -242,7 +521,7 @@ def _linux_display_info() -> Dict[str, Any]:
     if conns:
         info["drm_connectors"] = conns[:64]
     # xrandr fallback
-    code, out, _ = _run("xrandr --listmonitors")
+    code, out, _ = _run(["xrandr", "--listmonitors"])
     if code == 0 and out.strip():
         info["xrandr"] = out.splitlines()[:64]
     return info
@@ -253,11 +532,12 @@ def _linux_display_info() -> Dict[str, Any]:
 
 def _windows_usb_info() -> Dict[str, Any]:
     info: Dict[str, Any] = {}
-    ps = (
-        "powershell -NoProfile -Command "
-        "\"Get-PnpDevice -Class USB | Select-Object -Property Name,Status,InstanceId | Format-Table -HideTableHeaders\""
+    code, out, _ = _run(
+        [
+            "powershell", "-NoProfile", "-Command",
+            "Get-PnpDevice -Class USB | Select-Object -Property Name,Status,InstanceId | Format-Table -HideTableHeaders",
+        ]
     )
-    code, out, _ = _run(ps)
     if code == 0 and out.strip():
         info["pnp"] = out.splitlines()[:256]
     return info
@@ -271,11 +551,12 @@ def _windows_thunderbolt_info() -> Dict[str, Any]:
 
 def _windows_display_info() -> Dict[str, Any]:
     info: Dict[str, Any] = {}
-    ps = (
-        "powershell -NoProfile -Command "
-        "\"Get-CimInstance -Namespace root\cimv2 -ClassName Win32_DesktopMonitor | Select Name,PNPDeviceID | Format-Table -HideTableHeaders\""
+    code, out, _ = _run(
+        [
+            "powershell", "-NoProfile", "-Command",
+            "Get-CimInstance -Namespace root\\cimv2 -ClassName Win32_DesktopMonitor | Select Name,PNPDeviceID | Format-Table -HideTableHeaders",
+        ]
     )
-    code, out, _ = _run(ps)
     if code == 0 and out.strip():
         info["monitors"] = out.splitlines()[:128]
     return info
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import curses
+import queue
+import signal
 import textwrap
+import threading
 from typing import Any, Dict, List, Optional
 
 from .volumes import list_candidate_volumes, Volume
+from .mounts import mount_index
 from .safety import preflight_checks, SafetyError
-from .speed_test import run_disk_speed_test
+from .speed_test import SpeedTestCancelled, iter_disk_speed_test
 from .classify import classify_result
 from . import system_info as sysinfo
 from .store import save_result
@@ -15,7 +19,7 @@ from .banner import get_banner
 
 def run_tui(initial_info: Optional[Dict[str, Any]] = None, banner_style: str = "full") -> int:
     try:
-        return curses.wrapper(lambda stdscr: _main(stdscr, initial_info or sysinfo.get_system_info(), banner_style))
+        return curses.wrapper(lambda stdscr: _main(stdscr, initial_info or sysinfo.lazy_system_info(), banner_style))
     except curses.error:
         print("TUI requires a real terminal/TTY.")
         return 2
@@ -25,6 +29,7 @@ class State:
     def __init__(self, info: Dict[str, Any]):
         self.info = info
         self.volumes: List[Volume] = list_candidate_volumes()
+        self.mounts = mount_index()
         self.sel_idx: int = 0
         self.custom_path: Optional[str] = None
         self.file_size_mb: int = 256
@@ -38,7 +43,7 @@ class State:
 
 
 def _draw(stdscr, title: str, body_lines: List[str], footer: str = "") -> None:
-    stdscr.clear()
+    stdscr.erase()
     maxy, maxx = stdscr.getmaxyx()
     title_line = title[: maxx - 1]
     stdscr.addstr(0, 0, title_line, curses.A_BOLD)
@@ -66,10 +71,133 @@ def _format_vol(v: Volume) -> str:
         attrs.append("network")
     if v.fs_type:
         attrs.append(v.fs_type)
+    if v.free_gb is not None and v.size_gb:
+        attrs.append(f"{v.free_gb:.1f} of {v.size_gb:.1f} GB free")
+    elif v.size_gb:
+        attrs.append(f"{v.size_gb:.1f} GB")
     prefix = f"{v.label} " if v.label else ""
     return f"{prefix}({v.mount_point})" + (" - " + ", ".join(attrs) if attrs else "")
 
 
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+def _sparkline(values: List[float], width: int) -> str:
+    vals = values[-width:] if width > 0 else []
+    top = max(vals) if vals else 0.0
+    if top <= 0:
+        return _SPARK[0] * len(vals)
+    return "".join(_SPARK[min(len(_SPARK) - 1, int(v / top * (len(_SPARK) - 1) + 0.5))] for v in vals)
+
+
+def _gauge(frac: float, width: int) -> str:
+    width = max(0, width)
+    filled = int(max(0.0, min(1.0, frac)) * width)
+    return "[" + "#" * filled + "-" * (width - filled) + "]"
+
+
+class _SpeedWorker:
+    """
+    Runs the speed test on a background thread and hands its events to the UI
+    through a queue, so the curses loop stays responsive and can cancel.
+    """
+
+    def __init__(self, test_dir: str, file_size_mb: int) -> None:
+        self.events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.cancel = threading.Event()
+        self._args = (test_dir, file_size_mb)
+        self.thread = threading.Thread(target=self._run, name="plugiq-tui-test", daemon=True)
+
+    def _run(self) -> None:
+        test_dir, file_size_mb = self._args
+        try:
+            for ev in iter_disk_speed_test(
+                test_dir, file_size_mb=file_size_mb, progress_interval_s=0.25, cancel=self.cancel
+            ):
+                self.events.put(ev)
+        except SpeedTestCancelled:
+            self.events.put({"event": "cancelled"})
+        except Exception as e:
+            self.events.put({"event": "error", "error": str(e)})
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        # The engine notices within one block and removes its temp file
+        self.cancel.set()
+        self.thread.join()
+
+
+def _raise_exit(signum, frame) -> None:
+    raise SystemExit(128 + signum)
+
+
+def _run_test_screen(stdscr, state: State) -> Optional[Dict[str, Any]]:
+    """
+    Live throughput screen. Returns the result, or None when the user cancels
+    or the test fails (after showing why).
+    """
+    worker = _SpeedWorker(state.test_path or "", state.file_size_mb)
+    history: List[float] = []
+    last: Dict[str, Any] = {}
+    phase = "write"
+    outcome: Optional[Dict[str, Any]] = None
+    # A plain `kill` must unwind through the finally below like Ctrl-C does
+    prev_term = signal.signal(signal.SIGTERM, _raise_exit)
+    stdscr.timeout(100)
+    worker.start()
+    try:
+        while outcome is None:
+            try:
+                while True:
+                    ev = worker.events.get_nowait()
+                    if ev["event"] == "phase":
+                        phase = ev["phase"]
+                        history = []
+                    elif ev["event"] == "progress":
+                        last = ev
+                        history.append(ev["inst_mb_s"])
+                    else:
+                        outcome = ev
+                        break
+            except queue.Empty:
+                pass
+            if outcome is not None:
+                break
+            _, maxx = stdscr.getmaxyx()
+            width = max(10, min(60, maxx - 12))
+            done, total = last.get("bytes_done", 0), last.get("bytes_total", 0)
+            lines = [
+                f"Target: {state.test_path}   Size: {state.file_size_mb} MB",
+                "",
+                f"Phase: {phase}",
+                f"{_gauge(done / total if total else 0.0, width)} {100.0 * done / total if total else 0.0:5.1f}%",
+                "",
+                f"Now: {last.get('inst_mb_s', 0.0):8.1f} MB/s   Avg: {last.get('avg_mb_s', 0.0):8.1f} MB/s"
+                + (f"   ETA: {last['eta_s']:.0f}s" if last.get("eta_s") is not None else ""),
+                _sparkline(history, width) or " ",
+            ]
+            _draw(stdscr, "Running Test", lines, footer="c/q/Esc: Cancel")
+            ch = stdscr.getch()
+            if ch in (ord("c"), ord("C"), ord("q"), ord("Q"), 27):
+                _draw(stdscr, "Running Test", ["Cancelling, removing temporary file…"], footer="Please wait")
+                worker.stop()
+                return None
+    finally:
+        if worker.thread.is_alive():
+            worker.stop()
+        stdscr.timeout(-1)
+        signal.signal(signal.SIGTERM, prev_term)
+
+    if outcome["event"] == "result":
+        return outcome["result"]
+    if outcome["event"] == "error":
+        _draw(stdscr, "Test Failed", [outcome["error"], "", "Press any key to continue…"], footer="Any key…")
+        stdscr.getch()
+    return None
+
+
 def _input_line(stdscr, prompt: str) -> str:
     curses.echo()
     maxy, maxx = stdscr.getmaxyx()
@@ -168,7 +296,7 @@ def _main(stdscr, info: Dict[str, Any], banner_style: str) -> int:
 
         elif state.step == 3:
             try:
-                _, warnings = preflight_checks(state.test_path or "", state.file_size_mb)
+                _, warnings = preflight_checks(state.test_path or "", state.file_size_mb, state.mounts)
                 state.warnings = warnings
                 err = None
             except SafetyError as e:
@@ -221,11 +349,12 @@ def _main(stdscr, info: Dict[str, Any], banner_style: str) -> int:
                 state.step = 5
 
         elif state.step == 5:
-            _draw(stdscr, "Running Test", ["Running write/read throughput test..."], footer="Testing… please wait")
-            stdscr.refresh()
-            speed = run_disk_speed_test(test_dir=state.test_path or "", file_size_mb=state.file_size_mb)
+            speed = _run_test_screen(stdscr, state)
+            if speed is None:
+                state.step = 4
+                continue
             state.speed = speed
-            state.info = sysinfo.get_system_info()
+            state.info = sysinfo.lazy_system_info()
             state.step = 6
 
         elif state.step == 6:
@@ -251,7 +380,7 @@ def _main(stdscr, info: Dict[str, Any], banner_style: str) -> int:
             if ch in (ord("q"), ord("Q")):
                 return 0
             if ch in (ord("n"), ord("N")):
-                state = State(sysinfo.get_system_info())
+                state = State(sysinfo.lazy_system_info())
                 continue
             if ch in (ord("l"), ord("L")):
                 s = _input_line(stdscr, "Cable label: ")
@@ -259,7 +388,7 @@ def _main(stdscr, info: Dict[str, Any], banner_style: str) -> int:
             if ch in (ord("s"), ord("S")):
                 entry = {
                     "label": state.label,
-                    "system": state.info,
+                    "system": sysinfo.materialize(state.info),
                     "speed_test": state.speed,
                     "classification": state.classification,
                 }
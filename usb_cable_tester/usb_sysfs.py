@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional
+
+
+USB_DEVICES_DIR = "bus/usb/devices"
+
+# sysfs attribute -> record key, with the parser applied to the stripped text
+_ATTRS = (
+    ("busnum", "busnum", int),
+    ("devnum", "devnum", int),
+    ("devpath", "devpath", str),
+    ("speed", "speed_mbps", float),
+    ("version", "version", str),
+    ("idVendor", "vendor_id", str),
+    ("idProduct", "product_id", str),
+    ("bcdDevice", "bcd_device", str),
+    ("manufacturer", "manufacturer", str),
+    ("product", "product", str),
+    ("serial", "serial", str),
+    ("maxchild", "maxchild", int),
+    ("bDeviceClass", "device_class", str),
+    ("removable", "removable", str),
+    ("rx_lanes", "rx_lanes", int),
+    ("tx_lanes", "tx_lanes", int),
+)
+
+
+def _read_attr(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _parent_name(name: str) -> Optional[str]:
+    # "usb2" is a root hub; "2-1" hangs off it, "2-1.4" off hub "2-1"
+    if name.startswith("usb"):
+        return None
+    bus, _, ports = name.partition("-")
+    if "." in ports:
+        return f"{bus}-{ports.rsplit('.', 1)[0]}"
+    return f"usb{bus}"
+
+
+def read_usb_device(path: str) -> Dict[str, Any]:
+    """Structured record for one sysfs USB device directory."""
+    name = os.path.basename(path.rstrip("/"))
+    rec: Dict[str, Any] = {"name": name, "parent": _parent_name(name), "root_hub": name.startswith("usb")}
+    for attr, key, parse in _ATTRS:
+        raw = _read_attr(os.path.join(path, attr))
+        if raw is None or raw == "":
+            continue
+        try:
+            value = parse(raw)
+        except ValueError:
+            continue
+        if key == "speed_mbps" and float(value).is_integer():
+            value = int(value)
+        rec[key] = value
+    return rec
+
+
+def enumerate_usb_devices(sysfs_root: str = "/sys") -> List[Dict[str, Any]]:
+    """
+    All USB devices (root hubs included, interfaces skipped) under
+    <sysfs_root>/bus/usb/devices, sorted by bus and port path. Reads a few
+    small attribute files per device; no subprocesses, no usbutils needed.
+    """
+    root = os.path.join(sysfs_root, USB_DEVICES_DIR)
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    devices = [read_usb_device(os.path.join(root, n)) for n in names if ":" not in n]
+    devices.sort(key=lambda d: (d.get("busnum", 0), d["root_hub"] is False, d["name"]))
+    return devices
+
+
+def describe(rec: Dict[str, Any]) -> str:
+    # "2-1 SanDisk Extreme (0781:5583)"
+    label = " ".join(x for x in (rec.get("manufacturer"), rec.get("product")) if x)
+    ids = f"{rec['vendor_id']}:{rec['product_id']}" if rec.get("vendor_id") and rec.get("product_id") else ""
+    return " ".join(x for x in (rec["name"], label, f"({ids})" if ids else "") if x)
@@ -1,28 +1,25 @@
 from __future__ import annotations
 
-import json
 import os
 import platform
 import re
-import subprocess
 from dataclasses import dataclass
-from typing import List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from .mounts import MOUNTINFO_PATH, block_device_for, block_devices, read_mountinfo
+from .runner import run_command
 
-def _run(cmd: str, timeout: float = 10.0) -> tuple[int, str, str]:
-    try:
-        p = subprocess.run(
-            cmd,
-            shell=True,
-            check=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout,
-        )
-        return p.returncode, p.stdout, p.stderr
-    except subprocess.TimeoutExpired as e:
-        return 124, e.stdout or "", e.stderr or ""
+
+# Free-space probes share this timeout; a hung network mount must not stall
+# the volume picker.
+STATVFS_TIMEOUT_S = 2.0
+_statvfs_lock = threading.Lock()
+_statvfs_inflight: Set[str] = set()
+
+# Read-only images (snaps, live media) are never test targets
+_SKIP_FS_TYPES = ("squashfs", "iso9660")
 
 
 @dataclass
@@ -50,7 +47,7 @@ def list_candidate_volumes() -> List[Volume]:
 def _mac_list_volumes() -> List[Volume]:
     vols: List[Volume] = []
     # Use diskutil to discover volumes and their mount points
-    code, out, _ = _run("diskutil info -all")
+    code, out, _ = run_command(["diskutil", "info", "-all"])
     if code != 0 or not out:
         return vols
     current = {}
@@ -92,52 +89,114 @@ def _parse_size_gb(field: Optional[str]) -> Optional[float]:
     return None
 
 
-def _linux_list_volumes() -> List[Volume]:
-    vols: List[Volume] = []
-    code, out, _ = _run("lsblk -J -o NAME,TYPE,MOUNTPOINT,RM,RO,TRAN,FSTYPE,LABEL,SIZE")
-    if code == 0 and out.strip():
+def _capacity(paths: List[str], timeout_s: float) -> Dict[str, Tuple[float, float]]:
+    """
+    (size_gb, free_gb) per path from os.statvfs, called on daemon threads that
+    share one timeout. A mount that does not answer in time (a dead NFS or
+    CIFS server) is left out, and is not probed again while that call is stuck.
+    """
+    results: Dict[str, Tuple[float, float]] = {}
+
+    def worker(path: str) -> None:
         try:
-            data = json.loads(out)
-            def walk(node):
-                name = node.get("name")
-                mnt = node.get("mountpoint")
-                if mnt:
-                    rm = bool(node.get("rm"))
-                    tran = (node.get("tran") or "").lower()
-                    fst = node.get("fstype")
-                    lbl = node.get("label")
-                    size = node.get("size")
-                    vols.append(Volume(mount_point=mnt, label=lbl, is_external=(rm or tran in ("usb", "thunderbolt")), fs_type=fst, is_network=(fst in ("nfs", "cifs", "smb"))))
-                for ch in node.get("children", []) or []:
-                    walk(ch)
-            for blk in data.get("blockdevices", []) or []:
-                walk(blk)
-            return vols
-        except Exception:
+            st = os.statvfs(path)
+            with _statvfs_lock:
+                results[path] = (st.f_blocks * st.f_frsize / 1e9, st.f_bavail * st.f_frsize / 1e9)
+        except OSError:
             pass
-    # Fallback: parse /proc/mounts and mark as unknown
+        finally:
+            with _statvfs_lock:
+                _statvfs_inflight.discard(path)
+
+    threads = []
+    with _statvfs_lock:
+        for path in paths:
+            if path not in _statvfs_inflight:
+                _statvfs_inflight.add(path)
+                threads.append(threading.Thread(target=worker, args=(path,), name=f"statvfs {path}", daemon=True))
+    deadline = time.monotonic() + timeout_s
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    with _statvfs_lock:
+        return dict(results)
+
+
+def _labels_by_device(dev_root: str) -> Dict[str, str]:
+    # udev's /dev/disk/by-label links, e.g. "My\x20Disk" -> ../../sda1
+    base = os.path.join(dev_root, "disk", "by-label")
+    out: Dict[str, str] = {}
+    try:
+        names = os.listdir(base)
+    except OSError:
+        return out
+    for name in names:
+        target = os.path.basename(os.path.realpath(os.path.join(base, name)))
+        out[target] = re.sub(r"\\x([0-9a-fA-F]{2})", lambda m: chr(int(m.group(1), 16)), name)
+    return out
+
+
+def _linux_list_volumes(
+    mountinfo_path: str = MOUNTINFO_PATH,
+    sysfs_root: str = "/sys",
+    dev_root: str = "/dev",
+    statvfs_timeout_s: float = STATVFS_TIMEOUT_S,
+) -> List[Volume]:
+    # Block-device and network mounts from mountinfo; the visible (last) mount
+    # wins where several share a mount point
     try:
-        with open("/proc/mounts", "r", encoding="utf-8") as fh:
-            for line in fh:
-                parts = line.split()
-                if len(parts) >= 3:
-                    mnt = parts[1]
-                    fstype = parts[2]
-                    if mnt.startswith("/run") or mnt.startswith("/proc") or mnt.startswith("/sys"):
-                        continue
-                    vols.append(Volume(mount_point=mnt, label=None, is_external=None, fs_type=fstype, is_network=(fstype in ("nfs", "cifs", "smb"))))
-    except Exception:
-        pass
+        mounts = read_mountinfo(mountinfo_path)
+    except OSError:
+        return []
+    devices = block_devices(sysfs_root)
+    by_name = {d["name"]: d for d in devices.values()}
+    visible: Dict[str, Any] = {}
+    for m in mounts:
+        dev = block_device_for(m, devices, by_name)
+        if dev is None and not m.is_network:
+            continue
+        if m.fs_type in _SKIP_FS_TYPES or _is_system_mount(m.mount_point):
+            continue
+        visible.pop(m.mount_point, None)
+        visible[m.mount_point] = (m, dev)
+
+    labels = _labels_by_device(dev_root)
+    capacity = _capacity(list(visible), statvfs_timeout_s)
+    vols: List[Volume] = []
+    for mnt, (m, dev) in visible.items():
+        size_gb, free_gb = capacity.get(mnt, (None, None))
+        if size_gb is None and dev and dev["size_bytes"]:
+            size_gb = dev["size_bytes"] / 1e9
+        vols.append(
+            Volume(
+                mount_point=mnt,
+                label=labels.get(dev["name"]) if dev else None,
+                is_external=dev["external"] if dev else None,
+                fs_type=m.fs_type,
+                is_network=m.is_network,
+                size_gb=size_gb,
+                free_gb=free_gb,
+            )
+        )
     return vols
 
 
+def _is_system_mount(mnt: str) -> bool:
+    # udisks mounts removable media under /run/media/$USER
+    if mnt == "/run/media" or mnt.startswith("/run/media/"):
+        return False
+    return any(mnt == p or mnt.startswith(p + "/") for p in ("/proc", "/sys", "/dev", "/run", "/snap"))
+
+
 def _windows_list_volumes() -> List[Volume]:
     vols: List[Volume] = []
-    ps = (
-        "powershell -NoProfile -Command "
-        "\"Get-Volume | Select DriveLetter,FileSystemLabel,DriveType,FileSystem | Format-Table -HideTableHeaders\""
+    code, out, _ = run_command(
+        [
+            "powershell", "-NoProfile", "-Command",
+            "Get-Volume | Select DriveLetter,FileSystemLabel,DriveType,FileSystem | Format-Table -HideTableHeaders",
+        ]
     )
-    code, out, _ = _run(ps)
     if code == 0 and out.strip():
         for line in out.splitlines():
             s = line.strip()
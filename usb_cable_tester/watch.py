@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import select
+import socket
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, IO, List, Optional
+
+from . import system_info as sysinfo
+from .classify import classify_result
+from .mounts import MOUNTINFO_PATH, mount_index, read_mountinfo
+from .safety import SafetyError, preflight_checks
+from .speed_test import AUTO_SIZE_MIN_MB, auto_size_cap, run_disk_speed_test, run_speed_trials
+from .store import save_result
+
+
+# NETLINK_KOBJECT_UEVENT; multicast group 1 carries the kernel's own events
+NETLINK_KOBJECT_UEVENT = 15
+_KERNEL_GROUP = 1
+
+WATCHED_SUBSYSTEMS = ("usb", "typec", "block")
+
+# Speed-test profiles (roadmap: plugiq disk --profile quick|full)
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "quick": {"file_size_mb": 1024, "auto_size": True},
+    "full": {"file_size_mb": 1024, "trials": 3, "warmup": 1},
+}
+
+# How long after a block device appears to wait for it to be mounted
+MOUNT_TIMEOUT_S = 30.0
+_MOUNT_POLL_S = 0.5
+
+
+def parse_uevent(data: bytes) -> Optional[Dict[str, str]]:
+    """
+    Decode a kernel uevent datagram ("ACTION@DEVPATH\\0KEY=VALUE\\0...").
+    Returns None for udev-daemon messages and anything unparsable.
+    """
+    if data.startswith(b"libudev"):
+        return None
+    env: Dict[str, str] = {}
+    for field in data.split(b"\0"):
+        key, sep, value = field.decode("utf-8", "replace").partition("=")
+        if sep:
+            env[key] = value
+    return env if "ACTION" in env and "DEVPATH" in env else None
+
+
+class NetlinkSource:
+    """Live kernel uevents. Blocks in select() while idle, so it costs no CPU."""
+
+    def __init__(self) -> None:
+        if not hasattr(socket, "AF_NETLINK"):
+            raise OSError("uevent netlink sockets need Linux; replay a file with --events instead")
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        # Events keep arriving while a speed test runs; give them room to queue
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((0, _KERNEL_GROUP))
+
+    def next_event(self, timeout: Optional[float]) -> Optional[Dict[str, str]]:
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return None
+        return parse_uevent(self.sock.recv(65536))
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class FileSource:
+    """
+    Replays uevents from a JSONL file (one environment dict per line), as
+    written by --record-events. Raises EOFError once the file is exhausted.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.fh = open(path, "r", encoding="utf-8")
+
+    def next_event(self, timeout: Optional[float]) -> Optional[Dict[str, str]]:
+        for line in self.fh:
+            if line.strip():
+                return json.loads(line)
+        raise EOFError
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+def find_mount(devname: str, mounts_path: str = MOUNTINFO_PATH) -> Optional[str]:
+    # Where /dev/<devname> is mounted, skipping mount points it is hidden
+    # under (a later mount on the same point is the visible one)
+    try:
+        mounts = read_mountinfo(mounts_path)
+    except OSError:
+        return None
+    visible = {m.mount_point: m for m in mounts}
+    target = "/dev/" + devname
+    return next((mnt for mnt, m in visible.items() if m.source == target), None)
+
+
+def _parse_match(text: str) -> Dict[str, str]:
+    key, sep, pattern = text.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=PATTERN, got {text!r}")
+    return {key: pattern}
+
+
+def run_profile(path: str, profile: str) -> Dict[str, Any]:
+    kwargs = dict(PROFILES[profile])
+    if kwargs.get("auto_size"):
+        kwargs["file_size_mb"] = auto_size_cap(path, kwargs["file_size_mb"])
+    if "trials" in kwargs:
+        return run_speed_trials(path, **kwargs)
+    return run_disk_speed_test(path, **kwargs)
+
+
+class Watcher:
+    """
+    Turns uevents into tests: a block device "add" whose environment (merged
+    with its USB parent device's) matches every pattern in `matches` becomes
+    pending until it is mounted, then the profile runs against the mount point.
+    """
+
+    def __init__(
+        self,
+        matches: List[Dict[str, str]],
+        profile: str = "quick",
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        log: Optional[IO[str]] = None,
+        mounts_path: str = MOUNTINFO_PATH,
+        mount_timeout_s: float = MOUNT_TIMEOUT_S,
+        runner: Callable[[str, str], Dict[str, Any]] = run_profile,
+        probe: Callable[[], Dict[str, Any]] = sysinfo.get_system_info,
+    ) -> None:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile}")
+        self.matches = matches
+        self.profile = profile
+        self.on_result = on_result
+        self.log = log
+        self.mounts_path = mounts_path
+        self.mount_timeout_s = mount_timeout_s
+        self.runner = runner
+        self.probe = probe
+        self.usb_devices: Dict[str, Dict[str, str]] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.tested = 0
+
+    def _say(self, msg: str) -> None:
+        if self.log is not None:
+            self.log.write(msg + "\n")
+            self.log.flush()
+
+    def _usb_parent(self, devpath: str) -> Dict[str, str]:
+        best = ""
+        for path in self.usb_devices:
+            if devpath.startswith(path + "/") and len(path) > len(best):
+                best = path
+        return self.usb_devices.get(best, {})
+
+    def _matches(self, env: Dict[str, str]) -> bool:
+        return all(
+            fnmatch.fnmatchcase(env.get(key, ""), pattern) for m in self.matches for key, pattern in m.items()
+        )
+
+    def handle(self, event: Dict[str, str]) -> None:
+        subsystem = event.get("SUBSYSTEM")
+        if subsystem not in WATCHED_SUBSYSTEMS:
+            return
+        action, devpath = event.get("ACTION"), event.get("DEVPATH", "")
+        if subsystem == "usb" and event.get("DEVTYPE") == "usb_device":
+            if action == "add":
+                self.usb_devices[devpath] = event
+                self._say(f"usb attach {event.get('PRODUCT', '?')} {devpath}")
+            elif action == "remove":
+                self.usb_devices.pop(devpath, None)
+                self._say(f"usb detach {devpath}")
+        elif subsystem == "typec" and action in ("add", "remove"):
+            self._say(f"typec {action} {devpath}")
+        elif subsystem == "block" and event.get("DEVNAME"):
+            devname = event["DEVNAME"]
+            if action == "remove":
+                self.pending.pop(devname, None)
+                return
+            if action != "add":
+                return
+            env = dict(self._usb_parent(devpath))
+            if not env:
+                return  # not behind a USB device
+            env.update(event)
+            if self._matches(env):
+                self._say(f"block {devname} attached; waiting for it to be mounted")
+                self.pending[devname] = {"env": env, "deadline": time.monotonic() + self.mount_timeout_s}
+
+    def poll_pending(self) -> None:
+        now = time.monotonic()
+        for devname in list(self.pending):
+            item = self.pending[devname]
+            mount = find_mount(devname, self.mounts_path)
+            if mount is not None:
+                del self.pending[devname]
+                self._test(devname, mount, item["env"])
+            elif now >= item["deadline"]:
+                del self.pending[devname]
+                self._say(f"block {devname} was not mounted within {self.mount_timeout_s:.0f}s; skipped")
+
+    def _test(self, devname: str, mount: str, env: Dict[str, str]) -> None:
+        self._say(f"testing {devname} at {mount} ({self.profile} profile)")
+        info = self.probe()
+        record: Dict[str, Any] = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "label": None,
+            "device": {"devname": devname, "devpath": env.get("DEVPATH"), "product": env.get("PRODUCT"), "mount": mount},
+            "system": info,
+        }
+        try:
+            # Auto-sized profiles are capped to the free space (run_profile),
+            # so only their first rounds need to fit
+            profile = PROFILES[self.profile]
+            size_mb = AUTO_SIZE_MIN_MB if profile.get("auto_size") else profile["file_size_mb"]
+            # A fresh index: the volume was mounted after the watcher started
+            _, record["warnings"] = preflight_checks(mount, size_mb, mount_index())
+            speed = self.runner(mount, self.profile)
+            record["speed_test"] = speed
+            record["classification"] = classify_result(info=info, speed_result=speed)
+            self._say(f"{devname}: {record['classification'].get('summary')}")
+        except (SafetyError, OSError, RuntimeError, ValueError) as e:
+            record["speed_test"] = None
+            record["error"] = str(e)
+            self._say(f"{devname}: test failed: {e}")
+        self.tested += 1
+        if self.on_result is not None:
+            self.on_result(record)
+
+    def run(self, source: Any, max_tests: Optional[int] = None, record_to: Optional[IO[str]] = None) -> int:
+        """
+        Process events until the source ends (replay) or max_tests tests ran.
+        Sleeps in the source without a timeout unless a device awaits its mount.
+        """
+        try:
+            while max_tests is None or self.tested < max_tests:
+                timeout = _MOUNT_POLL_S if self.pending else None
+                try:
+                    event = source.next_event(timeout)
+                except EOFError:
+                    # Replay ended: give still-pending devices their chance
+                    while self.pending and (max_tests is None or self.tested < max_tests):
+                        self.poll_pending()
+                        if self.pending:
+                            time.sleep(_MOUNT_POLL_S)
+                    break
+                if event is not None:
+                    if record_to is not None:
+                        record_to.write(json.dumps(event) + "\n")
+                        record_to.flush()
+                    self.handle(event)
+                if self.pending:
+                    self.poll_pending()
+        finally:
+            source.close()
+        return self.tested
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="plugiq watch",
+        description="Watch USB/Type-C/block hotplug events and run a speed test on matching devices once they are mounted.",
+    )
+    parser.add_argument("--match", type=_parse_match, action="append", default=[], metavar="KEY=PATTERN",
+                        help="Only test devices whose uevent (or USB parent's) KEY matches the glob, e.g. PRODUCT=781/5583/* (repeatable; default any USB disk)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="Speed-test profile (default quick)")
+    parser.add_argument("--events", default=None, help="Replay uevents from a JSONL file instead of the kernel socket")
+    parser.add_argument("--record-events", default=None, help="Append every received uevent to this JSONL file (replayable with --events)")
+    parser.add_argument("--mounts", default=MOUNTINFO_PATH, help=argparse.SUPPRESS)
+    parser.add_argument("--mount-timeout", type=float, default=MOUNT_TIMEOUT_S, help=f"Seconds to wait for an attached disk to be mounted (default {MOUNT_TIMEOUT_S:.0f})")
+    parser.add_argument("--once", action="store_true", help="Exit after the first test")
+    parser.add_argument("-S", "--save", action="store_true", help="Save each result to the results history")
+    parser.add_argument("-j", "--json", action="store_true", help="Print one JSON line per test on stdout")
+    args = parser.parse_args(argv)
+
+    def on_result(record: Dict[str, Any]) -> None:
+        if args.save and "error" not in record:
+            record["saved_to"] = save_result(record)
+        if args.json:
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+
+    watcher = Watcher(
+        args.match,
+        profile=args.profile,
+        on_result=on_result,
+        log=sys.stderr,
+        mounts_path=args.mounts,
+        mount_timeout_s=args.mount_timeout,
+    )
+    try:
+        source = FileSource(args.events) if args.events else NetlinkSource()
+    except OSError as e:
+        parser.error(str(e))
+    record_to = open(args.record_events, "a", encoding="utf-8") if args.record_events else None
+    if not args.events:
+        sys.stderr.write("Watching for USB devices (Ctrl-C to stop)...\n")
+    try:
+        watcher.run(source, max_tests=1 if args.once else None, record_to=record_to)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if record_to is not None:
+            record_to.close()
+    return 0
@@ -4,8 +4,9 @@ import sys
 from typing import Any, Dict, List, Optional
 
 from .volumes import list_candidate_volumes, Volume
+from .mounts import mount_index
 from .safety import preflight_checks, SafetyError
-from .speed_test import run_disk_speed_test
+from .speed_test import AUTO_SIZE_MIN_MB, auto_size_cap, consume_speed_events, iter_disk_speed_test
 from .classify import classify_result
 from .store import save_result
 from . import system_info as sysinfo
@@ -47,6 +48,8 @@ def _format_vol(v: Volume) -> str:
     if v.is_external is False: attrs.append("internal")
     if v.is_network: attrs.append("network")
     if v.fs_type: attrs.append(v.fs_type)
+    if v.free_gb is not None and v.size_gb: attrs.append(f"{v.free_gb:.1f} of {v.size_gb:.1f} GB free")
+    elif v.size_gb: attrs.append(f"{v.size_gb:.1f} GB")
     label = f"{v.label} " if v.label else ""
     return f"{label}({v.mount_point})" + (" - " + ", ".join(attrs) if attrs else "")
 
@@ -64,10 +67,11 @@ def run_wizard(initial_info: Dict[str, Any], banner_style: str = "full") -> int:
         return 0
 
     # Refresh system info to capture current devices
-    info = initial_info or sysinfo.get_system_info()
+    info = initial_info or sysinfo.lazy_system_info()
 
     # Step 1: Choose a target volume
     vols = list_candidate_volumes()
+    mounts = mount_index()
     options = [ _format_vol(v) for v in vols ]
     options = options[:20]
     idx = _prompt_choice("Choose a target device (recommended: external SSD connected through the cable):", options)
@@ -86,8 +90,15 @@ def run_wizard(initial_info: Dict[str, Any], banner_style: str = "full") -> int:
 
     # Step 2: Safety checks
     default_size = 256
-    print(f"Default test file size is {default_size} MB for safety.")
-    if _prompt_yes_no("Increase test size for more accurate measurement?", default=False):
+    auto_cap = 2048
+    auto_size = _prompt_yes_no(
+        f"Size the test automatically (stops once throughput is stable, at most {auto_cap} MB)?", default=True
+    )
+    if auto_size:
+        file_size_mb = auto_size_cap(test_path, auto_cap)
+        if file_size_mb < auto_cap:
+            print(f"Capping the test at {file_size_mb} MB to fit the free space on this volume.")
+    elif _prompt_yes_no(f"Default test file size is {default_size} MB for safety. Increase it for more accurate measurement?", default=False):
         while True:
             try:
                 val = int(input("Enter size in MB (e.g., 1024 for 1 GB): ").strip())
@@ -104,7 +115,8 @@ def run_wizard(initial_info: Dict[str, Any], banner_style: str = "full") -> int:
         file_size_mb = default_size
 
     try:
-        ok, warnings = preflight_checks(test_path, file_size_mb)
+        # Auto-size needs only its first rounds to fit; the cap is an upper bound
+        ok, warnings = preflight_checks(test_path, AUTO_SIZE_MIN_MB if auto_size else file_size_mb, mounts)
     except SafetyError as e:
         print("Safety check failed:", str(e))
         return 2
@@ -128,11 +140,16 @@ def run_wizard(initial_info: Dict[str, Any], banner_style: str = "full") -> int:
         speed = None
     else:
         print("Testing... this may take a moment.")
-        speed = run_disk_speed_test(test_dir=test_path, file_size_mb=file_size_mb)
+        speed = consume_speed_events(
+            iter_disk_speed_test(test_dir=test_path, file_size_mb=file_size_mb, auto_size=auto_size),
+            show=sys.stderr.isatty(),
+        )
         print(f"Write: {speed['write_mb_s']:.1f} MB/s, Read: {speed['read_mb_s']:.1f} MB/s")
+        if auto_size:
+            print(f"Measured with {speed['file_size_mb']:.0f} MB of data.")
 
     # Step 5: Classification and optional save
-    info2 = sysinfo.get_system_info()  # recapture in case link changed under load
+    info2 = sysinfo.lazy_system_info()  # recapture in case link changed under load
     summary2 = classify_result(info=info2, speed_result=speed)
     print("Likely:", summary2.get("summary"))
     if summary2.get("reasons"):
@@ -141,10 +158,10 @@ def run_wizard(initial_info: Dict[str, Any], banner_style: str = "full") -> int:
             print(" -", r)
 
     label = input("Optional: enter a label/name for this cable: ").strip() or None
-    if _prompt_yes_no("Save this result to .usb_cable_results.json?", default=True):
+    if _prompt_yes_no("Save this result to .usb_cable_results.jsonl?", default=True):
         entry = {
             "label": label,
-            "system": info2,
+            "system": sysinfo.materialize(info2),
             "speed_test": speed,
             "classification": summary2,
         }